@@ -72,4 +72,11 @@ def create_app():
         db.create_all()
         app.logger.info('Database tables created successfully')
 
+    # Optionally build chatbot subsystems in the background instead of on first request
+    warmup = os.environ.get('CHATBOT_WARMUP')
+    if warmup:
+        from .chatbot import ChatbotService
+        components = None if warmup == 'all' else [c.strip() for c in warmup.split(',') if c.strip()]
+        ChatbotService.warm_up(components)
+
     return app
\ No newline at end of file
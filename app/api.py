@@ -1,7 +1,8 @@
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, Response, request, jsonify, send_file, current_app, stream_with_context
 from flask_login import login_required, current_user
 from .models import User, Appointment, MedicalRecord, Prescription, MedicalDocument, ChatSession, ChatMessage, db
 from datetime import datetime
+import json
 from werkzeug.utils import secure_filename
 import os
 from pathlib import Path
@@ -407,6 +408,51 @@ def create_chat_session():
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@api_bp.route('/chat/status', methods=['GET'])
+@login_required
+def get_chatbot_status():
+    return jsonify(ChatbotService.component_status())
+
+def _ndjson_records(stream):
+    """Parse an NDJSON request body one line at a time as it arrives."""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            # Reported as an invalid record rather than aborting the batch
+            yield line.decode('utf-8', 'replace')
+
+@api_bp.route('/triage/batch', methods=['POST'])
+@login_required
+def triage_batch():
+    """Re-triage many patient records, streaming results back as NDJSON in input order.
+
+    The body is a JSON list of records (or ``{"records": [...]}``), or an
+    ``application/x-ndjson`` stream with one record per line.
+    """
+    if current_user.role == 'patient':
+        return jsonify({'error': 'Unauthorized access'}), 403
+
+    if request.mimetype == 'application/x-ndjson':
+        records = _ndjson_records(request.stream)
+    else:
+        data = request.get_json(silent=True)
+        records = data.get('records') if isinstance(data, dict) else data
+        if not isinstance(records, list):
+            return jsonify({'error': 'Expected a list of records'}), 400
+
+    def generate():
+        try:
+            for result in ChatbotService.triage_batch(records):
+                yield json.dumps(result) + "\n"
+        except Exception as e:
+            yield json.dumps({'error': str(e)}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @api_bp.route('/chat/sessions', methods=['GET'])
 @login_required
 def get_chat_sessions():
@@ -470,6 +516,35 @@ def send_message(session_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@api_bp.route('/chat/session/<int:session_id>/message/stream', methods=['POST'])
+@login_required
+def stream_message(session_id):
+    """Stream the assistant's reply as server-sent events."""
+    session = ChatSession.query.get_or_404(session_id)
+    if session.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized access'}), 403
+
+    if session.ended_at:
+        return jsonify({'error': 'This chat session has ended'}), 400
+
+    data = request.get_json()
+    if not data or 'message' not in data:
+        return jsonify({'error': 'No message provided'}), 400
+
+    def generate():
+        try:
+            for event, payload in ChatbotService.stream_response(session_id, data['message']):
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            db.session.rollback()
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @api_bp.route('/chat/session/<int:session_id>/end', methods=['POST'])
 @login_required
 def end_chat_session(session_id):
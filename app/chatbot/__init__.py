@@ -1,9 +1,15 @@
-from .base import BaseChatModel
-from .llama_model import LlamaChatModel
-from .huggingface_model import HuggingFaceChatModel
-from .openai_model import OpenAIChatModel
-from .service import ChatbotService
-from .document_processor import DocumentProcessor
+import importlib
+
+# Submodules pull in torch, transformers and langchain, so exports are resolved
+# on first attribute access instead of when the package is imported.
+_EXPORTS = {
+    'BaseChatModel': '.base',
+    'LlamaChatModel': '.llama_model',
+    'HuggingFaceChatModel': '.huggingface_model',
+    'OpenAIChatModel': '.openai_model',
+    'ChatbotService': '.service',
+    'DocumentProcessor': '.document_processor'
+}
 
 __all__ = [
     'BaseChatModel',
@@ -13,3 +19,10 @@ __all__ = [
     'ChatbotService',
     'DocumentProcessor'
 ]
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,114 @@
+import os
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+import faiss
+import numpy as np
+
+INDEX_TYPES = ('flat', 'ivf', 'ivfpq', 'pq', 'hnsw')
+
+# faiss needs roughly this many training points per centroid / PQ code
+MIN_POINTS_PER_CENTROID = 39
+
+
+@dataclass
+class IndexConfig:
+    """How the documentation vectors are indexed and searched.
+
+    ``flat`` is exact. ``ivf``/``ivfpq`` cluster vectors into ``nlist`` lists and
+    scan ``nprobe`` of them per query; ``pq``/``ivfpq`` compress vectors into
+    ``pq_m`` codes of ``pq_nbits`` bits; ``hnsw`` walks a graph with ``hnsw_m``
+    links per node and a search beam of ``ef_search``. Only ``nprobe`` and
+    ``ef_search`` can be changed without rebuilding the index.
+    """
+
+    index_type: str = 'flat'
+    nlist: int = 1024
+    pq_m: int = 16
+    pq_nbits: int = 8
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    nprobe: int = 16
+    ef_search: int = 64
+    max_train_points: int = 100000
+
+    def __post_init__(self):
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {self.index_type}; expected one of {', '.join(INDEX_TYPES)}")
+
+    @classmethod
+    def from_env(cls) -> 'IndexConfig':
+        config = cls(index_type=os.environ.get("VECTOR_INDEX_TYPE", "flat"))
+        for field_name in ('nlist', 'pq_m', 'pq_nbits', 'hnsw_m', 'ef_construction', 'nprobe', 'ef_search'):
+            value = os.environ.get(f"VECTOR_INDEX_{field_name.upper()}")
+            if value:
+                setattr(config, field_name, int(value))
+        return config
+
+    def build_params(self) -> Dict:
+        """Parameters baked into the index on disk; a change means a rebuild."""
+        params = asdict(self)
+        for search_param in ('nprobe', 'ef_search', 'max_train_points'):
+            params.pop(search_param)
+        return params
+
+
+def _effective_type(config: IndexConfig, n_vectors: int, dimension: int) -> str:
+    """Fall back to an exact index when there is too little data to train on."""
+    index_type = config.index_type
+    if index_type in ('pq', 'ivfpq'):
+        if dimension % config.pq_m or n_vectors < MIN_POINTS_PER_CENTROID * (1 << config.pq_nbits):
+            index_type = 'ivf' if index_type == 'ivfpq' else 'flat'
+    if index_type in ('ivf', 'ivfpq') and n_vectors < MIN_POINTS_PER_CENTROID * 2:
+        index_type = 'flat'
+    return index_type
+
+
+def create_index(config: IndexConfig, n_vectors: int, dimension: int):
+    """Create an empty, untrained index able to hold ``n_vectors`` vectors."""
+    index_type = _effective_type(config, n_vectors, dimension)
+    nlist = max(1, min(config.nlist, n_vectors // MIN_POINTS_PER_CENTROID))
+
+    if index_type == 'ivf':
+        base = faiss.IndexIVFFlat(faiss.IndexFlatL2(dimension), dimension, nlist)
+    elif index_type == 'ivfpq':
+        base = faiss.IndexIVFPQ(faiss.IndexFlatL2(dimension), dimension, nlist, config.pq_m, config.pq_nbits)
+    elif index_type == 'pq':
+        base = faiss.IndexPQ(dimension, config.pq_m, config.pq_nbits)
+    elif index_type == 'hnsw':
+        base = faiss.IndexHNSWFlat(dimension, config.hnsw_m)
+        base.hnsw.efConstruction = config.ef_construction
+    else:
+        base = faiss.IndexFlatL2(dimension)
+    return faiss.IndexIDMap2(base)
+
+
+def train_index(index, vectors: np.ndarray, max_train_points: int, seed: int = 1234):
+    """Train ``index`` on a random sample of at most ``max_train_points`` vectors."""
+    if index.is_trained:
+        return index
+    if len(vectors) > max_train_points:
+        rows = np.sort(np.random.default_rng(seed).choice(len(vectors), max_train_points, replace=False))
+        sample = np.ascontiguousarray(vectors[rows], dtype=np.float32)
+    else:
+        sample = np.ascontiguousarray(vectors, dtype=np.float32)
+    index.train(sample)
+    return index
+
+
+def apply_search_params(index, config: IndexConfig):
+    """Set the recall/latency knobs that apply to this kind of index."""
+    if index is None:
+        return
+    parameters = faiss.ParameterSpace()
+    base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else index
+    if isinstance(base, faiss.IndexIVF):
+        parameters.set_index_parameter(index, 'nprobe', config.nprobe)
+    elif isinstance(base, faiss.IndexHNSW):
+        parameters.set_index_parameter(index, 'efSearch', config.ef_search)
+
+
+def describe_index(index) -> Optional[str]:
+    if index is None:
+        return None
+    base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else index
+    return type(base).__name__
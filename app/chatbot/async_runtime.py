@@ -0,0 +1,69 @@
+import asyncio
+import os
+import queue
+import threading
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional, TypeVar
+
+T = TypeVar('T')
+
+_DONE = object()
+
+
+class BackgroundEventLoop:
+    """An asyncio event loop running on a daemon thread.
+
+    Lets the synchronous Flask request path hand coroutines to a shared loop,
+    so network-bound model calls multiplex over one pooled client instead of
+    each holding its own connection.
+    """
+
+    _shared: Optional['BackgroundEventLoop'] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="model-event-loop", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def shared(cls) -> 'BackgroundEventLoop':
+        with cls._shared_lock:
+            # Threads do not survive fork, so each worker process gets its own loop
+            if cls._shared is None or cls._shared._pid != os.getpid():
+                cls._shared = cls()
+            return cls._shared
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """Run a coroutine on the loop and block until it finishes."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def iterate(self, agen_factory: Callable[[], AsyncIterator[T]],
+                timeout: Optional[float] = None) -> Iterator[T]:
+        """Consume an async iterator on the loop, yielding its items synchronously."""
+        items: "queue.Queue" = queue.Queue()
+
+        async def pump():
+            try:
+                async for item in agen_factory():
+                    items.put(item)
+            except BaseException as e:
+                items.put(e)
+            finally:
+                items.put(_DONE)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        try:
+            while True:
+                item = items.get(timeout=timeout)
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
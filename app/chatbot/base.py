@@ -1,18 +1,81 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from dataclasses import dataclass
+from typing import Iterator, List, Dict, Optional
+
+TRIAGE_LEVELS = ('urgent', 'non-urgent', 'seek_immediate_care')
+
+# The model's levels in the rule-based triage system's terms (see SYSTEM_PROMPT)
+MODEL_TRIAGE_LEVELS = {
+    'urgent': 'emergency',
+    'seek_immediate_care': 'urgent',
+    'non-urgent': 'non_urgent'
+}
+
+def parse_triage_level(text: str) -> str:
+    """Map free model output onto one of TRIAGE_LEVELS, defaulting to non-urgent."""
+    text = text.lower()
+    if "seek_immediate_care" in text:
+        return "seek_immediate_care"
+    elif "non-urgent" in text:
+        return "non-urgent"
+    elif "urgent" in text:
+        return "urgent"
+    return "non-urgent"
+
+@dataclass
+class ModelTurn:
+    """Everything a conversation turn needs from the model."""
+    reply: Optional[str]
+    triage_level: str
+    summary: str
 
 class BaseChatModel(ABC):
+    # Prompt tokens the backend accepts, leaving room for the reply
+    MAX_INPUT_TOKENS = 4096
+
     @abstractmethod
     def generate_response(self, messages: List[Dict[str, str]]) -> str:
         """Generate a response based on the conversation history."""
         pass
 
+    def stream_response(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """Yield the response in pieces as it is generated.
+
+        Backends that cannot stream fall back to yielding the full response once.
+        """
+        yield self.generate_response(messages)
+
     @abstractmethod
-    def generate_summary(self, messages: List[Dict[str, str]]) -> str:
-        """Generate a summary of the conversation."""
+    def generate_summary(self, messages: List[Dict[str, str]], running_summary: Optional[str] = None) -> str:
+        """Generate a summary of the conversation, extending ``running_summary`` if given."""
         pass
 
     @abstractmethod
     def determine_triage_level(self, messages: List[Dict[str, str]]) -> str:
         """Determine the urgency level of the medical situation."""
         pass
+
+    def count_tokens(self, text: str) -> int:
+        """Number of prompt tokens ``text`` takes; a rough estimate unless the backend has a tokenizer."""
+        return len(text) // 4 + 1
+
+    def generate_turn(self, messages: List[Dict[str, str]],
+                      running_summary: Optional[str] = None,
+                      include_reply: bool = True) -> ModelTurn:
+        """Reply, triage level and updated summary for the conversation in one go.
+
+        ``running_summary`` is the summary from an earlier turn, to be extended
+        rather than rewritten. Without ``include_reply`` only the triage level
+        and summary are produced. This default makes three separate calls;
+        backends override it to share one pass over the conversation.
+        """
+        reply = None
+        transcript = messages
+        if include_reply:
+            reply = self.generate_response(messages)
+            transcript = messages + [{"role": "assistant", "content": reply}]
+        return ModelTurn(
+            reply=reply,
+            triage_level=parse_triage_level(self.determine_triage_level(transcript)),
+            summary=self.generate_summary(transcript, running_summary)
+        )
@@ -0,0 +1,103 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from .risk_assessment import RiskAssessment
+from .symptom_keywords import symptom_ids, symptom_phrases
+from .triage_system import TRIAGE_LEVELS, AdvancedTriageSystem
+
+def _parse_record(record) -> Tuple[object, List[str], Dict[str, float]]:
+    """``(id, symptoms, patient factors)`` from one input record, or ValueError."""
+    if not isinstance(record, dict):
+        raise ValueError("record must be an object")
+    symptoms = record.get('symptoms') or []
+    if isinstance(symptoms, str) or not all(isinstance(symptom, str) for symptom in symptoms):
+        raise ValueError("symptoms must be a list of strings")
+    factors = record.get('risk_factors') or {}
+    if isinstance(factors, list):
+        factors = {factor: 1.0 for factor in factors}
+    if not isinstance(factors, dict):
+        raise ValueError("risk_factors must be a list or an object")
+    return record.get('id'), list(symptoms), {str(factor): float(value) for factor, value in factors.items()}
+
+class BatchTriageService:
+    """Scores large numbers of patient records for queue re-prioritization.
+
+    Records (``{"id", "symptoms", "risk_factors"}``, risk factors as a list or
+    a ``{factor: value}`` object) are read lazily and scored in chunks of
+    ``chunk_size`` with the vectorized triage and risk APIs. Up to ``workers``
+    chunks are scored at once on a thread pool while earlier results are
+    streamed out, in input order. Invalid records produce an error result
+    instead of failing the batch. Symptoms may be knowledge-base IDs
+    ("chest_pain") or free text ("chest pain"); the triage rules get them as
+    text and the risk model as IDs.
+    """
+
+    def __init__(self,
+                 triage_system: AdvancedTriageSystem,
+                 risk_assessor: RiskAssessment,
+                 chunk_size: Optional[int] = None,
+                 workers: Optional[int] = None):
+        self.triage_system = triage_system
+        self.risk_assessor = risk_assessor
+        self.chunk_size = chunk_size or int(os.environ.get("TRIAGE_BATCH_CHUNK_SIZE", 512))
+        self.workers = workers or int(os.environ.get("TRIAGE_BATCH_WORKERS", min(4, os.cpu_count() or 1)))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch-triage")
+
+    def score_chunk(self, records: List, rules=None) -> List[Dict]:
+        rules = rules or self.triage_system.rules
+        parsed, results = [], []
+        for record in records:
+            try:
+                parsed.append(_parse_record(record))
+                results.append(None)
+            except (ValueError, TypeError) as e:
+                results.append({'id': record.get('id') if isinstance(record, dict) else None, 'error': str(e)})
+
+        if parsed:
+            ids = [record_id for record_id, _, _ in parsed]
+            symptoms_batch = [symptoms for _, symptoms, _ in parsed]
+            factors_batch = [factors for _, _, factors in parsed]
+
+            scores = rules.score([symptom_phrases(symptoms) for symptoms in symptoms_batch],
+                                 [list(factors) for factors in factors_batch])
+            risks = self.risk_assessor.calculate_risk_scores([symptom_ids(symptoms) for symptoms in symptoms_batch],
+                                                            factors_batch)
+            red_flag_hits = scores.rule_hits & rules.rule_is_emergency
+            levels = scores.levels.tolist()
+            confidence = scores.confidence.tolist()
+            totals = scores.scores.tolist()
+
+            scored = iter(range(len(parsed)))
+            for position, result in enumerate(results):
+                if result is not None:
+                    continue
+                row = next(scored)
+                results[position] = {
+                    'id': ids[row],
+                    'triage_level': TRIAGE_LEVELS[levels[row]],
+                    'confidence': round(confidence[row], 3),
+                    'triage_score': round(totals[row], 2),
+                    'red_flags': [rules.rule_names[rule] for rule in np.flatnonzero(red_flag_hits[row])],
+                    'risk': risks[row],
+                    'rules_version': scores.rules_version
+                }
+        return results
+
+    def score_records(self, records: Iterable) -> Iterator[Dict]:
+        """Yield one result per record, in input order, while later chunks are scored."""
+        # The whole batch is scored with the rules in force when it started
+        rules = self.triage_system.rules
+        records = iter(records)
+        pending = deque()
+        while True:
+            while len(pending) < self.workers:
+                chunk = list(islice(records, self.chunk_size))
+                if not chunk:
+                    break
+                pending.append(self._executor.submit(self.score_chunk, chunk, rules))
+            if not pending:
+                return
+            yield from pending.popleft().result()
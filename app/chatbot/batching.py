@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class MicroBatcher:
+    """Groups concurrent requests into batches run by one worker thread.
+
+    ``submit`` blocks the calling thread until its result is ready. The worker
+    takes the oldest waiting request, then keeps collecting requests of the
+    same group (e.g. the same generation task) until ``max_batch_size`` is
+    reached or ``max_wait_ms`` has passed since the first one arrived, and
+    runs them with one ``run_batch(group, items)`` call. Requests of other
+    groups wait for the next batch in arrival order. A request submitted with
+    ``alone=True`` is run by itself as soon as it is the oldest, with no
+    collection wait, and its result is set as soon as it finishes. A result
+    that is an exception is raised to its own caller only.
+    """
+
+    def __init__(self,
+                 run_batch: Callable[[Hashable, List[Any]], List[Any]],
+                 max_batch_size: Optional[int] = None,
+                 max_wait_ms: Optional[float] = None,
+                 name: str = "micro-batcher"):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size or int(os.environ.get("LOCAL_MODEL_MAX_BATCH_SIZE", 8))
+        wait_ms = max_wait_ms if max_wait_ms is not None else float(os.environ.get("LOCAL_MODEL_MAX_BATCH_WAIT_MS", 10))
+        self.max_wait = wait_ms / 1000.0
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self.batches = 0
+        self.items = 0
+        self._thread = threading.Thread(target=self._worker, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any, group: Hashable = None, timeout: Optional[float] = None) -> Any:
+        return self.submit_nowait(item, group).result(timeout)
+
+    def submit_nowait(self, item: Any, group: Hashable = None, alone: bool = False) -> Future:
+        """Queue ``item`` and return a Future for its result instead of waiting."""
+        future = Future()
+        with self._condition:
+            self._pending.append((group, item, future, alone))
+            self._condition.notify()
+        return future
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000
+        }
+
+    def _take_group(self, group: Hashable, batch: List, limit: int):
+        """Move waiting requests of ``group`` into ``batch``, keeping others in order."""
+        others = deque()
+        while self._pending and len(batch) < limit:
+            entry = self._pending.popleft()
+            (batch if entry[0] == group and not entry[3] else others).append(entry)
+        others.extend(self._pending)
+        self._pending = others
+
+    def _collect(self) -> List:
+        with self._condition:
+            while not self._pending:
+                self._condition.wait()
+            first = self._pending.popleft()
+            batch = [first]
+            if first[3]:
+                return batch
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                self._take_group(first[0], batch, self.max_batch_size)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.max_batch_size or remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect()
+            group = batch[0][0]
+            live = [(item, future) for _, item, future, _ in batch if future.set_running_or_notify_cancel()]
+            if not live:
+                continue
+            try:
+                results = self.run_batch(group, [item for item, _ in live])
+                for (_, future), result in zip(live, results):
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+            except Exception as e:
+                for _, future in live:
+                    future.set_exception(e)
+            self.batches += 1
+            self.items += len(live)
@@ -0,0 +1,71 @@
+from typing import Callable, Dict, List, Optional
+
+
+class ContextBudget:
+    """Decides which turns of a conversation the model sees verbatim.
+
+    The system prompt and the newest turns are always sent as they are; the
+    rest of the ``max_tokens`` prompt budget is shared by the running summary
+    (``summary_tokens``) and the task instructions (``reserve_tokens``).
+    Once the verbatim turns no longer fit, the oldest ones are handed over to
+    the summary until the remaining turns use at most ``keep_ratio`` of the
+    budget, so the summary is only updated every few turns rather than on
+    every one.
+    """
+
+    # Rough per-message overhead for role markers and separators
+    MESSAGE_OVERHEAD = 4
+
+    def __init__(self,
+                 count_tokens: Callable[[str], int],
+                 max_tokens: int,
+                 reserve_tokens: int = 64,
+                 summary_tokens: int = 256,
+                 keep_ratio: float = 0.6,
+                 min_recent: int = 2):
+        self.count_tokens = count_tokens
+        self.max_tokens = max_tokens
+        self.reserve_tokens = reserve_tokens
+        self.summary_tokens = summary_tokens
+        self.keep_ratio = keep_ratio
+        self.min_recent = min_recent
+
+    def message_tokens(self, message: Dict[str, str]) -> int:
+        return self.count_tokens(message["content"]) + self.MESSAGE_OVERHEAD
+
+    def available(self, system_messages: List[Dict[str, str]], summary: Optional[str] = None) -> int:
+        """Tokens left for verbatim turns next to the system prompt and the summary."""
+        summary_tokens = max(self.summary_tokens, self.count_tokens(summary) if summary else 0)
+        system_tokens = sum(self.message_tokens(message) for message in system_messages)
+        return self.max_tokens - self.reserve_tokens - system_tokens - summary_tokens
+
+    def plan(self,
+             system_messages: List[Dict[str, str]],
+             transcript: List[Dict[str, str]],
+             summarized: int = 0,
+             summary: Optional[str] = None) -> int:
+        """Index of the first ``transcript`` message to send verbatim.
+
+        Messages before ``summarized`` are already in the summary. A returned
+        index above it means the messages in between must be summarized too.
+        The last ``min_recent`` messages are always kept.
+        """
+        available = self.available(system_messages, summary)
+        costs = [self.message_tokens(message) for message in transcript[summarized:]]
+        if sum(costs) <= available:
+            return summarized
+
+        if available < 0:
+            # Only the newest messages are kept; the backend trims whatever still does not fit
+            print(f"System prompt and summary are {-available} tokens over the {self.max_tokens}-token "
+                  f"budget; keeping only the last {self.min_recent} messages")
+        target = max(available, 0) * self.keep_ratio
+        start = len(costs)
+        used = 0
+        while start > 0:
+            cost = costs[start - 1]
+            if len(costs) - start >= self.min_recent and used + cost > target:
+                break
+            start -= 1
+            used += cost
+        return summarized + start
@@ -1,61 +1,130 @@
 import os
 from pathlib import Path
-from typing import List, Optional
-import fitz  # PyMuPDF
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.document_loaders import PyPDFLoader
+from typing import Dict, List, Optional
+import numpy as np
 from langchain.embeddings import HuggingFaceEmbeddings
-from langchain.vectorstores import FAISS
 import torch
+from ..cache import LRUCache
+from .ann_index import IndexConfig
+from .ingestion import IngestionPipeline, IngestionStats
+from .vector_store import PersistentVectorStore
 
 class DocumentProcessor:
-    def __init__(self, docs_dir: str = "attached_assets"):
+    EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+    CHUNK_SIZE = 1000
+    CHUNK_OVERLAP = 200
+
+    def __init__(self,
+                 docs_dir: str = "attached_assets",
+                 index_dir: Optional[str] = None,
+                 ingest_workers: Optional[int] = None,
+                 embed_batch_size: Optional[int] = None,
+                 index_config: Optional[IndexConfig] = None):
         self.docs_dir = Path(docs_dir)
+        self.index_dir = Path(index_dir or os.environ.get("VECTOR_INDEX_DIR", "vector_index"))
+        self.ingest_workers = ingest_workers or int(os.environ.get("INGEST_WORKERS", 0)) or None
+        self.embed_batch_size = embed_batch_size or int(os.environ.get("INGEST_BATCH_SIZE", 64))
         self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
+            model_name=self.EMBEDDING_MODEL,
             model_kwargs={'device': 'cuda' if torch.cuda.is_available() else 'cpu'}
         )
-        self.vector_store = None
+        self.last_ingestion: Optional[IngestionStats] = None
+
+        # Hot queries skip the embedding model and the index. Embeddings depend only on
+        # the model; retrieved chunk ids are dropped whenever the manifest changes.
+        cache_size = int(os.environ.get("QUERY_CACHE_SIZE", 1024))
+        cache_ttl = float(os.environ.get("QUERY_CACHE_TTL", 3600))
+        self.embedding_cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+        self.result_cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+        self._cached_fingerprint: Optional[str] = None
+        self.vector_store = PersistentVectorStore(self.index_dir, settings={
+            'embedding_model': self.EMBEDDING_MODEL,
+            'chunk_size': self.CHUNK_SIZE,
+            'chunk_overlap': self.CHUNK_OVERLAP
+        }, index_config=index_config or IndexConfig.from_env())
         self.initialize_vector_store()
 
     def initialize_vector_store(self):
-        """Initialize or load the vector store with medical documentation."""
+        """Load the persisted vector store and re-embed only added, changed or deleted PDFs."""
         if not self.docs_dir.exists():
             raise FileNotFoundError(f"Documents directory {self.docs_dir} not found")
 
-        documents = []
-        for pdf_file in self.docs_dir.glob("*.pdf"):
-            try:
-                loader = PyPDFLoader(str(pdf_file))
-                documents.extend(loader.load())
-            except Exception as e:
-                print(f"Error loading {pdf_file}: {str(e)}")
-
-        if documents:
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200,
-                length_function=len,
+        with self.vector_store.lock():
+            # Another worker may have refreshed the store while we waited for the lock
+            self.vector_store.load()
+            pdf_files = sorted(self.docs_dir.glob("*.pdf"))
+            to_embed, deleted, touched = self.vector_store.plan_update(pdf_files)
+            if not to_embed and not deleted and not touched:
+                if self.vector_store.index_outdated():
+                    # Index type or build parameters changed: rebuild from stored vectors
+                    self.vector_store.rebuild_index()
+                return
+
+            update = self.vector_store.begin_update(
+                deleted, [pdf_file.name for pdf_file in to_embed], touched)
+            pipeline = IngestionPipeline(
+                self.embeddings,
+                chunk_size=self.CHUNK_SIZE,
+                chunk_overlap=self.CHUNK_OVERLAP,
+                workers=self.ingest_workers,
+                batch_size=self.embed_batch_size
             )
-            texts = text_splitter.split_documents(documents)
-            
-            # Create vector store
-            self.vector_store = FAISS.from_documents(texts, self.embeddings)
+            try:
+                self.last_ingestion = pipeline.run(to_embed, update)
+                update.commit()
+            except Exception:
+                update.abort()
+                raise
+
+        stats = self.last_ingestion
+        if stats and stats.files:
+            print(f"Ingested {stats.files} PDFs: {stats.pages} pages, {stats.chunks} chunks "
+                  f"({stats.pages_per_second:.1f} pages/s, {stats.chunks_per_second:.1f} chunks/s)")
 
     def search_documentation(self, query: str, k: int = 3) -> List[str]:
         """Search the documentation for relevant context based on the query."""
-        if not self.vector_store:
+        if not len(self.vector_store):
             return []
 
-        results = self.vector_store.similarity_search(query, k=k)
-        return [doc.page_content for doc in results]
+        fingerprint = self.vector_store.fingerprint
+        if fingerprint != self._cached_fingerprint:
+            self.result_cache.clear()
+            self._cached_fingerprint = fingerprint
+
+        normalized = self.normalize_query(query)
+        chunk_ids = self.result_cache.get((normalized, k))
+        if chunk_ids is None:
+            query_vector = self.embedding_cache.get(normalized)
+            if query_vector is None:
+                query_vector = np.asarray(self.embeddings.embed_query(normalized), dtype=np.float32)
+                self.embedding_cache.set(normalized, query_vector)
+            chunk_ids = self.vector_store.search(query_vector, k)
+            self.result_cache.set((normalized, k), chunk_ids)
+        return self.vector_store.get_texts(chunk_ids)
+
+    def tune_search(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        """Trade recall for latency on IVF (nprobe) or HNSW (ef_search) indexes."""
+        self.vector_store.set_search_params(nprobe=nprobe, ef_search=ef_search)
+        self.result_cache.clear()
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Case- and whitespace-insensitive cache key (the embedding model is uncased)."""
+        return " ".join(query.lower().split())
+
+    def cache_stats(self) -> Dict[str, Dict]:
+        """Hit/miss counters for the query embedding and retrieval caches."""
+        return {
+            'embeddings': self.embedding_cache.stats(),
+            'results': self.result_cache.stats()
+        }
 
     def get_relevant_context(self, query: str) -> str:
         """Get relevant context from the documentation for a given query."""
         results = self.search_documentation(query)
         if not results:
             return "No relevant information found in the medical documentation."
-        
+
         # Combine the results into a single context string
         context = "\n\n".join(results)
         return f"Based on the medical documentation:\n\n{context}"
@@ -1,77 +1,42 @@
 import torch
 from transformers import AutoTokenizer, AutoModelForCausalLM
-from .base import BaseChatModel
+from .local_generation import LocalChatModel, LocalGenerator
 
-class HuggingFaceChatModel(BaseChatModel):
-    def __init__(self):
+class HuggingFaceChatModel(LocalChatModel):
+    MAX_INPUT_TOKENS = 512
+
+    # Generation settings per task; requests are only batched with the same task
+    GENERATION_CONFIGS = {
+        'response': {'max_new_tokens': 200, 'temperature': 0.7, 'do_sample': True},
+        'summary': {'max_new_tokens': 200, 'temperature': 0.7, 'do_sample': True},
+        'triage': {'max_new_tokens': 20, 'temperature': 0.1, 'do_sample': True},
+    }
+
+    REPLY_CUE = "assistant:"
+    REPLY_STOP = "\nuser:"
+    SUMMARY_CUE = "system: Summarize the medical conversation above.\nassistant:"
+    RUNNING_SUMMARY_CUE = "system: Summary so far: {summary}\nUpdate this summary with the newer messages above.\nassistant:"
+    TRIAGE_CUE = "system: Based on this medical conversation, respond with only one of these triage levels: urgent, non-urgent, or seek_immediate_care.\nassistant:"
+
+    def __init__(self, max_batch_size: int = None, max_batch_wait_ms: float = None, prefix_cache_entries: int = None):
         model_name = "microsoft/BioGPT-Large"  # Medical domain-specific model
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        # Decoder-only models need left padding so every prompt ends where generation starts
+        self.tokenizer.padding_side = "left"
         self.model = AutoModelForCausalLM.from_pretrained(model_name)
         if torch.cuda.is_available():
             self.model = self.model.cuda()
         self.model.eval()
-
-    def _format_messages(self, messages):
-        formatted_text = ""
-        for msg in messages:
-            role = msg["role"]
-            content = msg["content"]
-            formatted_text += f"{role}: {content}\n"
-        return formatted_text
-
-    def generate_response(self, messages):
-        input_text = self._format_messages(messages)
-        inputs = self.tokenizer(input_text, return_tensors="pt", max_length=512, truncation=True)
-        if torch.cuda.is_available():
-            inputs = inputs.to("cuda")
-
-        with torch.no_grad():
-            outputs = self.model.generate(
-                **inputs,
-                max_length=200,
-                num_return_sequences=1,
-                temperature=0.7,
-                do_sample=True
-            )
-
-        response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-        return response.split("assistant:")[-1].strip()
-
-    def generate_summary(self, messages):
-        summary_prompt = "Summarize the following medical conversation:\n" + self._format_messages(messages)
-        inputs = self.tokenizer(summary_prompt, return_tensors="pt", max_length=512, truncation=True)
-        if torch.cuda.is_available():
-            inputs = inputs.to("cuda")
-
-        with torch.no_grad():
-            outputs = self.model.generate(
-                **inputs,
-                max_length=200,
-                num_return_sequences=1,
-                temperature=0.7,
-                do_sample=True
-            )
-
-        return self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-
-    def determine_triage_level(self, messages):
-        triage_prompt = "Based on this medical conversation, respond with only one of these triage levels: urgent, non-urgent, or seek_immediate_care.\n" + self._format_messages(messages)
-        inputs = self.tokenizer(triage_prompt, return_tensors="pt", max_length=512, truncation=True)
-        if torch.cuda.is_available():
-            inputs = inputs.to("cuda")
-
-        with torch.no_grad():
-            outputs = self.model.generate(
-                **inputs,
-                max_length=20,
-                num_return_sequences=1,
-                temperature=0.1,
-                do_sample=True
-            )
-
-        response = self.tokenizer.decode(outputs[0], skip_special_tokens=True).lower()
-        if "urgent" in response:
-            return "urgent"
-        elif "seek_immediate_care" in response:
-            return "seek_immediate_care"
-        return "non-urgent"
+        self.generator = LocalGenerator(
+            self.model,
+            self.tokenizer,
+            self.GENERATION_CONFIGS,
+            max_input_tokens=self.MAX_INPUT_TOKENS,
+            max_batch_size=max_batch_size,
+            max_batch_wait_ms=max_batch_wait_ms,
+            prefix_cache_entries=prefix_cache_entries,
+            name="biogpt-batcher"
+        )
+
+    def _format_message(self, role, content):
+        return f"{role}: {content}\n"
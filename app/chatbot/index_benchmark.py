@@ -0,0 +1,121 @@
+"""Offline recall/latency benchmark for the documentation vector index.
+
+Compares each approximate index type against exact (flat) search over the
+vectors already stored in the vector index directory:
+
+    python -m app.chatbot.index_benchmark --index-dir vector_index --k 10 --queries 200
+
+Queries are sampled from the stored chunk vectors. For every index type the
+benchmark reports build time, index size and, for each nprobe/efSearch value,
+recall@k and mean query latency.
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence
+import faiss
+import numpy as np
+from .ann_index import INDEX_TYPES, IndexConfig, apply_search_params, create_index, describe_index, train_index
+from .vector_store import PersistentVectorStore
+
+NPROBE_SWEEP = (1, 4, 16, 64)
+EF_SEARCH_SWEEP = (16, 32, 64, 128)
+
+
+def load_vectors(index_dir: Path) -> np.ndarray:
+    generation_dir = PersistentVectorStore.current_generation(index_dir)
+    if generation_dir is None:
+        return np.zeros((0, 0), dtype=np.float32)
+    with open(generation_dir / PersistentVectorStore.MANIFEST_FILE, 'r') as f:
+        manifest = json.load(f)
+    count = len(np.load(generation_dir / PersistentVectorStore.IDS_FILE))
+    if not count:
+        return np.zeros((0, manifest['dimension']), dtype=np.float32)
+    return np.memmap(generation_dir / PersistentVectorStore.VECTORS_FILE, dtype=np.float32, mode='r',
+                     shape=(count, manifest['dimension']))
+
+
+def recall_at_k(found: np.ndarray, expected: np.ndarray) -> float:
+    k = expected.shape[1]
+    hits = sum(len(set(f[f != -1]) & set(e)) for f, e in zip(found, expected))
+    return hits / (k * len(expected))
+
+
+def benchmark(vectors: np.ndarray,
+              queries: np.ndarray,
+              k: int,
+              index_types: Sequence[str] = INDEX_TYPES,
+              base_config: IndexConfig = None) -> List[Dict]:
+    base_config = base_config or IndexConfig()
+    ids = np.arange(len(vectors), dtype=np.int64)
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(np.ascontiguousarray(vectors, dtype=np.float32))
+    _, expected = exact.search(queries, k)
+
+    results = []
+    for index_type in index_types:
+        config = IndexConfig(**{**base_config.__dict__, 'index_type': index_type})
+        started = time.perf_counter()
+        index = train_index(create_index(config, len(vectors), vectors.shape[1]), vectors, config.max_train_points)
+        index.add_with_ids(np.ascontiguousarray(vectors, dtype=np.float32), ids)
+        build_seconds = time.perf_counter() - started
+        size_mb = faiss.serialize_index(index).nbytes / 2 ** 20
+        kind = describe_index(index)
+
+        if 'IVF' in kind:
+            sweep = [('nprobe', value) for value in NPROBE_SWEEP]
+        elif 'HNSW' in kind:
+            sweep = [('ef_search', value) for value in EF_SEARCH_SWEEP]
+        else:
+            sweep = [(None, None)]
+
+        for knob, value in sweep:
+            if knob:
+                setattr(config, knob, value)
+                apply_search_params(index, config)
+            started = time.perf_counter()
+            _, found = index.search(queries, k)
+            latency_ms = (time.perf_counter() - started) * 1000 / len(queries)
+            results.append({
+                'index_type': index_type,
+                'index': kind,
+                'knob': knob,
+                'value': value,
+                f'recall@{k}': round(recall_at_k(found, expected), 4),
+                'latency_ms': round(latency_ms, 4),
+                'build_seconds': round(build_seconds, 2),
+                'size_mb': round(size_mb, 2)
+            })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--index-dir', default='vector_index')
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--types', default=','.join(INDEX_TYPES))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    vectors = load_vectors(Path(args.index_dir))
+    if not len(vectors):
+        parser.error(f"No vectors found in {args.index_dir}")
+
+    rng = np.random.default_rng(args.seed)
+    rows = np.sort(rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False))
+    queries = np.ascontiguousarray(vectors[rows], dtype=np.float32)
+    k = min(args.k, len(vectors))
+
+    results = benchmark(vectors, queries, k, args.types.split(','), IndexConfig.from_env())
+    print(f"{len(vectors)} vectors, {len(queries)} queries, k={k}")
+    print(f"{'type':<7}{'index':<15}{'knob':<11}{'value':>6}{'recall@k':>10}{'ms/query':>10}{'build s':>9}{'MB':>9}")
+    for row in results:
+        print(f"{row['index_type']:<7}{row['index']:<15}{row['knob'] or '-':<11}{row['value'] or '-':>6}"
+              f"{row[f'recall@{k}']:>10.4f}{row['latency_ms']:>10.4f}{row['build_seconds']:>9.2f}{row['size_mb']:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .vector_store import VectorStoreUpdate, file_sha256
+
+@dataclass
+class IngestionStats:
+    files: int = 0
+    pages: int = 0
+    chunks: int = 0
+    failed: List[str] = field(default_factory=list)
+    parse_seconds: float = 0.0  # time spent waiting on parsing, not summed worker time
+    embed_seconds: float = 0.0
+    total_seconds: float = 0.0
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.total_seconds if self.total_seconds else 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.total_seconds if self.total_seconds else 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            'files': self.files,
+            'pages': self.pages,
+            'chunks': self.chunks,
+            'failed': list(self.failed),
+            'parse_seconds': round(self.parse_seconds, 3),
+            'embed_seconds': round(self.embed_seconds, 3),
+            'total_seconds': round(self.total_seconds, 3),
+            'pages_per_second': round(self.pages_per_second, 1),
+            'chunks_per_second': round(self.chunks_per_second, 1)
+        }
+
+
+def parse_pdf(path: str, chunk_size: int, chunk_overlap: int) -> Tuple[Dict, int, List[str]]:
+    """Extract and split one PDF. Runs inside a worker process.
+
+    Returns the manifest entry for the file, its page count and its chunks.
+    Pages are split independently, as they were with one document per page.
+    """
+    import fitz  # PyMuPDF
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    pdf_file = Path(path)
+    stat = pdf_file.stat()
+    entry = {
+        'sha256': file_sha256(pdf_file),
+        'mtime': stat.st_mtime,
+        'size': stat.st_size
+    }
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+    )
+    chunks = []
+    with fitz.open(path) as document:
+        page_count = document.page_count
+        for page in document:
+            text = page.get_text()
+            if text.strip():
+                chunks.extend(splitter.split_text(text))
+    return entry, page_count, chunks
+
+
+class IngestionPipeline:
+    """Parses PDFs in a process pool and embeds their chunks in fixed-size batches.
+
+    At most ``max_pending`` parsed files and one embedding batch are held in
+    memory at a time; embedded batches are streamed straight into a
+    ``VectorStoreUpdate``.
+    """
+
+    def __init__(self,
+                 embeddings,
+                 chunk_size: int,
+                 chunk_overlap: int,
+                 workers: Optional[int] = None,
+                 batch_size: int = 64,
+                 max_pending: Optional[int] = None):
+        self.embeddings = embeddings
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.max_pending = max_pending or 2 * self.workers
+
+    def run(self, pdf_files: List[Path], update: VectorStoreUpdate) -> IngestionStats:
+        stats = IngestionStats()
+        started = time.perf_counter()
+        batch: List[str] = []
+
+        for pdf_file, result, parse_seconds in self._parse_all(pdf_files):
+            stats.parse_seconds += parse_seconds
+            if isinstance(result, Exception):
+                print(f"Error loading {pdf_file}: {str(result)}")
+                stats.failed.append(pdf_file.name)
+                continue
+
+            entry, page_count, chunks = result
+            update.add_file(pdf_file.name, entry, len(chunks))
+            stats.files += 1
+            stats.pages += page_count
+            stats.chunks += len(chunks)
+
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= self.batch_size:
+                    stats.embed_seconds += self._embed_batch(batch, update)
+                    batch = []
+
+        if batch:
+            stats.embed_seconds += self._embed_batch(batch, update)
+        stats.total_seconds = time.perf_counter() - started
+        return stats
+
+    def _embed_batch(self, texts: List[str], update: VectorStoreUpdate) -> float:
+        started = time.perf_counter()
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        update.add_chunks(texts, vectors)
+        return time.perf_counter() - started
+
+    def _parse_all(self, pdf_files: List[Path]):
+        """Yield ``(file, result or exception, seconds waited)`` in input order."""
+        if self.workers <= 1 or len(pdf_files) <= 1:
+            for pdf_file in pdf_files:
+                started = time.perf_counter()
+                try:
+                    result = parse_pdf(str(pdf_file), self.chunk_size, self.chunk_overlap)
+                except Exception as e:
+                    result = e
+                yield pdf_file, result, time.perf_counter() - started
+            return
+
+        # spawn rather than fork: the parent usually has torch threads running
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(pdf_files)),
+                                 mp_context=get_context('spawn')) as executor:
+            def submit(pdf_file: Path):
+                future = executor.submit(parse_pdf, str(pdf_file), self.chunk_size, self.chunk_overlap)
+                pending.append((pdf_file, future))
+
+            pending = deque()
+            files = iter(pdf_files)
+            for pdf_file in files:
+                submit(pdf_file)
+                if len(pending) >= self.max_pending:
+                    break
+
+            while pending:
+                pdf_file, future = pending.popleft()
+                started = time.perf_counter()
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = e
+                waited = time.perf_counter() - started
+
+                next_file = next(files, None)
+                if next_file is not None:
+                    submit(next_file)
+                yield pdf_file, result, waited
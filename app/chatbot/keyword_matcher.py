@@ -0,0 +1,59 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List
+from ..trie import trie_insert, trie_pattern
+
+
+@dataclass(frozen=True)
+class KeywordMatch:
+    label: str
+    keyword: str
+    start: int
+    end: int
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    trie: Dict = {}
+    for word in words:
+        trie_insert(trie, word)
+    return trie_pattern(trie)
+
+
+class KeywordMatcher:
+    """Finds every keyword of a ``label -> keywords`` table in one scan.
+
+    All keywords are compiled into a single case-insensitive regex that only
+    matches whole words, so "asthma" matches "Asthma." but not "asthmatic".
+    Each hit reports the label it belongs to and its span in the text. Where
+    keywords start at the same position the longest one wins.
+    """
+
+    def __init__(self, table: Dict[str, Iterable[str]]):
+        self.labels_in_order = list(table)
+        self._keyword_labels: Dict[str, List[str]] = {}
+        for label, keywords in table.items():
+            for keyword in keywords:
+                self._keyword_labels.setdefault(keyword.lower(), []).append(label)
+
+        # The lookahead lets keywords overlap, e.g. "chest pain" and "pain"
+        self._pattern = re.compile(
+            r'(?<!\w)(?=(' + _trie_pattern(self._keyword_labels) + r')(?!\w))',
+            re.IGNORECASE
+        ) if self._keyword_labels else None
+
+    def finditer(self, text: str) -> Iterator[KeywordMatch]:
+        if self._pattern is None:
+            return
+        for match in self._pattern.finditer(text):
+            keyword = match.group(1).lower()
+            for label in self._keyword_labels.get(keyword, ()):
+                yield KeywordMatch(label, keyword, match.start(1), match.end(1))
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """All keyword hits in ``text``, in the order they appear."""
+        return list(self.finditer(text))
+
+    def labels(self, text: str) -> List[str]:
+        """Labels with at least one hit in ``text``, in table order."""
+        found = {match.label for match in self.finditer(text)}
+        return [label for label in self.labels_in_order if label in found]
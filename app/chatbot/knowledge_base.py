@@ -0,0 +1,260 @@
+import hashlib
+import json
+import os
+import threading
+from collections.abc import Mapping
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix
+
+# Bump when the compiled layout changes, so old artifacts are not reused
+FORMAT_VERSION = 1
+
+class Severity(Enum):
+    LOW = 1
+    MODERATE = 2
+    HIGH = 3
+    CRITICAL = 4
+
+@dataclass
+class Symptom:
+    id: str
+    name: str
+    category: str
+    severity: Severity
+    related_conditions: List[str]
+    risk_factors: Dict[str, float]
+    temporal_patterns: Dict[str, float] = None  # Time-based patterns
+    interaction_patterns: Dict[str, float] = None  # Symptom interactions
+
+class KnowledgeBase:
+    """Read-only, array-backed symptom knowledge base.
+
+    Symptoms are rows. Ids, names, categories, conditions and risk factors are
+    interned into string tables; severities and category ids are arrays, and
+    conditions and weighted risk factors are CSR adjacency arrays
+    (``*_indptr`` / ``*_indices``). A compiled knowledge base is saved as one
+    ``.npy`` file per array and loaded with ``mmap_mode='r'``, so every worker
+    process on a node maps the same pages instead of holding its own copy.
+    """
+
+    ARRAYS = (
+        'severity',
+        'category_ids',
+        'condition_indptr',
+        'condition_indices',
+        'factor_indptr',
+        'factor_indices',
+        'factor_weights'
+    )
+    STRINGS_FILE = "strings.json"
+
+    def __init__(self, strings: Dict, arrays: Dict[str, np.ndarray], fingerprint: str):
+        self.ids: List[str] = strings['ids']
+        self.names: List[str] = strings['names']
+        self.categories: List[str] = strings['categories']
+        self.conditions: List[str] = strings['conditions']
+        self.factors: List[str] = strings['factors']
+        # Temporal and interaction patterns, only for the symptoms that have them
+        self.patterns: Dict[str, Dict[str, Dict[str, float]]] = strings.get('patterns', {})
+        self.fingerprint = fingerprint
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.index = {symptom_id: row for row, symptom_id in enumerate(self.ids)}
+        self.factor_index = {factor: column for column, factor in enumerate(self.factors)}
+        self.symptoms = SymptomTable(self)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_records(cls, records: List[Dict], fingerprint: Optional[str] = None) -> 'KnowledgeBase':
+        """Compile symptom records in the ``medical_knowledge.json`` format."""
+        if fingerprint is None:
+            fingerprint = hashlib.sha256(json.dumps(records, sort_keys=True).encode('utf-8')).hexdigest()
+
+        categories: Dict[str, int] = {}
+        conditions: Dict[str, int] = {}
+        factors: Dict[str, int] = {}
+        ids, names, patterns = [], [], {}
+        severity, category_ids = [], []
+        condition_indptr, condition_indices = [0], []
+        factor_indptr, factor_indices, factor_weights = [0], [], []
+        for record in records:
+            ids.append(record['id'])
+            names.append(record['name'])
+            severity.append(Severity[record['severity'].upper()].value)
+            category_ids.append(categories.setdefault(record['category'], len(categories)))
+            # Conditions are a set: a repeated condition is only shared once
+            for condition in dict.fromkeys(record['related_conditions']):
+                condition_indices.append(conditions.setdefault(condition, len(conditions)))
+            condition_indptr.append(len(condition_indices))
+            for factor, weight in record['risk_factors'].items():
+                factor_indices.append(factors.setdefault(factor, len(factors)))
+                factor_weights.append(weight)
+            factor_indptr.append(len(factor_indices))
+            extra = {
+                key: record[key] for key in ('temporal_patterns', 'interaction_patterns') if record.get(key)
+            }
+            if extra:
+                patterns[record['id']] = extra
+
+        strings = {
+            'ids': ids,
+            'names': names,
+            'categories': list(categories),
+            'conditions': list(conditions),
+            'factors': list(factors),
+            'patterns': patterns
+        }
+        arrays = {
+            'severity': np.array(severity, dtype=np.int8),
+            'category_ids': np.array(category_ids, dtype=np.int32),
+            'condition_indptr': np.array(condition_indptr, dtype=np.int64),
+            'condition_indices': np.array(condition_indices, dtype=np.int32),
+            'factor_indptr': np.array(factor_indptr, dtype=np.int64),
+            'factor_indices': np.array(factor_indices, dtype=np.int32),
+            'factor_weights': np.array(factor_weights, dtype=np.float64)
+        }
+        for array in arrays.values():
+            array.setflags(write=False)
+        return cls(strings, arrays, fingerprint)
+
+    @classmethod
+    def load(cls, directory: Path) -> 'KnowledgeBase':
+        """Memory-map a knowledge base written by ``save``."""
+        with open(directory / cls.STRINGS_FILE, 'r', encoding='utf-8') as f:
+            strings = json.load(f)
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode='r') for name in cls.ARRAYS}
+        return cls(strings, arrays, strings['fingerprint'])
+
+    def save(self, directory: Path):
+        """Write the compiled arrays next to each other and swap the directory in whole."""
+        directory.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = directory.parent / f".{directory.name}.{os.getpid()}.tmp"
+        tmp_dir.mkdir(exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(tmp_dir / f"{name}.npy", np.asarray(getattr(self, name)))
+        strings = {
+            'fingerprint': self.fingerprint,
+            'ids': self.ids,
+            'names': self.names,
+            'categories': self.categories,
+            'conditions': self.conditions,
+            'factors': self.factors,
+            'patterns': self.patterns
+        }
+        with open(tmp_dir / self.STRINGS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(strings, f)
+        try:
+            os.replace(tmp_dir, directory)
+        except OSError:
+            # Another worker compiled the same source first
+            for path in tmp_dir.iterdir():
+                path.unlink()
+            tmp_dir.rmdir()
+
+    def condition_incidence(self) -> csr_matrix:
+        """Binary symptom-by-condition matrix."""
+        return csr_matrix(
+            (np.ones(len(self.condition_indices)), self.condition_indices, self.condition_indptr),
+            shape=(len(self), len(self.conditions))
+        )
+
+    def factor_matrix(self) -> csr_matrix:
+        """Symptom-by-risk-factor weight matrix."""
+        return csr_matrix(
+            (self.factor_weights, self.factor_indices, self.factor_indptr),
+            shape=(len(self), len(self.factors))
+        )
+
+    def risk_factors(self, row: int) -> Dict[str, float]:
+        start, end = self.factor_indptr[row], self.factor_indptr[row + 1]
+        return {
+            self.factors[column]: weight
+            for column, weight in zip(self.factor_indices[start:end].tolist(), self.factor_weights[start:end].tolist())
+        }
+
+    def related_conditions(self, row: int) -> List[str]:
+        start, end = self.condition_indptr[row], self.condition_indptr[row + 1]
+        return [self.conditions[column] for column in self.condition_indices[start:end].tolist()]
+
+    def symptom(self, row: int) -> Symptom:
+        symptom_id = self.ids[row]
+        patterns = self.patterns.get(symptom_id, {})
+        return Symptom(
+            id=symptom_id,
+            name=self.names[row],
+            category=self.categories[self.category_ids[row]],
+            severity=Severity(int(self.severity[row])),
+            related_conditions=self.related_conditions(row),
+            risk_factors=self.risk_factors(row),
+            temporal_patterns=patterns.get('temporal_patterns', {}),
+            interaction_patterns=patterns.get('interaction_patterns', {})
+        )
+
+class SymptomTable(Mapping):
+    """``symptom id -> Symptom`` view of a KnowledgeBase, built on access."""
+
+    def __init__(self, knowledge_base: KnowledgeBase):
+        self._knowledge_base = knowledge_base
+
+    def __getitem__(self, symptom_id: str) -> Symptom:
+        return self._knowledge_base.symptom(self._knowledge_base.index[symptom_id])
+
+    def __contains__(self, symptom_id) -> bool:
+        return symptom_id in self._knowledge_base.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._knowledge_base.ids)
+
+    def __len__(self) -> int:
+        return len(self._knowledge_base)
+
+def compile_knowledge_base(path: str, cache_dir: Optional[str] = None) -> KnowledgeBase:
+    """Compiled knowledge base for the JSON file at ``path``.
+
+    The artifact lives in ``cache_dir`` (KNOWLEDGE_BASE_CACHE_DIR, default
+    ``knowledge_base_cache``) under a hash of the source file, so it is only
+    rebuilt when the JSON changes.
+    """
+    with open(path, 'rb') as f:
+        source = f.read()
+    fingerprint = hashlib.sha256(f"{FORMAT_VERSION}:".encode('ascii') + source).hexdigest()
+    cache_dir = Path(cache_dir or os.environ.get("KNOWLEDGE_BASE_CACHE_DIR", "knowledge_base_cache"))
+    directory = cache_dir / f"kb-{fingerprint}"
+
+    if directory.exists():
+        try:
+            return KnowledgeBase.load(directory)
+        except Exception as e:
+            print(f"Error loading compiled knowledge base: {str(e)}")
+
+    knowledge_base = KnowledgeBase.from_records(json.loads(source)['symptoms'], fingerprint)
+    try:
+        knowledge_base.save(directory)
+        return KnowledgeBase.load(directory)
+    except OSError as e:
+        print(f"Error saving compiled knowledge base: {str(e)}")
+        return knowledge_base
+
+_knowledge_bases: Dict[str, Tuple[Tuple[int, int], KnowledgeBase]] = {}
+_knowledge_bases_lock = threading.Lock()
+
+def open_knowledge_base(path: str) -> KnowledgeBase:
+    """Knowledge base for ``path``, shared by every caller in the process while the file is unchanged."""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _knowledge_bases_lock:
+        cached = _knowledge_bases.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+    knowledge_base = compile_knowledge_base(path)
+    with _knowledge_bases_lock:
+        _knowledge_bases[path] = (key, knowledge_base)
+    return knowledge_base
@@ -1,9 +1,25 @@
 import torch
 from transformers import pipeline
-from .base import BaseChatModel
-
-class LlamaChatModel(BaseChatModel):
-    def __init__(self):
+from .local_generation import LocalChatModel, LocalGenerator
+
+class LlamaChatModel(LocalChatModel):
+    # 4096-token context, minus room for the longest reply
+    MAX_INPUT_TOKENS = 3584
+
+    # Generation settings per task; requests are only batched with the same task
+    GENERATION_CONFIGS = {
+        'response': {'max_new_tokens': 500, 'temperature': 0.7, 'do_sample': True},
+        'summary': {'max_new_tokens': 200, 'temperature': 0.7, 'do_sample': True},
+        'triage': {'max_new_tokens': 20, 'temperature': 0.1, 'do_sample': True},
+    }
+
+    REPLY_CUE = "<assistant>"
+    REPLY_STOP = "</assistant>"
+    SUMMARY_CUE = "<system>Summarize the medical conversation and key points discussed.</system><assistant>"
+    RUNNING_SUMMARY_CUE = "<system>Summary so far: {summary} Update this summary with the newer messages and key points discussed.</system><assistant>"
+    TRIAGE_CUE = "<system>Based on the conversation, determine the triage level. Respond with only: urgent, non-urgent, or seek_immediate_care.</system><assistant>"
+
+    def __init__(self, max_batch_size: int = None, max_batch_wait_ms: float = None, prefix_cache_entries: int = None):
         model_name = "meta-llama/Llama-2-7b-chat-hf"
         self.pipeline = pipeline(
             "text-generation",
@@ -11,48 +27,18 @@ class LlamaChatModel(BaseChatModel):
             torch_dtype=torch.float16,
             device_map="auto"
         )
+        # Llama ships without a pad token; batched generation pads on the left
+        self.pipeline.tokenizer.padding_side = "left"
+        self.generator = LocalGenerator(
+            self.pipeline.model,
+            self.pipeline.tokenizer,
+            self.GENERATION_CONFIGS,
+            max_input_tokens=self.MAX_INPUT_TOKENS,
+            max_batch_size=max_batch_size,
+            max_batch_wait_ms=max_batch_wait_ms,
+            prefix_cache_entries=prefix_cache_entries,
+            name="llama-batcher"
+        )
 
-    def _format_messages(self, messages):
-        formatted_text = ""
-        for msg in messages:
-            role = msg["role"]
-            content = msg["content"]
-            formatted_text += f"<{role}>{content}</{role}>"
-        return formatted_text
-
-    def generate_response(self, messages):
-        prompt = self._format_messages(messages)
-        response = self.pipeline(
-            prompt,
-            max_length=500,
-            temperature=0.7,
-            num_return_sequences=1
-        )[0]["generated_text"]
-
-        return response.split("<assistant>")[-1].split("</assistant>")[0].strip()
-
-    def generate_summary(self, messages):
-        summary_prompt = "<system>Summarize the medical conversation and key points discussed.</system>" + self._format_messages(messages)
-        response = self.pipeline(
-            summary_prompt,
-            max_length=200,
-            temperature=0.7,
-            num_return_sequences=1
-        )[0]["generated_text"]
-
-        return response.split("<assistant>")[-1].split("</assistant>")[0].strip()
-
-    def determine_triage_level(self, messages):
-        triage_prompt = "<system>Based on the conversation, determine the triage level. Respond with only: urgent, non-urgent, or seek_immediate_care.</system>" + self._format_messages(messages)
-        response = self.pipeline(
-            triage_prompt,
-            max_length=20,
-            temperature=0.1,
-            num_return_sequences=1
-        )[0]["generated_text"].lower()
-
-        if "urgent" in response:
-            return "urgent"
-        elif "seek_immediate_care" in response:
-            return "seek_immediate_care"
-        return "non-urgent"
+    def _format_message(self, role, content):
+        return f"<{role}>{content}</{role}>"
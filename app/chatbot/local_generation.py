@@ -0,0 +1,254 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+import torch
+from transformers import TextIteratorStreamer
+from .base import BaseChatModel, ModelTurn, parse_triage_level
+from .batching import MicroBatcher
+from .prefix_cache import PrefixKVCache
+from .streaming import until_stop
+
+# Batcher group of streamed requests; each one runs on its own
+STREAM = 'stream'
+
+
+def as_model_cache(model, cache):
+    """``cache`` in the form ``model.generate`` expects for ``past_key_values``.
+
+    The prefix cache may hold legacy tuples (older transformers, or Cache
+    classes without ``crop``); models that use Cache objects get them wrapped.
+    """
+    if isinstance(cache, tuple) and getattr(model, '_supports_cache_class', False):
+        from transformers import DynamicCache
+        return DynamicCache.from_legacy_cache(cache)
+    return cache
+
+
+class LocalGenerator:
+    """Shared generation path for the local transformer backends.
+
+    Prompts are passed as text segments (one per message plus a final task
+    cue) and encoded segment by segment, so a conversation's earlier prompt is
+    always an exact token prefix of the next one. Every request, streamed or
+    not, runs on the MicroBatcher's worker thread, so the model only ever runs
+    one ``generate`` at a time. A request that runs on its own starts from the
+    longest cached prefix in ``prefix_cache`` and only computes the new tokens.
+    Concurrent requests are batched with padding and skip the prefix cache;
+    streamed requests are never batched.
+    """
+
+    def __init__(self,
+                 model,
+                 tokenizer,
+                 generation_configs: Dict[str, Dict],
+                 max_input_tokens: int,
+                 max_batch_size: Optional[int] = None,
+                 max_batch_wait_ms: Optional[float] = None,
+                 prefix_cache_entries: Optional[int] = None,
+                 name: str = "local-generator"):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.generation_configs = generation_configs
+        self.max_input_tokens = max_input_tokens
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.prefix_cache = PrefixKVCache(prefix_cache_entries)
+        self.batcher = MicroBatcher(
+            self._run_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_batch_wait_ms,
+            name=name
+        )
+
+    def encode(self, segments: List[str]) -> Tuple[List[int], List[int]]:
+        """Token ids for ``segments`` and the offset where each segment ends.
+
+        The first segment (the system prompt) and the last one (the task cue)
+        are always kept. When the prompt is too long, whole messages in between
+        are dropped from the front so the latest turns survive; only if the
+        system prompt and cue alone are too long is the system prompt cut short.
+        """
+        encoded = [
+            self.tokenizer(segment, add_special_tokens=(index == 0))["input_ids"]
+            for index, segment in enumerate(segments)
+        ]
+        lengths = [len(ids) for ids in encoded]
+        total = sum(lengths)
+        if total > self.max_input_tokens and len(encoded) > 1:
+            keep = [0, len(encoded) - 1]
+            used = lengths[0] + lengths[-1]
+            for index in range(len(encoded) - 2, 0, -1):
+                if used + lengths[index] > self.max_input_tokens:
+                    break
+                keep.append(index)
+                used += lengths[index]
+            if len(keep) < len(encoded):
+                print(f"Prompt of {total} tokens is over the {self.max_input_tokens}-token limit; "
+                      f"dropped {len(encoded) - len(keep)} of {len(encoded) - 2} messages")
+            encoded = [encoded[index] for index in sorted(keep)]
+            if used > self.max_input_tokens and lengths[-1] < self.max_input_tokens:
+                print(f"System prompt of {lengths[0]} tokens cut to fit the {self.max_input_tokens}-token limit")
+                encoded[0] = encoded[0][:self.max_input_tokens - lengths[-1]]
+
+        token_ids, boundaries = [], []
+        for ids in encoded:
+            token_ids.extend(ids)
+            boundaries.append(len(token_ids))
+        if len(token_ids) > self.max_input_tokens:
+            # A single oversized segment: keep its tail, nothing is cacheable
+            token_ids = token_ids[-self.max_input_tokens:]
+            boundaries = [len(token_ids)]
+        return token_ids, boundaries
+
+    def generate(self, segments: List[str], task: str) -> str:
+        return self.batcher.submit(self.encode(segments), group=task)
+
+    def stream(self, segments: List[str], task: str, timeout: float = 120.0) -> Iterator[str]:
+        """Yield decoded text as it is generated, reusing and refreshing the prefix cache.
+
+        Generation runs on the batcher's worker; ``timeout`` bounds the wait for
+        each piece of text, including the wait for the worker to be free.
+        """
+        token_ids, boundaries = self.encode(segments)
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True, timeout=timeout)
+        # Run alone: no batch collection wait, and done resolves when this stream ends
+        done = self.batcher.submit_nowait((token_ids, boundaries, streamer), group=(STREAM, task), alone=True)
+        try:
+            yield from streamer
+        finally:
+            # A request still waiting for the worker is dropped; otherwise wait
+            # for generate to finish, raising its error if there was one
+            if not done.cancel():
+                done.result()
+
+    def _cacheable(self, boundaries: List[int]) -> List[int]:
+        """Boundaries worth keeping: the system prompt and the transcript before the task cue."""
+        if len(boundaries) < 2:
+            return []
+        return sorted({boundaries[0], boundaries[-2]})
+
+    def _inputs(self, sequences: List[List[int]]) -> Dict[str, torch.Tensor]:
+        """Left-pad ``sequences`` into input ids and an attention mask on the model's device."""
+        width = max(len(ids) for ids in sequences)
+        pad_id = self.tokenizer.pad_token_id
+        input_ids = [[pad_id] * (width - len(ids)) + list(ids) for ids in sequences]
+        attention_mask = [[0] * (width - len(ids)) + [1] * len(ids) for ids in sequences]
+        return {
+            'input_ids': torch.tensor(input_ids, device=self.model.device),
+            'attention_mask': torch.tensor(attention_mask, device=self.model.device)
+        }
+
+    def _generate_kwargs(self, task: str) -> Dict:
+        return dict(num_return_sequences=1, pad_token_id=self.tokenizer.pad_token_id, **self.generation_configs[task])
+
+    def _run_batch(self, task, items):
+        if isinstance(task, tuple) and task[0] == STREAM:
+            return [self._generate_streamed(task[1], *items[0])]
+        if len(items) == 1:
+            return [self._generate_cached(task, *items[0])]
+
+        inputs = self._inputs([token_ids for token_ids, _ in items])
+        with torch.no_grad():
+            outputs = self.model.generate(**inputs, **self._generate_kwargs(task))
+        # Only decode what was generated after each (left-padded) prompt
+        new_tokens = outputs[:, inputs["input_ids"].shape[1]:]
+        return self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+
+    def _cached_kwargs(self, task: str, token_ids: List[int], boundaries: List[int]) -> Dict:
+        kwargs = self._generate_kwargs(task)
+        _, cache = self.prefix_cache.lookup(token_ids, boundaries)
+        if cache is not None:
+            kwargs['past_key_values'] = as_model_cache(self.model, cache)
+        return kwargs
+
+    def _generate_cached(self, task: str, token_ids: List[int], boundaries: List[int]) -> str:
+        kwargs = self._cached_kwargs(task, token_ids, boundaries)
+        with torch.no_grad():
+            outputs = self.model.generate(**self._inputs([token_ids]), return_dict_in_generate=True, **kwargs)
+        self.prefix_cache.store(token_ids, self._cacheable(boundaries), outputs.past_key_values)
+        new_tokens = outputs.sequences[:, len(token_ids):]
+        return self.tokenizer.decode(new_tokens[0], skip_special_tokens=True)
+
+    def _generate_streamed(self, task: str, token_ids: List[int], boundaries: List[int], streamer):
+        """Run one streamed request on the worker; an error ends the stream and goes to its caller."""
+        try:
+            kwargs = self._cached_kwargs(task, token_ids, boundaries)
+            with torch.no_grad():
+                outputs = self.model.generate(**self._inputs([token_ids]), streamer=streamer,
+                                              return_dict_in_generate=True, **kwargs)
+        except Exception as e:
+            streamer.end()
+            return e
+        # Returned rather than filled in place, so tuple and Cache objects both work
+        self.prefix_cache.store(token_ids, self._cacheable(boundaries), outputs.past_key_values)
+        return None
+
+    def stats(self) -> Dict[str, Dict]:
+        return {'batching': self.batcher.stats(), 'prefix_cache': self.prefix_cache.stats()}
+
+
+class LocalChatModel(BaseChatModel):
+    """Prompt handling shared by the local backends.
+
+    Subclasses set ``self.generator`` and define how a message is written
+    (``_format_message``), the cue that starts the assistant turn, where the
+    reply ends, and the summary and triage instructions. Instructions always
+    follow the transcript, so every task reuses its cached prefix.
+    """
+
+    REPLY_CUE = "assistant:"
+    REPLY_STOP = "\nuser:"
+    SUMMARY_CUE = ""
+    RUNNING_SUMMARY_CUE = ""
+    TRIAGE_CUE = ""
+
+    def _format_message(self, role: str, content: str) -> str:
+        raise NotImplementedError
+
+    def _format_messages(self, messages: List[Dict[str, str]]) -> List[str]:
+        return [self._format_message(msg["role"], msg["content"]) for msg in messages]
+
+    def _summary_cue(self, running_summary: Optional[str] = None) -> str:
+        if running_summary:
+            return self.RUNNING_SUMMARY_CUE.format(summary=running_summary)
+        return self.SUMMARY_CUE
+
+    def _reply(self, segments: List[str]) -> str:
+        response = self.generator.generate(segments + [self.REPLY_CUE], 'response')
+        return response.split(self.REPLY_STOP)[0].strip()
+
+    def _summary(self, segments: List[str], running_summary: Optional[str] = None) -> str:
+        response = self.generator.generate(segments + [self._summary_cue(running_summary)], 'summary')
+        return response.split(self.REPLY_STOP)[0].strip()
+
+    def _triage(self, segments: List[str]) -> str:
+        return parse_triage_level(self.generator.generate(segments + [self.TRIAGE_CUE], 'triage'))
+
+    def generate_response(self, messages):
+        return self._reply(self._format_messages(messages))
+
+    def stream_response(self, messages):
+        # Cue the assistant turn so only the reply is generated, and stop at the next turn
+        segments = self._format_messages(messages) + [self.REPLY_CUE]
+        yield from until_stop(self.generator.stream(segments, 'response'), self.REPLY_STOP)
+
+    def generate_summary(self, messages, running_summary=None):
+        return self._summary(self._format_messages(messages), running_summary)
+
+    def determine_triage_level(self, messages):
+        return self._triage(self._format_messages(messages))
+
+    def count_tokens(self, text):
+        return len(self.generator.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def generate_turn(self, messages, running_summary=None, include_reply=True):
+        # Each task's prompt extends the transcript the previous one cached, so
+        # the conversation is encoded once and each task only adds its own cue.
+        segments = self._format_messages(messages)
+        reply = None
+        if include_reply:
+            reply = self._reply(segments)
+            segments = segments + [self._format_message("assistant", reply)]
+        return ModelTurn(
+            reply=reply,
+            triage_level=self._triage(segments),
+            summary=self._summary(segments, running_summary)
+        )
@@ -1,40 +1,143 @@
-from openai import OpenAI
+import asyncio
+import hashlib
+import json
 import os
-from .base import BaseChatModel
+import random
+from typing import Dict, List, Optional
+import httpx
+import openai
+from openai import AsyncOpenAI
+from .async_runtime import BackgroundEventLoop
+from .base import BaseChatModel, ModelTurn, parse_triage_level
+
+# Errors worth retrying: the request may well succeed a moment later
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
 
 class OpenAIChatModel(BaseChatModel):
-    def __init__(self):
-        self.client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-        self.model = "gpt-4"
+    """OpenAI backend built on the async client.
 
-    def generate_response(self, messages):
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=0.7,
-            max_tokens=500
+    All calls share one pooled HTTP client on a background event loop, are
+    limited to ``max_concurrency`` in flight, time out after ``timeout``
+    seconds, and are retried with jittered exponential backoff. Identical
+    deterministic (temperature 0) requests that are already in flight are
+    coalesced into a single call; sampled ones never are, so two patients never
+    share a reply. The synchronous methods block on the loop; ``agenerate_*``
+    can be awaited directly. ``base_url`` (or OPENAI_BASE_URL) can point at a
+    local stub server, and ``transport`` replaces the HTTP transport outright.
+    """
+
+    # gpt-4's 8k context, minus room for the reply
+    MAX_INPUT_TOKENS = 7168
+
+    def __init__(self,
+                 api_key: Optional[str] = None,
+                 base_url: Optional[str] = None,
+                 model: str = "gpt-4",
+                 max_concurrency: Optional[int] = None,
+                 timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 8.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.model = model
+        self.timeout = timeout or float(os.environ.get("OPENAI_TIMEOUT", 30))
+        self.max_retries = max_retries if max_retries is not None else int(os.environ.get("OPENAI_MAX_RETRIES", 3))
+        self.max_concurrency = max_concurrency or int(os.environ.get("OPENAI_MAX_CONCURRENCY", 16))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._runtime = BackgroundEventLoop.shared()
+        self._http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency
+            ),
+            timeout=self.timeout,
+            transport=transport
+        )
+        self.client = AsyncOpenAI(
+            api_key=api_key or os.environ.get("OPENAI_API_KEY"),
+            base_url=base_url or os.environ.get("OPENAI_BASE_URL"),
+            http_client=self._http_client,
+            max_retries=0  # retries are handled here, with jitter
         )
-        return response.choices[0].message.content
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.coalesced_requests = 0
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _request_key(payload: Dict) -> str:
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+    async def _complete(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        payload = {
+            'model': self.model,
+            'messages': messages,
+            'temperature': temperature,
+            'max_tokens': max_tokens
+        }
+        if temperature > 0:
+            # A sampled reply belongs to the caller that asked for it
+            return await self._complete_with_retry(payload)
+
+        key = self._request_key(payload)
+        # Only touched from the loop thread, so no lock is needed
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._complete_with_retry(payload))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced_requests += 1
+        # shield: one caller giving up must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def _complete_with_retry(self, payload: Dict) -> str:
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    response = await asyncio.wait_for(
+                        self.client.chat.completions.create(**payload),
+                        self.timeout
+                    )
+                return response.choices[0].message.content
+            except RETRYABLE_ERRORS:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+
+    async def agenerate_response(self, messages):
+        return await self._complete(messages, temperature=0.7, max_tokens=500)
 
-    def generate_summary(self, messages):
-        summary_response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
+    async def agenerate_summary(self, messages, running_summary=None):
+        instructions = "Summarize the medical conversation and key points discussed. Be concise but include important symptoms and recommendations."
+        if running_summary:
+            instructions += f" The summary of the earlier conversation is: {running_summary} Extend it with these newer messages instead of starting over."
+        return await self._complete(
+            [
                 {
                     "role": "system",
-                    "content": "Summarize the medical conversation and key points discussed. Be concise but include important symptoms and recommendations."
+                    "content": instructions
                 },
                 *messages
             ],
             temperature=0.7,
             max_tokens=200
         )
-        return summary_response.choices[0].message.content
 
-    def determine_triage_level(self, messages):
-        triage_response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
+    async def adetermine_triage_level(self, messages):
+        response = await self._complete(
+            [
                 {
                     "role": "system",
                     "content": "Based on the conversation, determine the triage level: 'urgent', 'non-urgent', or 'seek_immediate_care'. Respond with ONLY the triage level, nothing else."
@@ -44,4 +147,86 @@ class OpenAIChatModel(BaseChatModel):
             temperature=0,
             max_tokens=20
         )
-        return triage_response.choices[0].message.content.strip().lower()
+        return response.strip().lower()
+
+    @staticmethod
+    def _turn_instructions(running_summary: Optional[str], include_reply: bool) -> str:
+        keys = []
+        if include_reply:
+            keys.append('"reply" (your next message to the patient)')
+        keys.append('"triage_level" (exactly one of "urgent", "non-urgent" or "seek_immediate_care")')
+        keys.append('"summary" (a concise summary of the medical conversation, including important symptoms and recommendations)')
+        instructions = "Respond with ONLY a JSON object with the keys " + ", ".join(keys) + "."
+        if running_summary:
+            instructions += f" The summary of the earlier conversation is: {running_summary} Extend it with the newer messages instead of starting over."
+        return instructions
+
+    async def agenerate_turn(self, messages, running_summary=None, include_reply=True):
+        # The instructions go last so the conversation stays a stable prompt prefix
+        content = await self._complete(
+            [*messages, {"role": "system", "content": self._turn_instructions(running_summary, include_reply)}],
+            temperature=0.7 if include_reply else 0,
+            max_tokens=700 if include_reply else 250
+        )
+        content = content or ""
+        try:
+            data = json.loads(content[content.index("{"):content.rindex("}") + 1])
+        except ValueError:
+            data = {}
+
+        # Anything missing from a malformed answer is filled in by the single-task calls
+        reply = None
+        transcript = messages
+        if include_reply:
+            reply = data.get("reply")
+            if not isinstance(reply, str):
+                reply = await self.agenerate_response(messages)
+            transcript = messages + [{"role": "assistant", "content": reply}]
+        triage_level = data.get("triage_level")
+        if not isinstance(triage_level, str):
+            triage_level = await self.adetermine_triage_level(transcript)
+        summary = data.get("summary")
+        if not isinstance(summary, str):
+            summary = await self.agenerate_summary(transcript, running_summary)
+        return ModelTurn(reply=reply, triage_level=parse_triage_level(triage_level), summary=summary)
+
+    async def astream_response(self, messages):
+        # Retries only apply until the first token; a broken stream is not replayed
+        started = False
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    stream = await asyncio.wait_for(
+                        self.client.chat.completions.create(
+                            model=self.model,
+                            messages=messages,
+                            temperature=0.7,
+                            max_tokens=500,
+                            stream=True
+                        ),
+                        self.timeout
+                    )
+                    async for chunk in stream:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            started = True
+                            yield chunk.choices[0].delta.content
+                return
+            except RETRYABLE_ERRORS:
+                if started or attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+
+    def generate_response(self, messages):
+        return self._runtime.run(self.agenerate_response(messages))
+
+    def stream_response(self, messages):
+        return self._runtime.iterate(lambda: self.astream_response(messages), timeout=self.timeout)
+
+    def generate_summary(self, messages, running_summary=None):
+        return self._runtime.run(self.agenerate_summary(messages, running_summary))
+
+    def determine_triage_level(self, messages):
+        return self._runtime.run(self.adetermine_triage_level(messages))
+
+    def generate_turn(self, messages, running_summary=None, include_reply=True):
+        return self._runtime.run(self.agenerate_turn(messages, running_summary, include_reply))
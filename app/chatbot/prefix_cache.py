@@ -0,0 +1,107 @@
+import copy
+import hashlib
+import os
+import threading
+from typing import Optional, Sequence, Tuple
+from ..cache import LRUCache
+
+
+def _key(token_ids: Sequence[int]) -> str:
+    return hashlib.sha1(repr(tuple(token_ids)).encode('ascii')).hexdigest()
+
+
+def copy_cache(cache):
+    """Independent copy of a KV cache; ``generate`` extends Cache objects in place."""
+    if cache is None or isinstance(cache, tuple):
+        # Legacy tuple caches are never mutated, generation concatenates new tensors
+        return cache
+    return copy.deepcopy(cache)
+
+
+def cache_length(cache) -> int:
+    """Number of positions held by ``cache``."""
+    if isinstance(cache, tuple):
+        return cache[0][0].shape[2] if cache else 0
+    return cache.get_seq_length()
+
+
+def crop_cache(cache, length: int):
+    """Copy of ``cache`` holding only the first ``length`` positions."""
+    if isinstance(cache, tuple):
+        return tuple(tuple(tensor[:, :, :length] for tensor in layer) for layer in cache)
+    if hasattr(cache, 'crop'):
+        cropped = copy.deepcopy(cache)
+        cropped.crop(length)
+        return cropped
+    # Cache classes without crop() are cropped, and kept, in the legacy tuple format
+    return crop_cache(cache.to_legacy_cache(), length)
+
+
+class PrefixKVCache:
+    """Past key/values of prompt prefixes that end on a message boundary.
+
+    Prompts are encoded message by message, so the transcript of turn N is an
+    exact token prefix of turn N+1. Looking up the longest cached boundary
+    prefix lets generation start from the first new token instead of the
+    system prompt. The first boundary (the system prompt) is pinned; per-session
+    transcripts live in an LRU of ``max_entries``, each costing
+    2 x layers x tokens x hidden size x dtype bytes of memory.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or int(os.environ.get("PREFIX_CACHE_ENTRIES", 16))
+        self._entries = LRUCache(maxsize=self.max_entries)
+        self._pinned = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reused_tokens = 0
+
+    def lookup(self, token_ids: Sequence[int], boundaries: Sequence[int]) -> Tuple[int, object]:
+        """Return ``(prefix_length, cache copy)`` for the longest cached boundary prefix.
+
+        At least one token is always left uncached so generation has an input.
+        """
+        for boundary in sorted(boundaries, reverse=True):
+            if boundary >= len(token_ids):
+                continue
+            key = _key(token_ids[:boundary])
+            cache = self._pinned.get(key) or self._entries.get(key)
+            if cache is not None:
+                with self._lock:
+                    self.hits += 1
+                    self.reused_tokens += boundary
+                return boundary, copy_cache(cache)
+        with self._lock:
+            self.misses += 1
+        return 0, None
+
+    def store(self, token_ids: Sequence[int], boundaries: Sequence[int], cache, pin_first: bool = True):
+        """Keep prefixes of ``cache`` (which covers ``token_ids``) at the given boundaries."""
+        if cache is None:
+            return
+        # A generation that failed part way may have filled less than the prompt
+        limit = min(len(token_ids), cache_length(cache))
+        for index, boundary in enumerate(boundaries):
+            if boundary <= 0 or boundary > limit:
+                continue
+            key = _key(token_ids[:boundary])
+            if index == 0 and pin_first:
+                if key not in self._pinned:
+                    self._pinned[key] = crop_cache(cache, boundary)
+            elif key not in self._entries:
+                self._entries.set(key, crop_cache(cache, boundary))
+
+    def clear(self):
+        self._entries.clear()
+        self._pinned.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'reused_tokens': self.reused_tokens,
+            'entries': len(self._entries),
+            'pinned': len(self._pinned),
+            'max_entries': self.max_entries
+        }
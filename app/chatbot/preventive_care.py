@@ -1,13 +1,20 @@
 from dataclasses import dataclass
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
+import copy
 import json
+import os
+import threading
 from pathlib import Path
 import numpy as np
 from scipy.sparse import csr_matrix
 from sklearn.metrics.pairwise import cosine_similarity
 from .risk_assessment import RiskAssessment
 
+# Parsed guideline files; each service gets its own copy
+_guidelines: Dict[str, tuple] = {}
+_guidelines_lock = threading.Lock()
+
 @dataclass
 class PreventiveRecommendation:
     category: str
@@ -21,8 +28,11 @@ class PreventiveRecommendation:
     source_references: Optional[Dict] = None
 
 class PreventiveCareService:
-    def __init__(self, knowledge_base_path: str = "app/data/preventive_care_knowledge.json"):
-        self.risk_assessor = RiskAssessment()
+    def __init__(self,
+                 knowledge_base_path: str = "app/data/preventive_care_knowledge.json",
+                 risk_assessor: Optional[RiskAssessment] = None):
+        # Reuse the caller's assessor rather than loading a second knowledge base
+        self.risk_assessor = risk_assessor or RiskAssessment()
         self.guidelines = self._load_guidelines(knowledge_base_path)
         self.age_based_screenings = {
             "18-39": [
@@ -52,11 +62,29 @@ class PreventiveCareService:
         }
         
     def _load_guidelines(self, path: str) -> Dict:
+        """Guidelines from ``path``, parsed once per process while the file is unchanged.
+
+        Each call returns a deep copy, so a service changing its guidelines
+        does not change them for the others.
+        """
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return self._get_default_guidelines()
+        key = (stat.st_mtime_ns, stat.st_size)
+        with _guidelines_lock:
+            cached = _guidelines.get(path)
+            if cached is not None and cached[0] == key:
+                return copy.deepcopy(cached[1])
         try:
             with open(path, 'r') as f:
-                return json.load(f)
+                guidelines = json.load(f)
         except FileNotFoundError:
             return self._get_default_guidelines()
+        with _guidelines_lock:
+            _guidelines[path] = (key, guidelines)
+        return copy.deepcopy(guidelines)
             
     def _get_default_guidelines(self) -> Dict:
         """Provide default guidelines if knowledge base file is not found."""
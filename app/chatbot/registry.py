@@ -0,0 +1,126 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+class LazyComponent:
+    """A subsystem that is built on first use instead of at import time.
+
+    Used as a class attribute, attribute access returns the built instance,
+    so ``cls._translator.detect_language(...)`` keeps working unchanged.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self.factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+        # Separate from _lock, which is held for the whole build
+        self._warm_lock = threading.Lock()
+        self._state = "pending"  # pending, building, ready, failed
+        self._build_seconds: Optional[float] = None
+        self._error: Optional[str] = None
+        self._warm_thread: Optional[threading.Thread] = None
+
+    def __get__(self, obj, owner=None):
+        return self.get()
+
+    @property
+    def ready(self) -> bool:
+        return self._state == "ready"
+
+    def get(self) -> Any:
+        """Return the component, building it on first use."""
+        if self._state == "ready":
+            return self._instance
+
+        with self._lock:
+            if self._state != "ready":
+                self._state = "building"
+                self._error = None
+                started = time.perf_counter()
+                try:
+                    self._instance = self.factory()
+                except Exception as e:
+                    self._state = "failed"
+                    self._error = str(e)
+                    raise
+                finally:
+                    self._build_seconds = time.perf_counter() - started
+                self._state = "ready"
+        return self._instance
+
+    def warm(self) -> threading.Thread:
+        """Build the component on a background thread; returns without waiting for a build in progress."""
+        with self._warm_lock:
+            if self._warm_thread is None or not self._warm_thread.is_alive():
+                self._warm_thread = threading.Thread(
+                    target=self._warm,
+                    name=f"warm-{self.name}",
+                    daemon=True
+                )
+                self._warm_thread.start()
+            return self._warm_thread
+
+    def _warm(self):
+        try:
+            self.get()
+        except Exception as e:
+            print(f"Error warming {self.name}: {str(e)}")
+
+    def reset(self):
+        """Drop the built instance so the next access rebuilds it."""
+        with self._lock:
+            self._instance = None
+            self._state = "pending"
+            self._build_seconds = None
+            self._error = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'state': self._state,
+            'ready': self.ready,
+            'build_seconds': round(self._build_seconds, 3) if self._build_seconds is not None else None,
+            'error': self._error
+        }
+
+
+class ComponentRegistry:
+    """Keeps track of lazily built subsystems so they can be warmed and inspected."""
+
+    def __init__(self):
+        self._components: Dict[str, LazyComponent] = {}
+
+    def register(self, name: str, factory: Callable[[], Any]) -> LazyComponent:
+        if name in self._components:
+            raise ValueError(f"Component {name} is already registered")
+        component = LazyComponent(name, factory)
+        self._components[name] = component
+        return component
+
+    def get(self, name: str) -> Any:
+        return self._components[name].get()
+
+    def names(self) -> List[str]:
+        return list(self._components.keys())
+
+    def warm(self, names: Optional[Iterable[str]] = None, wait: bool = False,
+             timeout: Optional[float] = None) -> List[threading.Thread]:
+        """Start building the given components (all by default) in the background.
+
+        Unknown names (e.g. a typo in CHATBOT_WARMUP) are reported and skipped.
+        """
+        threads = []
+        for name in (names or self.names()):
+            if name not in self._components:
+                print(f"Unknown component {name}; known components: {', '.join(self.names())}")
+                continue
+            threads.append(self._components[name].warm())
+        if wait:
+            for thread in threads:
+                thread.join(timeout)
+        return threads
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: component.status() for name, component in self._components.items()}
@@ -0,0 +1,137 @@
+"""Reply segments for the rule-based triage response, and their pre-translation.
+
+Triage replies are built from a fixed set of lines: the emergency banner,
+headings, level recommendations, and the reasoning lines and follow-up
+questions of the rule file. Translations for all of them can be prepared ahead
+of time and stored in the translation memory:
+
+    python -m app.chatbot.response_templates --languages es,fr
+
+Languages default to every supported language except English. Segments that
+already have a translation are skipped unless --refresh is given. Run it as
+part of the build; with TRANSLATION_MEMORY_PREPARE=1 the chatbot service also
+fills in missing translations in the background when it builds its translator.
+"""
+import argparse
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+# A reply line: ``prefix`` is layout and never translated; ``values`` fill
+# the ``{placeholders}`` of ``text`` after translation.
+Segment = namedtuple('Segment', ['prefix', 'text', 'values'])
+
+EMERGENCY_BANNER = (
+    "⚠️ EMERGENCY MEDICAL ATTENTION REQUIRED ⚠️",
+    "Based on your symptoms, you should seek immediate medical care. "
+    "Please call emergency services (911) or go to the nearest emergency room immediately."
+)
+ASSESSMENT_HEADING = "Based on my assessment (confidence: {confidence}):"
+RECOMMENDATIONS_HEADING = "Recommendations:"
+FOLLOW_UP_HEADING = "To better assess your condition, please answer:"
+MAX_FOLLOW_UP_QUESTIONS = 3
+
+def triage_reply_segments(assessment) -> List[Segment]:
+    """Segments of the reply for a TriageAssessment, in display order."""
+    segments = []
+
+    # Add immediate emergency warning if needed
+    if assessment.level == "emergency":
+        segments.extend(Segment("", line, None) for line in EMERGENCY_BANNER)
+
+    # Add triage assessment explanation
+    segments.append(Segment("\n", ASSESSMENT_HEADING, {'confidence': f"{assessment.confidence_score:.0%}"}))
+    segments.extend(Segment("- ", reason, None) for reason in assessment.reasoning)
+
+    # Add recommendations
+    segments.append(Segment("\n", RECOMMENDATIONS_HEADING, None))
+    segments.extend(Segment("- ", rec, None) for rec in assessment.recommendations)
+
+    # Add follow-up questions if not emergency
+    if assessment.level != "emergency" and assessment.follow_up_questions:
+        segments.append(Segment("\n", FOLLOW_UP_HEADING, None))
+        segments.extend(
+            Segment("- ", question, None)
+            for question in assessment.follow_up_questions[:MAX_FOLLOW_UP_QUESTIONS]
+        )
+    return segments
+
+def render_segments(segments: List[Segment], translations: Optional[List[str]] = None) -> str:
+    """Join segments into reply text, using ``translations`` (one per segment) when given."""
+    lines = []
+    for index, segment in enumerate(segments):
+        if translations is not None:
+            text = translations[index]
+        else:
+            text = segment.text.format(**segment.values) if segment.values else segment.text
+        lines.append(segment.prefix + text)
+    return "\n".join(lines)
+
+def static_segments(rules_path: Optional[str] = None) -> List[str]:
+    """Every fixed segment a triage reply can contain with the given rule file."""
+    from .triage_system import (
+        DEFAULT_RULES_PATH, EMERGENCY_REASON, LEVEL_RECOMMENDATIONS, RISK_FACTOR_REASON, URGENT_REASON,
+        load_rule_set
+    )
+    rules = load_rule_set(rules_path or DEFAULT_RULES_PATH)
+
+    segments = list(EMERGENCY_BANNER)
+    segments += [ASSESSMENT_HEADING, RECOMMENDATIONS_HEADING, FOLLOW_UP_HEADING]
+    for recommendations in LEVEL_RECOMMENDATIONS.values():
+        segments += recommendations
+    for name, details, is_emergency in zip(rules.rule_names, rules.rule_details, rules.rule_is_emergency.tolist()):
+        segments.append((EMERGENCY_REASON if is_emergency else URGENT_REASON).format(name))
+        segments += details.get("follow_up", [])
+    segments += [RISK_FACTOR_REASON.format(factor) for factor in rules.factor_names]
+    return list(dict.fromkeys(segments))
+
+def prepare_translation_memory(translator, languages: Optional[List[str]] = None,
+                               rules_path: Optional[str] = None, refresh: bool = False) -> Dict[str, Dict[str, int]]:
+    """Translate the static segments missing from ``translator``'s memory.
+
+    Returns per-language counts of segments translated, skipped (translation
+    failed or lost a placeholder) and already prepared.
+    """
+    from ..translation_memory import placeholders
+
+    memory = translator.translation_memory
+    if languages is None:
+        languages = [lang for lang in translator.supported_languages if lang != 'en']
+    segments = static_segments(rules_path)
+
+    report = {}
+    for lang in languages:
+        pending = segments if refresh else memory.missing(segments, lang)
+        translations, skipped = {}, 0
+        if pending:
+            for segment, translated in zip(pending, translator.translate_texts(pending, lang, 'en')):
+                # translate_texts returns the input when translation fails
+                if translated == segment or placeholders(translated) != placeholders(segment):
+                    skipped += 1
+                    continue
+                translations[segment] = translated
+        if translations:
+            memory.add(lang, translations)
+        report[lang] = {
+            'translated': len(translations),
+            'skipped': skipped,
+            'prepared': len(segments) - len(pending)
+        }
+    return report
+
+def main(argv=None):
+    from ..translations import TranslationService
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--languages', default=None, help="comma-separated language codes")
+    parser.add_argument('--rules', default=None, help="triage rules file (default: the bundled one)")
+    parser.add_argument('--refresh', action='store_true', help="retranslate segments that already have a translation")
+    args = parser.parse_args(argv)
+
+    languages = args.languages.split(',') if args.languages else None
+    report = prepare_translation_memory(TranslationService(), languages, args.rules, args.refresh)
+    for lang, counts in report.items():
+        print(f"{lang}: {counts['translated']} translated, {counts['skipped']} skipped, "
+              f"{counts['prepared']} already prepared")
+
+if __name__ == '__main__':
+    main()
@@ -1,34 +1,89 @@
-from dataclasses import dataclass
-from typing import List, Dict, Optional, Tuple
-from enum import Enum
-import json
+from typing import List, Dict, Mapping, Optional, Tuple
+import os
 from pathlib import Path
 import numpy as np
-from scipy.sparse import csr_matrix
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy.sparse import csr_matrix, issparse, load_npz, save_npz
+from sklearn.preprocessing import normalize
 from datetime import datetime, timedelta
-
-class Severity(Enum):
-    LOW = 1
-    MODERATE = 2
-    HIGH = 3
-    CRITICAL = 4
-
-@dataclass
-class Symptom:
-    id: str
-    name: str
-    category: str
-    severity: Severity
-    related_conditions: List[str]
-    risk_factors: Dict[str, float]
-    temporal_patterns: Dict[str, float] = None  # Time-based patterns
-    interaction_patterns: Dict[str, float] = None  # Symptom interactions
+from .knowledge_base import KnowledgeBase, Severity, Symptom, open_knowledge_base
+
+# Bump when the correlation formula changes, so cached matrices are rebuilt
+CORRELATION_VERSION = 1
+
+def build_correlation_matrix(knowledge_base: KnowledgeBase) -> csr_matrix:
+    """Sparse symptom correlation matrix.
+
+    For symptoms i != j the entry is
+    ``(0.5 * shared conditions + 0.3 * same category) / (1 + 0.5 * |severity difference|)``.
+    Shared conditions come from the symptom-by-condition incidence product and
+    category matches from a one-hot product, so only the pairs that are
+    related at all are ever materialized.
+    """
+    n = len(knowledge_base)
+    incidence = knowledge_base.condition_incidence()
+    one_hot = csr_matrix(
+        (np.ones(n), (np.arange(n), knowledge_base.category_ids)),
+        shape=(n, len(knowledge_base.categories))
+    )
+
+    numerator = (0.5 * (incidence @ incidence.T) + 0.3 * (one_hot @ one_hot.T)).tocoo()
+    off_diagonal = numerator.row != numerator.col
+    rows, cols = numerator.row[off_diagonal], numerator.col[off_diagonal]
+    severities = knowledge_base.severity.astype(np.float64)
+    values = numerator.data[off_diagonal] / (1 + 0.5 * np.abs(severities[rows] - severities[cols]))
+
+    matrix = csr_matrix((values, (rows, cols)), shape=(n, n))
+    matrix.eliminate_zeros()
+    matrix.sort_indices()
+    return matrix
+
+def top_k_similarity(unit_vectors: csr_matrix, k: int, block_size: int = 1024) -> csr_matrix:
+    """Sparse cosine similarity keeping each row's ``k`` nearest neighbours.
+
+    ``unit_vectors`` must have unit (or zero) rows. The Gram matrix is built
+    ``block_size`` rows at a time, so memory stays at ``block_size x n``. Every
+    row keeps its own diagonal entry.
+    """
+    n = unit_vectors.shape[0]
+    k = min(k, n)
+    rows, cols, values = [], [], []
+    for start in range(0, n, block_size):
+        block = (unit_vectors[start:start + block_size] @ unit_vectors.T).toarray()
+        block_rows = np.arange(block.shape[0])
+        diagonal = block[block_rows, start + block_rows].copy()
+        block[block_rows, start + block_rows] = -np.inf
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k - 1] if k > 1 else np.empty((block.shape[0], 0), dtype=int)
+        top_values = np.take_along_axis(block, top, axis=1)
+        rows.append(np.repeat(start + block_rows, top.shape[1]))
+        cols.append(top.ravel())
+        values.append(top_values.ravel())
+        rows.append(start + block_rows)
+        cols.append(start + block_rows)
+        values.append(diagonal)
+    similarity = csr_matrix(
+        (np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(n, n)
+    )
+    similarity.eliminate_zeros()
+    return similarity
 
 class RiskAssessment:
-    def __init__(self, knowledge_base_path: str = "app/data/medical_knowledge.json"):
-        self.symptoms_db: Dict[str, Symptom] = {}
+    def __init__(self,
+                 knowledge_base_path: str = "app/data/medical_knowledge.json",
+                 dense_similarity_limit: Optional[int] = None,
+                 similarity_top_k: Optional[int] = None,
+                 matrix_cache_dir: Optional[str] = None):
+        self.knowledge_base: Optional[KnowledgeBase] = None
+        self.symptoms_db: Mapping[str, Symptom] = {}
         self.symptom_vectors = None
+        self.symptom_index: Dict[str, int] = {}
+        self.symptom_similarity = None
+        # Above this many symptoms only the top-k neighbours of each are kept
+        self.dense_similarity_limit = dense_similarity_limit or int(os.environ.get("RISK_DENSE_SIMILARITY_LIMIT", 2048))
+        self.similarity_top_k = similarity_top_k or int(os.environ.get("RISK_SIMILARITY_TOP_K", 32))
+        # An empty RISK_MATRIX_CACHE_DIR disables the on-disk correlation cache
+        cache_dir = matrix_cache_dir if matrix_cache_dir is not None else os.environ.get("RISK_MATRIX_CACHE_DIR", "risk_matrix_cache")
+        self.matrix_cache_dir = Path(cache_dir) if cache_dir else None
         self.symptom_names = []
         self.temporal_weights = {
             'morning': 1.2,
@@ -40,25 +95,13 @@ class RiskAssessment:
         self.initialize_correlation_matrix()
 
     def load_knowledge_base(self, path: str):
-        """Load medical knowledge base from JSON file."""
+        """Load the medical knowledge base compiled from a JSON file, shared within the process."""
         try:
-            with open(path, 'r') as f:
-                data = json.load(f)
-                for symptom_data in data['symptoms']:
-                    symptom = Symptom(
-                        id=symptom_data['id'],
-                        name=symptom_data['name'],
-                        category=symptom_data['category'],
-                        severity=Severity[symptom_data['severity'].upper()],
-                        related_conditions=symptom_data['related_conditions'],
-                        risk_factors=symptom_data['risk_factors'],
-                        temporal_patterns=symptom_data.get('temporal_patterns', {}),
-                        interaction_patterns=symptom_data.get('interaction_patterns', {})
-                    )
-                    self.symptoms_db[symptom.id] = symptom
-                    self.symptom_names.append(symptom.name)
+            self.knowledge_base = open_knowledge_base(path)
         except FileNotFoundError:
             self._initialize_basic_symptoms()
+        self.symptoms_db = self.knowledge_base.symptoms
+        self.symptom_names = list(self.knowledge_base.names)
 
     def _initialize_basic_symptoms(self):
         """Initialize basic symptoms if knowledge base is not available."""
@@ -81,37 +124,69 @@ class RiskAssessment:
             }
             # Add more basic symptoms as needed
         ]
-        for symptom_data in basic_symptoms:
-            symptom = Symptom(
-                id=symptom_data['id'],
-                name=symptom_data['name'],
-                category=symptom_data['category'],
-                severity=Severity[symptom_data['severity']],
-                related_conditions=symptom_data['related_conditions'],
-                risk_factors=symptom_data['risk_factors']
-            )
-            self.symptoms_db[symptom.id] = symptom
-            self.symptom_names.append(symptom.name)
+        self.knowledge_base = KnowledgeBase.from_records(basic_symptoms)
 
     def initialize_correlation_matrix(self):
-        """Initialize symptom correlation matrix using medical knowledge."""
-        n_symptoms = len(self.symptoms_db)
-        matrix = np.zeros((n_symptoms, n_symptoms))
+        """Initialize symptom correlation matrix using medical knowledge.
 
-        # Create correlation based on shared conditions and categories
-        for i, (_, symptom1) in enumerate(self.symptoms_db.items()):
-            for j, (_, symptom2) in enumerate(self.symptoms_db.items()):
-                if i != j:
-                    # Calculate correlation based on shared conditions
-                    shared_conditions = len(set(symptom1.related_conditions) &
-                                          set(symptom2.related_conditions))
-                    category_match = float(symptom1.category == symptom2.category)
+        The matrix is cached in ``matrix_cache_dir`` under a hash of the
+        knowledge it was built from, so restarts with an unchanged knowledge
+        base skip the build.
+        """
+        n_symptoms = len(self.knowledge_base)
+        cache_path = None
+        if self.matrix_cache_dir is not None:
+            fingerprint = self.knowledge_base.fingerprint
+            cache_path = self.matrix_cache_dir / f"correlation-v{CORRELATION_VERSION}-{fingerprint}.npz"
+
+        matrix = None
+        if cache_path is not None and cache_path.exists():
+            try:
+                matrix = load_npz(cache_path).tocsr()
+            except Exception as e:
+                print(f"Error loading cached correlation matrix: {str(e)}")
+        if matrix is None or matrix.shape != (n_symptoms, n_symptoms):
+            matrix = build_correlation_matrix(self.knowledge_base)
+            if cache_path is not None:
+                self._save_matrix(cache_path, matrix)
+
+        self.symptom_vectors = matrix
+        self.initialize_similarity()
+
+    @staticmethod
+    def _save_matrix(path: Path, matrix: csr_matrix):
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.parent / f".{path.stem}.tmp.npz"
+            save_npz(tmp_path, matrix)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error caching correlation matrix: {str(e)}")
+
+    def initialize_similarity(self):
+        """Build the symptom id index and the cosine similarity of symptom vectors.
+
+        Similarity is computed once here instead of on every request: dense for
+        small knowledge bases, a sparse top-k neighbour matrix for large ones,
+        where similarities outside a symptom's top k are treated as zero.
+        Rows of zeros (symptoms with no correlations) have zero similarity,
+        including with themselves, as with ``cosine_similarity``.
+        """
+        self.symptom_index = self.knowledge_base.index
+        unit_vectors = normalize(self.symptom_vectors, norm='l2', axis=1)
+        if len(self.symptom_index) <= self.dense_similarity_limit:
+            self.symptom_similarity = (unit_vectors @ unit_vectors.T).toarray()
+        else:
+            self.symptom_similarity = top_k_similarity(unit_vectors, self.similarity_top_k)
+        self._batch_arrays = None
 
-                    # Combine factors for correlation score
-                    matrix[i, j] = (0.5 * shared_conditions + 0.3 * category_match) / \
-                                 (1 + 0.5 * abs(symptom1.severity.value - symptom2.severity.value))
+    def _symptom_indices(self, symptoms: List[str]) -> List[int]:
+        return [self.symptom_index[s] for s in symptoms if s in self.symptom_index]
 
-        self.symptom_vectors = csr_matrix(matrix)
+    def _pair_similarity(self, indices: List[int]) -> np.ndarray:
+        """Dense ``len(indices)`` square block of the similarity matrix."""
+        block = self.symptom_similarity[indices][:, indices]
+        return block.toarray() if issparse(block) else block
 
     def calculate_risk_score(self,
                            symptoms: List[str],
@@ -131,26 +206,27 @@ class RiskAssessment:
 
         patient_factors = patient_factors or {}
 
+        knowledge_base = self.knowledge_base
+        symptom_indices = self._symptom_indices(symptoms)
+
         # Calculate base severity score
-        severity_score = sum(self.symptoms_db[s].severity.value for s in symptoms if s in self.symptoms_db)
+        severity_score = float(sum(knowledge_base.severity[index] for index in symptom_indices))
         severity_score /= len(symptoms)
 
         # Calculate symptom correlation score
         correlation_score = 0.0
-        if len(symptoms) > 1:
-            symptom_indices = [list(self.symptoms_db.keys()).index(s) for s in symptoms
-                             if s in self.symptoms_db]
-            correlations = cosine_similarity(self.symptom_vectors[symptom_indices])
-            correlation_score = correlations.mean()
+        if len(symptoms) > 1 and symptom_indices:
+            # Mean pairwise similarity, looked up rather than recomputed
+            correlations = self._pair_similarity(symptom_indices)
+            correlation_score = float(correlations.mean())
 
         # Apply patient risk factors
         risk_multiplier = 1.0
+        symptom_factors = [knowledge_base.risk_factors(index) for index in symptom_indices]
         for factor, value in patient_factors.items():
-            for symptom_id in symptoms:
-                if symptom_id in self.symptoms_db:
-                    symptom = self.symptoms_db[symptom_id]
-                    if factor in symptom.risk_factors:
-                        risk_multiplier += symptom.risk_factors[factor] * value
+            for risk_factors in symptom_factors:
+                if factor in risk_factors:
+                    risk_multiplier += risk_factors[factor] * value
 
         # Calculate total risk score
         total_risk = (0.4 * severity_score +
@@ -164,29 +240,94 @@ class RiskAssessment:
             'risk_multiplier': round(risk_multiplier, 2)
         }
 
+    def _batch_tables(self):
+        """Arrays for batch scoring, built on first use."""
+        if getattr(self, '_batch_arrays', None) is None:
+            self._batch_arrays = (
+                self.knowledge_base.factor_index,
+                self.knowledge_base.severity.astype(np.float64),
+                self.knowledge_base.factor_matrix()
+            )
+        return self._batch_arrays
+
+    def calculate_risk_scores(self,
+                              symptoms_batch: List[List[str]],
+                              patient_factors_batch: Optional[List[Dict[str, float]]] = None) -> List[Dict[str, float]]:
+        """
+        Vectorized calculate_risk_score for many patients at once.
+
+        Each patient's symptoms become a row of symptom counts, so severity,
+        correlation (the mean pairwise similarity, ``c S c`` over the counts)
+        and risk multipliers are matrix products.
+        """
+        patient_factors_batch = patient_factors_batch or [{} for _ in symptoms_batch]
+        symptom_index = self.symptom_index
+        factor_index, severities, factor_weights = self._batch_tables()
+
+        counts = np.zeros((len(symptoms_batch), len(symptom_index)))
+        factor_values = np.zeros((len(symptoms_batch), len(factor_index)))
+        lengths = np.array([len(symptoms) for symptoms in symptoms_batch], dtype=np.float64)
+        for row, (symptoms, factors) in enumerate(zip(symptoms_batch, patient_factors_batch)):
+            for symptom_id in symptoms:
+                index = symptom_index.get(symptom_id)
+                if index is not None:
+                    counts[row, index] += 1
+            for factor, value in (factors or {}).items():
+                index = factor_index.get(factor)
+                if index is not None:
+                    factor_values[row, index] = value
+
+        known = counts.sum(axis=1)
+        severity_scores = np.divide(counts @ severities, lengths, out=np.zeros(len(lengths)), where=lengths > 0)
+        # S @ counts.T works for both the dense and the sparse top-k matrix
+        pair_sums = (np.asarray(self.symptom_similarity @ counts.T).T * counts).sum(axis=1)
+        correlation_scores = np.divide(
+            pair_sums, known ** 2,
+            out=np.zeros(len(known)), where=(lengths > 1) & (known > 0)
+        )
+        risk_multipliers = 1.0 + (np.asarray(factor_weights.T @ counts.T).T * factor_values).sum(axis=1)
+        total_risks = (0.4 * severity_scores + 0.3 * correlation_scores + 0.3 * (risk_multipliers - 1)) * 10
+
+        results = []
+        for row, length in enumerate(lengths.tolist()):
+            if not length:
+                results.append({'total_risk': 0.0, 'severity_score': 0.0, 'correlation_score': 0.0})
+                continue
+            results.append({
+                'total_risk': round(float(total_risks[row]), 2),
+                'severity_score': round(float(severity_scores[row]), 2),
+                'correlation_score': round(float(correlation_scores[row]), 2),
+                'risk_multiplier': round(float(risk_multipliers[row]), 2)
+            })
+        return results
+
     def suggest_additional_symptoms(self, current_symptoms: List[str],
                                   max_suggestions: int = 3) -> List[str]:
         """Suggest additional symptoms to check based on correlations."""
         if not current_symptoms:
             return []
 
-        current_indices = [list(self.symptoms_db.keys()).index(s) for s in current_symptoms
-                         if s in self.symptoms_db]
+        current_indices = self._symptom_indices(current_symptoms)
         if not current_indices:
             return []
 
-        # Get correlation scores for all symptoms
-        correlations = cosine_similarity(self.symptom_vectors[current_indices],
-                                       self.symptom_vectors)
-        mean_correlations = correlations.mean(axis=0)
+        # Mean similarity of every symptom to the current ones
+        mean_correlations = self.symptom_similarity[current_indices].mean(axis=0)
+        all_symptoms = list(self.symptom_index)
+        if issparse(self.symptom_similarity):
+            # Only neighbours of the current symptoms can score above zero
+            mean_correlations = np.asarray(mean_correlations).ravel()
+            candidates = np.flatnonzero(mean_correlations)
+            ranked = candidates[np.argsort(mean_correlations[candidates])[::-1]]
+        else:
+            ranked = np.argsort(mean_correlations)[::-1]
 
         # Get top correlated symptoms that aren't in current symptoms
-        all_symptoms = list(self.symptoms_db.keys())
         suggestions = []
-        for idx in np.argsort(mean_correlations)[::-1]:
+        for idx in ranked:
             symptom_id = all_symptoms[idx]
             if symptom_id not in current_symptoms:
-                suggestions.append(self.symptoms_db[symptom_id].name)
+                suggestions.append(self.knowledge_base.names[idx])
                 if len(suggestions) >= max_suggestions:
                     break
 
@@ -1,16 +1,15 @@
 import os
+import threading
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
-from .base import BaseChatModel
-from .llama_model import LlamaChatModel
-from .huggingface_model import HuggingFaceChatModel
-from .openai_model import OpenAIChatModel
-from .document_processor import DocumentProcessor
-from .risk_assessment import RiskAssessment
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
+from .base import BaseChatModel, MODEL_TRIAGE_LEVELS
+from .context_budget import ContextBudget
+from .keyword_matcher import KeywordMatcher
+from .registry import ComponentRegistry
+from .response_templates import prepare_translation_memory, render_segments, triage_reply_segments
+from .symptom_keywords import SYMPTOM_KEYWORDS, symptom_matcher
+from .transcript_cache import TranscriptCache
 from ..models import ChatSession, ChatMessage, db
-from ..translations import TranslationService
-from .preventive_care import PreventiveCareService
-from .triage_system import AdvancedTriageSystem, TriageAssessment
 
 SYSTEM_PROMPT = """You are an advanced medical pre-screening assistant. Your role is to:
 
@@ -64,41 +63,109 @@ Important Notes:
 Begin by asking: "What symptoms are you experiencing today, and when did they start?"
 """
 
+# Keywords are matched as whole words, so inflections that matter are listed
+PATIENT_FACTOR_KEYWORDS = {
+    'age_65_plus': ['elderly', 'senior', 'over 65', '65+'],
+    'diabetes': ['diabetes', 'diabetic'],
+    'asthma': ['asthma', 'asthmatic'],
+    'smoking': ['smoke', 'smokes', 'smoked', 'smoker', 'smoking'],
+    'obesity': ['obese', 'obesity', 'overweight'],
+    'pregnancy': ['pregnant', 'pregnancy']
+}
+
+_patient_factor_matcher = KeywordMatcher(PATIENT_FACTOR_KEYWORDS)
+
+def _build_doc_processor():
+    from .document_processor import DocumentProcessor
+    return DocumentProcessor()
+
+def _build_risk_assessor():
+    from .risk_assessment import RiskAssessment
+    return RiskAssessment()
+
+def _build_translator():
+    from ..translations import TranslationService
+    translator = TranslationService()
+    if os.environ.get("TRANSLATION_MEMORY_PREPARE", "0") == "1":
+        # Opt-in: the build step (python -m app.chatbot.response_templates) normally does this
+        threading.Thread(
+            target=prepare_translation_memory,
+            args=(translator,),
+            name="translation-memory",
+            daemon=True
+        ).start()
+    return translator
+
+def _build_preventive_care():
+    from .preventive_care import PreventiveCareService
+    return PreventiveCareService(risk_assessor=ChatbotService._risk_assessor)
+
+def _build_triage_system():
+    from .triage_system import AdvancedTriageSystem
+    return AdvancedTriageSystem()
+
+def _build_batch_triage():
+    from .batch_triage import BatchTriageService
+    return BatchTriageService(ChatbotService._triage_system, ChatbotService._risk_assessor)
+
 class ChatbotService:
     _model = None
     _model_type = os.environ.get("CHATBOT_MODEL", "openai")
-    _doc_processor = DocumentProcessor()
-    _risk_assessor = RiskAssessment()
-    _translator = TranslationService()
-    _preventive_care = PreventiveCareService()
-    _triage_system = AdvancedTriageSystem()  # Add the new triage system
+
+    # Subsystems are built on first use (or by warm_up) rather than at import time,
+    # so importing the API blueprint no longer loads embedding models or PDFs.
+    _components = ComponentRegistry()
+    _doc_processor = _components.register('doc_processor', _build_doc_processor)
+    _risk_assessor = _components.register('risk_assessor', _build_risk_assessor)
+    _translator = _components.register('translator', _build_translator)
+    _preventive_care = _components.register('preventive_care', _build_preventive_care)
+    _triage_system = _components.register('triage_system', _build_triage_system)
+    _batch_triage = _components.register('batch_triage', _build_batch_triage)
+
+    _transcripts = TranscriptCache()
 
     @classmethod
     def get_model(cls) -> BaseChatModel:
         if cls._model is None:
             if cls._model_type == "huggingface":
+                from .huggingface_model import HuggingFaceChatModel
                 cls._model = HuggingFaceChatModel()
             elif cls._model_type == "llama":
+                from .llama_model import LlamaChatModel
                 cls._model = LlamaChatModel()
             else:
+                from .openai_model import OpenAIChatModel
                 cls._model = OpenAIChatModel()
         return cls._model
 
-    @staticmethod
-    def create_session(user_id: int) -> ChatSession:
+    @classmethod
+    def warm_up(cls, components: Optional[List[str]] = None, wait: bool = False) -> None:
+        """Build the given subsystems (all by default) on background threads."""
+        cls._components.warm(components, wait=wait)
+
+    @classmethod
+    def component_status(cls) -> Dict[str, Dict]:
+        """Report readiness and build time of each subsystem."""
+        return cls._components.status()
+
+    @classmethod
+    def triage_batch(cls, records: Iterable[Dict]) -> Iterator[Dict]:
+        """Triage and risk-score many patient records, yielding results in input order."""
+        return cls._batch_triage.score_records(records)
+
+    @classmethod
+    def create_session(cls, user_id: int) -> ChatSession:
         """Create a new chat session for a user."""
         session = ChatSession(user_id=user_id)
         db.session.add(session)
         db.session.commit()
 
-        initial_message = ChatMessage(
-            session_id=session.id,
-            role="assistant",
-            content="Hello! I'm here to help assess your symptoms. What symptoms are you experiencing today, and when did they start?",
+        cls.add_message(
+            session.id,
+            "assistant",
+            "Hello! I'm here to help assess your symptoms. What symptoms are you experiencing today, and when did they start?",
             language='en'
         )
-        db.session.add(initial_message)
-        db.session.commit()
 
         return session
 
@@ -107,153 +174,242 @@ class ChatbotService:
         """Get the chat history for a session."""
         return ChatMessage.query.filter_by(session_id=session_id).order_by(ChatMessage.timestamp).all()
 
-    @staticmethod
-    def add_message(session_id: int, role: str, content: str, language: str = 'en') -> ChatMessage:
+    @classmethod
+    def add_message(cls, session_id: int, role: str, content: str, language: str = 'en') -> ChatMessage:
         """Add a message to the chat history."""
-        message = ChatMessage(session_id=session_id, role=role, content=content, language=language)
-        db.session.add(message)
-        db.session.commit()
-        return message
+        return cls.add_messages(session_id, [{"role": role, "content": content, "language": language}])[0]
 
     @staticmethod
-    def get_conversation_messages(session_id: int) -> list:
+    def add_messages(session_id: int, messages: List[Dict[str, str]]) -> List[ChatMessage]:
+        """Add several messages, and any pending session changes, in one transaction."""
+        rows = [ChatMessage(session_id=session_id, **message) for message in messages]
+        db.session.add_all(rows)
+        # Lets transcript caches in other workers notice the write
+        ChatSession.query.filter_by(id=session_id).update(
+            {ChatSession.message_count: ChatSession.message_count + len(rows)},
+            synchronize_session=False
+        )
+        db.session.commit()
+        return rows
+
+    @classmethod
+    def get_conversation_messages(cls, session_id: int) -> list:
         """Format chat history for model input."""
-        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-        chat_history = ChatMessage.query.filter_by(session_id=session_id).order_by(ChatMessage.timestamp).all()
+        return [{"role": "system", "content": SYSTEM_PROMPT}] + cls._transcripts.get(session_id)
 
-        for msg in chat_history:
-            messages.append({"role": msg.role, "content": msg.content})
+    @classmethod
+    def _model_context(cls, session_id: int, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Fit ``messages`` (system prompt first) into the model's prompt budget.
+
+        Turns that no longer fit are folded into the session's running summary,
+        which is sent after the system prompt in place of those turns. The
+        session change is committed with the next write.
+        """
+        model = cls.get_model()
+        session = ChatSession.query.get(session_id)
+        system, transcript = messages[:1], messages[1:]
+        summary = session.context_summary if session else None
+        summarized = min(session.summarized_count or 0, len(transcript)) if session else 0
 
-        return messages
+        budget = ContextBudget(model.count_tokens, model.MAX_INPUT_TOKENS)
+        start = budget.plan(system, transcript, summarized, summary)
+        if start > summarized:
+            try:
+                summary = model.generate_summary(transcript[summarized:start], running_summary=summary)
+                if session:
+                    session.context_summary = summary
+                    session.summarized_count = start
+            except Exception as e:
+                # The older turns are still dropped; they are summarized on a later turn
+                print(f"Error updating conversation summary: {str(e)}")
+
+        if summary:
+            system = system + [{"role": "system", "content": f"Summary of the earlier conversation: {summary}"}]
+        return system + transcript[start:]
 
     @classmethod
-    def get_response(cls, session_id: int, user_message: str, target_lang: str = 'en') -> str:
-        """Get a response from the chatbot with integrated risk assessment and triage."""
-        source_lang = cls._translator.detect_language(user_message)
-        english_message = user_message if source_lang == 'en' else cls._translator.translate_text(user_message, 'en', source_lang)
+    def _user_language(cls, session_id: int) -> Optional[str]:
+        """Language detected for the user's last stored message in the session, if any."""
+        query = ChatMessage.query.filter_by(session_id=session_id, role='user')
+        last = query.order_by(ChatMessage.id.desc()).first()
+        return last.language if last else None
 
-        cls.add_message(session_id, "user", user_message, language=source_lang)
+    @classmethod
+    def _process_user_message(cls, session_id: int, user_message: str):
+        """Run triage on the user's message.
+
+        Returns the conversation messages for the model, the triage assessment,
+        and the user's message, which the caller stores.
+        """
+        # The language of the user's previous message settles short replies like "ok" or "3"
+        source_lang = cls._translator.detect_language(user_message, hint=cls._user_language(session_id))
+        english_message = user_message if source_lang == 'en' else cls._translator.translate_text(user_message, 'en', source_lang)
+        pending_message = {"role": "user", "content": user_message, "language": source_lang}
 
         # Extract symptoms and get chat history
         symptoms = cls.extract_symptoms(english_message)
-        messages = cls.get_conversation_messages(session_id)
+        messages = cls.get_conversation_messages(session_id) + [{"role": "user", "content": user_message}]
 
-        # Extract risk factors and patient info
-        patient_factors = cls._extract_patient_factors(messages)
+        # Only the new message is scanned; earlier factors are kept on the session
+        current_session = ChatSession.query.get(session_id)
+        patient_factors = cls._accumulate_patient_factors(current_session, user_message)
         risk_factors = [factor for factor in patient_factors.keys()]
 
-        # Perform triage assessment
+        # The triage rules match free text, so they see the message itself rather than symptom IDs
         triage_assessment = cls._triage_system.assess_triage_level(
-            symptoms=symptoms,
+            symptoms=[english_message],
             severity_scores={symptom: 5.0 for symptom in symptoms},  # Default severity
             risk_factors=risk_factors
         )
 
-        # Update session with triage information
-        current_session = ChatSession.query.get(session_id)
+        # Update session with triage information; committed along with the messages
         if current_session:
             current_session.triage_level = triage_assessment.level
             current_session.risk_score = triage_assessment.confidence_score * 10
             current_session.symptoms = symptoms
-            db.session.commit()
-
-        # Generate response based on triage assessment
-        response_parts = []
-
-        # Add immediate emergency warning if needed
-        if triage_assessment.level == "emergency":
-            response_parts.append(
-                "⚠️ EMERGENCY MEDICAL ATTENTION REQUIRED ⚠️\n"
-                "Based on your symptoms, you should seek immediate medical care. "
-                "Please call emergency services (911) or go to the nearest emergency room immediately."
-            )
-
-        # Add triage assessment explanation
-        response_parts.append(
-            f"\nBased on my assessment (confidence: {triage_assessment.confidence_score:.0%}):"
-        )
-        for reason in triage_assessment.reasoning:
-            response_parts.append(f"- {reason}")
-
-        # Add recommendations
-        response_parts.append("\nRecommendations:")
-        for rec in triage_assessment.recommendations:
-            response_parts.append(f"- {rec}")
-
-        # Add follow-up questions if not emergency
-        if triage_assessment.level != "emergency" and triage_assessment.follow_up_questions:
-            response_parts.append("\nTo better assess your condition, please answer:")
-            for question in triage_assessment.follow_up_questions[:3]:  # Limit to top 3 questions
-                response_parts.append(f"- {question}")
-
-        # Combine all parts and translate if needed
-        english_response = "\n".join(response_parts)
-        final_response = english_response if target_lang == 'en' else cls._translator.translate_text(
-            english_response, target_lang, 'en'
-        )
 
-        cls.add_message(session_id, "assistant", final_response, language=target_lang)
+        return messages, triage_assessment, pending_message
+
+    @classmethod
+    def get_response(cls, session_id: int, user_message: str, target_lang: str = 'en') -> str:
+        """Get a response from the chatbot with integrated risk assessment and triage.
+
+        The reply is built from the triage templates, so this path makes no model calls.
+        """
+        _, triage_assessment, pending_message = cls._process_user_message(session_id, user_message)
+
+        try:
+            # Translated line by line, so each fixed line is looked up on its own;
+            # lines without a prepared translation share one backend call
+            segments = triage_reply_segments(triage_assessment)
+            if target_lang == 'en':
+                final_response = render_segments(segments)
+            else:
+                final_response = render_segments(segments, cls._translator.translate_segments(
+                    [(segment.text, segment.values) for segment in segments], target_lang
+                ))
+        except Exception:
+            # Keep the user's message even though there is no reply for it
+            cls.add_messages(session_id, [pending_message])
+            raise
+
+        cls.add_messages(session_id, [
+            pending_message,
+            {"role": "assistant", "content": final_response, "language": target_lang}
+        ])
         return final_response
 
-    @staticmethod
-    def extract_symptoms(message_content: str) -> List[str]:
-        """Extract symptom IDs from message content using keyword matching."""
-        symptoms = []
-        symptom_keywords = {
-            'fever': ['fever', 'high temperature', 'feeling hot'],
-            'shortness_of_breath': ['shortness of breath', 'difficulty breathing', 'breathless'],
-            'chest_pain': ['chest pain', 'chest pressure', 'heart pain'],
-            'headache': ['headache', 'head pain', 'migraine'],
-            'fatigue': ['fatigue', 'tired', 'exhausted', 'no energy'],
-            'nausea': ['nausea', 'feeling sick', 'queasy']
+    @classmethod
+    def stream_response(cls, session_id: int, user_message: str,
+                        target_lang: str = 'en') -> Iterator[Tuple[str, Dict]]:
+        """Stream the model's reply as ``(event, data)`` pairs while it is generated.
+
+        The user's message is stored before generation starts, so it is kept if
+        the model fails or the client disconnects. A ``triage`` event comes first,
+        then ``token`` events, then ``done`` once the full reply has been stored.
+        """
+        messages, triage_assessment, pending_message = cls._process_user_message(session_id, user_message)
+        cls.add_messages(session_id, [pending_message])
+        yield "triage", {
+            'triage_level': triage_assessment.level,
+            'confidence': triage_assessment.confidence_score,
+            'red_flags': triage_assessment.red_flags,
+            'rules_version': triage_assessment.rules_version
         }
 
-        message_lower = message_content.lower()
-        for symptom_id, keywords in symptom_keywords.items():
-            if any(keyword in message_lower for keyword in keywords):
-                symptoms.append(symptom_id)
+        tokens = cls.get_model().stream_response(cls._model_context(session_id, messages))
+        if target_lang != 'en':
+            tokens = cls._translate_lines(tokens, target_lang)
+
+        reply_parts = []
+        for token in tokens:
+            reply_parts.append(token)
+            yield "token", {'text': token}
+
+        final_response = "".join(reply_parts).strip()
+        message = cls.add_message(session_id, "assistant", final_response, language=target_lang)
+        yield "done", {
+            'message_id': message.id,
+            'response': final_response,
+            'triage_level': triage_assessment.level
+        }
 
-        return symptoms
+    @classmethod
+    def _translate_lines(cls, tokens: Iterator[str], target_lang: str) -> Iterator[str]:
+        """Translate a token stream line by line so partial sentences are never translated."""
+        line = ""
+        for token in tokens:
+            line += token
+            while "\n" in line:
+                complete, line = line.split("\n", 1)
+                yield cls._translator.translate_text(complete, target_lang, 'en') + "\n"
+        if line:
+            yield cls._translator.translate_text(line, target_lang, 'en')
+
+    @staticmethod
+    def extract_symptoms(message_content: str) -> List[str]:
+        """Extract symptom IDs from message content using keyword matching."""
+        return symptom_matcher.labels(message_content)
 
     @staticmethod
     def _extract_patient_factors(messages: List[Dict[str, str]]) -> Dict[str, float]:
         """Extract patient risk factors from conversation history."""
         factors = {}
+        for msg in messages:
+            for factor in _patient_factor_matcher.labels(msg["content"]):
+                factors[factor] = 1.0
+        return factors
 
-        text = " ".join(msg["content"].lower() for msg in messages)
-
-        if any(age in text for age in ['elderly', 'senior', 'over 65', '65+']):
-            factors['age_65_plus'] = 1.0
-
-        if any(condition in text for condition in ['diabetes', 'diabetic']):
-            factors['diabetes'] = 1.0
-
-        if any(condition in text for condition in ['asthma', 'asthmatic']):
-            factors['asthma'] = 1.0
-
-        if 'smoke' in text or 'smoking' in text:
-            factors['smoking'] = 1.0
-
-        if any(condition in text for condition in ['obese', 'obesity', 'overweight']):
-            factors['obesity'] = 1.0
-
-        if 'pregnant' in text or 'pregnancy' in text:
-            factors['pregnancy'] = 1.0
+    @classmethod
+    def _user_message_factors(cls, session_id: int) -> Dict[str, float]:
+        """Patient factors found in all of a session's stored user messages."""
+        contents = db.session.query(ChatMessage.content).filter_by(session_id=session_id, role="user")
+        return cls._extract_patient_factors([{"content": content} for (content,) in contents])
 
+    @classmethod
+    def _accumulate_patient_factors(cls, session: Optional[ChatSession], user_message: str) -> Dict[str, float]:
+        """Add the factors in ``user_message`` to the session's factors and return them all.
+
+        Factors are never removed; the change is committed with the next write.
+        """
+        new_factors = cls._extract_patient_factors([{"content": user_message}])
+        if session is None:
+            return new_factors
+
+        if session.patient_factors is None:
+            # Sessions that predate factor tracking are scanned in full once
+            factors = cls._user_message_factors(session.id)
+        else:
+            factors = dict(session.patient_factors)
+        factors.update(new_factors)
+        # A new dict, so the JSON column is seen as changed
+        session.patient_factors = factors
         return factors
 
+    @classmethod
+    def recompute_patient_factors(cls, session_id: int) -> Dict[str, float]:
+        """Rebuild a session's patient factors from every user message, e.g. for audits."""
+        session = ChatSession.query.get(session_id)
+        if session is None:
+            return {}
+        session.patient_factors = cls._user_message_factors(session_id)
+        db.session.commit()
+        return session.patient_factors
+
     @classmethod
     def end_session(cls, session_id: int) -> str:
         """End a chat session and generate a summary."""
         session = ChatSession.query.get(session_id)
         if session and not session.ended_at:
-            messages = cls.get_conversation_messages(session_id)
-
             try:
-                model = cls.get_model()
-                summary = model.generate_summary(messages)
+                messages = cls._model_context(session_id, cls.get_conversation_messages(session_id))
+                # Summary and closing triage level come from a single model pass
+                turn = cls.get_model().generate_turn(messages, include_reply=False)
+                summary = turn.summary
 
                 session.summary = summary
+                if not session.triage_level:
+                    session.triage_level = MODEL_TRIAGE_LEVELS[turn.triage_level]
                 session.ended_at = datetime.utcnow()
                 db.session.commit()
 
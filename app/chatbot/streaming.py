@@ -0,0 +1,24 @@
+from typing import Iterable, Iterator
+
+def until_stop(pieces: Iterable[str], stop: str) -> Iterator[str]:
+    """Pass text through until ``stop`` appears, holding back anything that could be its start."""
+    pending = ""
+    for piece in pieces:
+        pending += piece
+        index = pending.find(stop)
+        if index != -1:
+            if index:
+                yield pending[:index]
+            return
+
+        # Keep the longest suffix that is still a prefix of the stop marker
+        keep = 0
+        for size in range(min(len(stop) - 1, len(pending)), 0, -1):
+            if stop.startswith(pending[-size:]):
+                keep = size
+                break
+        if len(pending) > keep:
+            yield pending[:len(pending) - keep]
+            pending = pending[len(pending) - keep:]
+    if pending:
+        yield pending
@@ -0,0 +1,37 @@
+from typing import List
+from .keyword_matcher import KeywordMatcher
+
+# Knowledge-base symptom IDs and the phrases that mention them; keywords are
+# matched as whole words, so inflections that matter are listed
+SYMPTOM_KEYWORDS = {
+    'fever': ['fever', 'fevers', 'feverish', 'high temperature', 'feeling hot'],
+    'shortness_of_breath': ['shortness of breath', 'difficulty breathing', 'breathless'],
+    'chest_pain': ['chest pain', 'chest pressure', 'heart pain'],
+    'headache': ['headache', 'headaches', 'head pain', 'migraine', 'migraines'],
+    'fatigue': ['fatigue', 'tired', 'tiredness', 'exhausted', 'no energy'],
+    'nausea': ['nausea', 'feeling sick', 'queasy']
+}
+
+symptom_matcher = KeywordMatcher(SYMPTOM_KEYWORDS)
+
+
+def _as_id(symptom: str) -> str:
+    return symptom.strip().lower().replace(' ', '_')
+
+
+def symptom_ids(symptoms: List[str]) -> List[str]:
+    """Knowledge-base IDs for symptoms given as IDs or free text, each ID once."""
+    ids = []
+    for symptom in symptoms:
+        found = [_as_id(symptom)] if _as_id(symptom) in SYMPTOM_KEYWORDS else symptom_matcher.labels(symptom)
+        ids.extend(symptom_id for symptom_id in found if symptom_id not in ids)
+    return ids
+
+
+def symptom_phrases(symptoms: List[str]) -> List[str]:
+    """Free text for symptoms given as IDs or free text, as the triage rules expect.
+
+    An ID becomes its main phrase ("chest_pain" -> "chest pain"); anything else
+    is passed through unchanged.
+    """
+    return [SYMPTOM_KEYWORDS.get(_as_id(symptom), [symptom])[0] for symptom in symptoms]
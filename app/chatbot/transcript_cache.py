@@ -0,0 +1,63 @@
+import os
+from collections import namedtuple
+from typing import Dict, List, Optional
+from ..cache import LRUCache
+from ..models import ChatMessage, ChatSession, db
+
+_Transcript = namedtuple('_Transcript', ['messages', 'last_id', 'version'])
+
+class TranscriptCache:
+    """Per-session conversation messages kept in memory between turns.
+
+    Every message insert bumps ``ChatSession.message_count`` in the same
+    transaction, so one scalar query tells whether a cached transcript is
+    current. When it is behind, only messages with an id above the last one
+    seen are loaded and appended. If the count still disagrees afterwards
+    (another worker wrote out of id order, or messages were deleted), the
+    transcript is reloaded in full.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None):
+        self._cache = LRUCache(maxsize=maxsize or int(os.environ.get("TRANSCRIPT_CACHE_SIZE", 1024)))
+        self.delta_loads = 0
+        self.full_loads = 0
+
+    def get(self, session_id: int) -> List[Dict[str, str]]:
+        """The session's messages as ``{"role", "content"}`` dicts, oldest first."""
+        version = db.session.query(ChatSession.message_count).filter_by(id=session_id).scalar()
+        if version is None:
+            self._cache.pop(session_id)
+            return []
+
+        transcript = self._cache.get(session_id)
+        if transcript is None or transcript.version != version:
+            transcript = self._load(session_id, transcript, version)
+            self._cache.set(session_id, transcript)
+        return list(transcript.messages)
+
+    def invalidate(self, session_id: int):
+        self._cache.pop(session_id)
+
+    def _load(self, session_id: int, transcript: Optional[_Transcript], version: int) -> _Transcript:
+        query = db.session.query(ChatMessage.id, ChatMessage.role, ChatMessage.content).filter(
+            ChatMessage.session_id == session_id
+        )
+        if transcript is not None:
+            rows = query.filter(ChatMessage.id > transcript.last_id).order_by(ChatMessage.id).all()
+            messages = transcript.messages + tuple({"role": role, "content": content} for _, role, content in rows)
+            if len(messages) == version:
+                self.delta_loads += 1
+                return _Transcript(messages, rows[-1].id if rows else transcript.last_id, version)
+
+        rows = query.order_by(ChatMessage.id).all()
+        self.full_loads += 1
+        return _Transcript(
+            tuple({"role": role, "content": content} for _, role, content in rows),
+            rows[-1].id if rows else 0,
+            version
+        )
+
+    def stats(self) -> Dict[str, float]:
+        stats = self._cache.stats()
+        stats.update(delta_loads=self.delta_loads, full_loads=self.full_loads)
+        return stats
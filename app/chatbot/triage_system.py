@@ -1,8 +1,43 @@
-```python
 from dataclasses import dataclass
+from types import MappingProxyType
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
+import hashlib
 import json
+import os
+import threading
+import time
+import numpy as np
+from scipy.sparse import csr_matrix
+from .keyword_matcher import KeywordMatcher
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'triage_rules.json')
+
+TRIAGE_LEVELS = ("emergency", "urgent", "non_urgent")
+EMERGENCY, URGENT, NON_URGENT = range(len(TRIAGE_LEVELS))
+
+LEVEL_RECOMMENDATIONS = {
+    "emergency": [
+        "Immediate emergency medical attention required",
+        "Call emergency services (911) immediately",
+        "Do not drive yourself to the hospital"
+    ],
+    "urgent": [
+        "Seek medical care within the next 24 hours",
+        "Monitor symptoms closely",
+        "If symptoms worsen, seek immediate emergency care"
+    ],
+    "non_urgent": [
+        "Schedule an appointment with your primary care provider",
+        "Monitor symptoms and maintain a symptom diary",
+        "Practice self-care measures as appropriate"
+    ]
+}
+
+# Reasoning lines; a fixed set per rule file, so their translations can be prepared ahead
+EMERGENCY_REASON = "Emergency symptom detected: {}"
+URGENT_REASON = "Urgent symptom detected: {}"
+RISK_FACTOR_REASON = "Risk factor present: {}"
 
 @dataclass
 class TriageAssessment:
@@ -13,72 +48,272 @@ class TriageAssessment:
     required_vitals: List[str]
     red_flags: List[str]
     follow_up_questions: List[str]
+    rules_version: Optional[str] = None  # version of the rule set that produced it
+
+@dataclass
+class TriageScores:
+    """Triage results for a batch of patients, one row per patient."""
+    scores: np.ndarray  # final score after risk multipliers
+    levels: np.ndarray  # index into TRIAGE_LEVELS
+    confidence: np.ndarray
+    rule_hits: np.ndarray  # (patients, rules) booleans
+    rules_version: str
+
+    def level_names(self) -> List[str]:
+        return [TRIAGE_LEVELS[level] for level in self.levels]
+
+def _freeze(value):
+    """Read-only copy of nested JSON data: dicts become mapping proxies, lists tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+class TriageRuleSet:
+    """Emergency, urgent and risk-factor tables compiled into arrays.
+
+    Keywords become the rows of a sparse term-by-rule incidence matrix, so
+    matching a batch of symptom texts is one keyword scan per text plus a
+    lookup of the rules of every term found. Rule points (10 or 7 times the
+    severity multiplier) and risk-factor weights are vectors, and scoring a
+    batch is a handful of NumPy operations.
+
+    A rule set never changes after it is built, so it can be shared between
+    threads and triage systems; new rules mean a new rule set.
+    """
+
+    def __init__(self, emergency_symptoms: Dict, urgent_symptoms: Dict, risk_factors: Dict[str, float],
+                 version: str = "unversioned"):
+        self.version = version
+        self.emergency_symptoms = _freeze(emergency_symptoms)
+        self.urgent_symptoms = _freeze(urgent_symptoms)
+        self.risk_factors = _freeze(risk_factors)
+        emergency_symptoms, urgent_symptoms, risk_factors = self.emergency_symptoms, self.urgent_symptoms, self.risk_factors
+
+        rules = [(name, details, True) for name, details in emergency_symptoms.items()]
+        rules += [(name, details, False) for name, details in urgent_symptoms.items()]
+        self.rule_names = [name for name, _, _ in rules]
+        self.rule_details = [details for _, details, _ in rules]
+        self.rule_is_emergency = np.array([emergency for _, _, emergency in rules], dtype=bool)
+        self.rule_points = np.array(
+            [(10.0 if emergency else 7.0) * details["severity_multiplier"] for _, details, emergency in rules],
+            dtype=np.float64
+        )
+
+        self.terms = sorted({keyword.lower() for _, details, _ in rules for keyword in details["keywords"]})
+        self.term_index = {term: index for index, term in enumerate(self.terms)}
+        rows, cols = [], []
+        for rule, (_, details, _) in enumerate(rules):
+            for term in {keyword.lower() for keyword in details["keywords"]}:
+                rows.append(self.term_index[term])
+                cols.append(rule)
+        self.incidence = csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(len(self.terms), len(rules))
+        )
+        self._matcher = KeywordMatcher({term: [term] for term in self.terms})
+
+        self.factor_names = list(risk_factors)
+        self.factor_index = {name: index for index, name in enumerate(self.factor_names)}
+        self.factor_weights = np.array([risk_factors[name] for name in self.factor_names], dtype=np.float64)
+
+        for array in (self.rule_is_emergency, self.rule_points, self.factor_weights,
+                      self.incidence.data, self.incidence.indices, self.incidence.indptr):
+            array.setflags(write=False)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'TriageRuleSet':
+        """Compile a rules file; files without a ``version`` are identified by content hash."""
+        with open(path, 'rb') as f:
+            raw = f.read()
+        data = json.loads(raw)
+        version = str(data.get('version') or hashlib.sha256(raw).hexdigest()[:12])
+        return cls(data['emergency_symptoms'], data['urgent_symptoms'], data['risk_factors'], version=version)
+
+    def term_hits(self, symptoms_batch: List[List[str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """``(patient, term)`` index pairs for every keyword found in each symptom list."""
+        rows, terms = [], []
+        for row, symptoms in enumerate(symptoms_batch):
+            found = {self.term_index[match.label] for match in self._matcher.finditer(" ".join(symptoms))}
+            rows.extend([row] * len(found))
+            terms.extend(found)
+        return np.array(rows, dtype=np.intp), np.array(terms, dtype=np.intp)
+
+    def rule_hits(self, symptoms_batch: List[List[str]]) -> np.ndarray:
+        """(patients, rules) booleans: the term hits multiplied by the incidence matrix."""
+        rows, terms = self.term_hits(symptoms_batch)
+        # Expand every hit term into its rules straight from the CSR arrays; a
+        # scipy product costs more in setup than the work for a few patients
+        indptr, indices = self.incidence.indptr, self.incidence.indices
+        starts = indptr[terms]
+        lengths = indptr[terms + 1] - starts
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        hits = np.zeros((len(symptoms_batch), len(self.rule_names)), dtype=bool)
+        hits[np.repeat(rows, lengths), indices[np.repeat(starts, lengths) + offsets]] = True
+        return hits
+
+    def factor_counts(self, risk_factors_batch: List[List[str]]) -> np.ndarray:
+        """(patients, factors) count of each known risk factor; unknown ones are ignored."""
+        counts = np.zeros((len(risk_factors_batch), len(self.factor_names)), dtype=np.float64)
+        for row, factors in enumerate(risk_factors_batch):
+            for factor in factors:
+                index = self.factor_index.get(factor)
+                if index is not None:
+                    counts[row, index] += 1
+        return counts
+
+    def score(self, symptoms_batch: List[List[str]], risk_factors_batch: List[List[str]]) -> TriageScores:
+        rule_hits = self.rule_hits(symptoms_batch)
+        base_scores = rule_hits @ self.rule_points
+        multipliers = np.prod(self.factor_weights ** self.factor_counts(risk_factors_batch), axis=1)
+        scores = base_scores * multipliers
+
+        emergency = (rule_hits & self.rule_is_emergency).any(axis=1) | (scores >= 15.0)
+        urgent = ~emergency & (scores >= 8.0)
+        levels = np.where(emergency, EMERGENCY, np.where(urgent, URGENT, NON_URGENT))
+        confidence = np.where(
+            emergency,
+            np.minimum(0.95, 0.75 + (scores - 15.0) * 0.02),
+            np.where(
+                urgent,
+                np.minimum(0.90, 0.70 + (scores - 8.0) * 0.025),
+                np.minimum(0.85, 0.60 + scores * 0.03)
+            )
+        )
+        return TriageScores(
+            scores=scores,
+            levels=levels,
+            confidence=confidence,
+            rule_hits=rule_hits,
+            rules_version=self.version
+        )
+
+_rule_sets: Dict[str, Tuple[Tuple[int, int], TriageRuleSet]] = {}
+_rule_sets_lock = threading.Lock()
+
+def load_rule_set(path: str = DEFAULT_RULES_PATH) -> TriageRuleSet:
+    """Compiled rules for ``path``, shared by every caller while the file is unchanged."""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _rule_sets_lock:
+        cached = _rule_sets.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+    # Compiled outside the lock; a concurrent caller at worst compiles it twice
+    rule_set = TriageRuleSet.from_file(path)
+    with _rule_sets_lock:
+        _rule_sets[path] = (key, rule_set)
+    return rule_set
+
+def _reload_rule_set(path: str, current: TriageRuleSet) -> Optional[TriageRuleSet]:
+    """The file's rule set if it differs from ``current``; None if unchanged or unreadable."""
+    try:
+        rule_set = load_rule_set(path)
+    except Exception as e:
+        # A broken or half-written file keeps the current rules in force
+        print(f"Error loading triage rules from {path}: {str(e)}")
+        return None
+    if rule_set is current:
+        return None
+    print(f"Loaded triage rules version {rule_set.version}")
+    return rule_set
+
+class RulesWatcher:
+    """Keeps one rules file's compiled rules current for every triage system using it.
+
+    A single daemon thread per file checks it every ``poll_interval`` seconds
+    and swaps a newly compiled rule set in with a single assignment.
+    """
+
+    def __init__(self, path: str, poll_interval: float):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.rules = load_rule_set(path)
+        self._thread = threading.Thread(target=self._watch, name="triage-rules-watcher", daemon=True)
+        self._thread.start()
+
+    def reload(self) -> bool:
+        """Swap in the rules file if it changed. Returns True if a new rule set was loaded."""
+        rule_set = _reload_rule_set(self.path, self.rules)
+        if rule_set is None:
+            return False
+        self.rules = rule_set
+        return True
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            self.reload()
+
+_watchers: Dict[str, RulesWatcher] = {}
+_watchers_lock = threading.Lock()
+
+def watch_rules(path: str, poll_interval: float) -> RulesWatcher:
+    """The shared watcher for ``path``, started on first use; polls at the shortest interval asked for."""
+    path = os.path.abspath(path)
+    with _watchers_lock:
+        watcher = _watchers.get(path)
+        if watcher is None:
+            watcher = _watchers[path] = RulesWatcher(path, poll_interval)
+        else:
+            watcher.poll_interval = min(watcher.poll_interval, poll_interval)
+        return watcher
 
 class AdvancedTriageSystem:
-    def __init__(self):
-        self.emergency_symptoms = {
-            "chest_pain": {
-                "keywords": ["chest pain", "chest pressure", "heart attack", "crushing"],
-                "severity_multiplier": 2.0,
-                "required_vitals": ["blood_pressure", "heart_rate", "oxygen_saturation"],
-                "follow_up": [
-                    "Is the pain crushing or pressure-like?",
-                    "Does it radiate to your arm or jaw?",
-                    "Are you experiencing shortness of breath?"
-                ]
-            },
-            "difficulty_breathing": {
-                "keywords": ["shortness of breath", "can't breathe", "breathing difficulty"],
-                "severity_multiplier": 1.8,
-                "required_vitals": ["oxygen_saturation", "respiratory_rate"],
-                "follow_up": [
-                    "Are you able to speak in full sentences?",
-                    "How long has this been occurring?",
-                    "Any associated chest pain?"
-                ]
-            },
-            "stroke_symptoms": {
-                "keywords": ["face drooping", "arm weakness", "speech difficulty"],
-                "severity_multiplier": 2.0,
-                "required_vitals": ["blood_pressure", "blood_glucose"],
-                "follow_up": [
-                    "When did these symptoms start?",
-                    "Can you raise both arms equally?",
-                    "Can you smile for me - is your face even?"
-                ]
-            }
-        }
-        
-        self.urgent_symptoms = {
-            "severe_pain": {
-                "keywords": ["severe pain", "worst pain", "10 out of 10"],
-                "severity_multiplier": 1.5,
-                "follow_up": [
-                    "On a scale of 1-10, how severe is the pain?",
-                    "What makes it better or worse?",
-                    "Any associated symptoms?"
-                ]
-            },
-            "high_fever": {
-                "keywords": ["high fever", "temperature", "103", "104"],
-                "severity_multiplier": 1.3,
-                "required_vitals": ["temperature"],
-                "follow_up": [
-                    "What is your current temperature?",
-                    "Any shaking or chills?",
-                    "How long has the fever lasted?"
-                ]
-            }
-        }
-        
-        self.risk_factors = {
-            "age_65_plus": 1.2,
-            "pregnancy": 1.3,
-            "immunocompromised": 1.4,
-            "diabetes": 1.1,
-            "heart_disease": 1.2,
-            "respiratory_condition": 1.2
-        }
+    """Rule-based triage over a rule set loaded from a JSON file.
+
+    When ``poll_interval`` (or TRIAGE_RULES_POLL_SECONDS, default 10) is
+    positive, the rules follow the file through the RulesWatcher shared by
+    every triage system on that path. Assessments already running keep the
+    rule set they started with, and each records its version.
+    """
+
+    def __init__(self, rules_path: Optional[str] = None, poll_interval: Optional[float] = None):
+        self.rules_path = rules_path or os.environ.get("TRIAGE_RULES_PATH", DEFAULT_RULES_PATH)
+        self.poll_interval = poll_interval if poll_interval is not None else float(
+            os.environ.get("TRIAGE_RULES_POLL_SECONDS", 10)
+        )
+        self._watcher = watch_rules(self.rules_path, self.poll_interval) if self.poll_interval > 0 else None
+        self._rules = self._watcher.rules if self._watcher else load_rule_set(self.rules_path)
+
+    @property
+    def rules(self) -> TriageRuleSet:
+        return self._watcher.rules if self._watcher else self._rules
+
+    @property
+    def emergency_symptoms(self):
+        return self.rules.emergency_symptoms
+
+    @property
+    def urgent_symptoms(self):
+        return self.rules.urgent_symptoms
+
+    @property
+    def risk_factors(self):
+        return self.rules.risk_factors
+
+    @property
+    def rules_version(self) -> str:
+        return self.rules.version
+
+    def reload_rules(self) -> bool:
+        """Swap in the rules file if it changed. Returns True if a new rule set was loaded."""
+        if self._watcher:
+            return self._watcher.reload()
+        rule_set = _reload_rule_set(self.rules_path, self._rules)
+        if rule_set is None:
+            return False
+        self._rules = rule_set
+        return True
+
+    def stop_watching(self):
+        """Stop following the file; the rules in force now are kept until ``reload_rules``."""
+        if self._watcher:
+            self._rules = self._watcher.rules
+            self._watcher = None
 
     def assess_triage_level(
         self,
@@ -91,99 +326,71 @@ class AdvancedTriageSystem:
         """
         Perform comprehensive triage assessment based on symptoms and patient factors.
         """
-        base_score = 0.0
-        reasoning = []
-        red_flags = []
-        required_vitals = set()
-        follow_up_questions = set()
-        
-        # Check for emergency symptoms
-        for symptom, details in self.emergency_symptoms.items():
-            if self._has_matching_keywords(symptoms, details["keywords"]):
-                base_score += 10.0 * details["severity_multiplier"]
-                reasoning.append(f"Emergency symptom detected: {symptom}")
-                red_flags.append(symptom)
-                required_vitals.update(details.get("required_vitals", []))
-                follow_up_questions.update(details.get("follow_up", []))
-        
-        # Check for urgent symptoms
-        for symptom, details in self.urgent_symptoms.items():
-            if self._has_matching_keywords(symptoms, details["keywords"]):
-                base_score += 7.0 * details["severity_multiplier"]
-                reasoning.append(f"Urgent symptom detected: {symptom}")
-                required_vitals.update(details.get("required_vitals", []))
-                follow_up_questions.update(details.get("follow_up", []))
-        
-        # Apply risk factor multipliers
-        risk_multiplier = 1.0
-        for factor in risk_factors:
-            if factor in self.risk_factors:
-                risk_multiplier *= self.risk_factors[factor]
-                reasoning.append(f"Risk factor present: {factor}")
-        
-        final_score = base_score * risk_multiplier
-        
-        # Determine triage level and recommendations
-        triage_level, confidence, recommendations = self._calculate_triage_level(
-            final_score,
-            len(red_flags),
-            vital_signs or {}
-        )
-        
-        return TriageAssessment(
-            level=triage_level,
-            confidence_score=confidence,
-            reasoning=reasoning,
-            recommendations=recommendations,
-            required_vitals=list(required_vitals),
-            red_flags=red_flags,
-            follow_up_questions=list(follow_up_questions)
-        )
+        return self.assess_batch([symptoms], [risk_factors])[0]
 
-    def _has_matching_keywords(self, symptoms: List[str], keywords: List[str]) -> bool:
-        """Check if any of the keywords match in the symptoms list."""
-        symptoms_text = " ".join(symptoms).lower()
-        return any(keyword.lower() in symptoms_text for keyword in keywords)
+    def score_batch(
+        self,
+        symptoms_batch: List[List[str]],
+        risk_factors_batch: Optional[List[List[str]]] = None
+    ) -> TriageScores:
+        """
+        Score many patients at once without building per-patient assessments.
+        """
+        risk_factors_batch = risk_factors_batch or [[] for _ in symptoms_batch]
+        return self.rules.score(symptoms_batch, risk_factors_batch)
 
-    def _calculate_triage_level(
+    def assess_batch(
         self,
-        score: float,
-        red_flag_count: int,
-        vital_signs: Dict[str, float]
-    ) -> Tuple[str, float, List[str]]:
+        symptoms_batch: List[List[str]],
+        risk_factors_batch: Optional[List[List[str]]] = None
+    ) -> List[TriageAssessment]:
         """
-        Calculate final triage level, confidence score, and recommendations.
+        Full triage assessments for many patients, scored in one vectorized pass.
         """
-        recommendations = []
-        
-        # Emergency conditions
-        if red_flag_count > 0 or score >= 15.0:
-            confidence = min(0.95, 0.75 + (score - 15.0) * 0.02)
-            recommendations = [
-                "Immediate emergency medical attention required",
-                "Call emergency services (911) immediately",
-                "Do not drive yourself to the hospital"
-            ]
-            return "emergency", confidence, recommendations
-        
-        # Urgent conditions
-        if score >= 8.0:
-            confidence = min(0.90, 0.70 + (score - 8.0) * 0.025)
-            recommendations = [
-                "Seek medical care within the next 24 hours",
-                "Monitor symptoms closely",
-                "If symptoms worsen, seek immediate emergency care"
-            ]
-            return "urgent", confidence, recommendations
-        
-        # Non-urgent conditions
-        confidence = min(0.85, 0.60 + score * 0.03)
-        recommendations = [
-            "Schedule an appointment with your primary care provider",
-            "Monitor symptoms and maintain a symptom diary",
-            "Practice self-care measures as appropriate"
-        ]
-        return "non_urgent", confidence, recommendations
+        risk_factors_batch = risk_factors_batch or [[] for _ in symptoms_batch]
+        # One rule set for the whole batch, even if a reload happens meanwhile
+        rules = self.rules
+        scores = rules.score(symptoms_batch, risk_factors_batch)
+
+        # Plain Python lists from here on; indexing NumPy arrays per item is slow
+        hits_by_row = [[] for _ in symptoms_batch]
+        for row, rule in zip(*(index.tolist() for index in np.nonzero(scores.rule_hits))):
+            hits_by_row[row].append(rule)
+        is_emergency = rules.rule_is_emergency.tolist()
+        levels = scores.levels.tolist()
+        confidence = scores.confidence.tolist()
+
+        assessments = []
+        for row, risk_factors in enumerate(risk_factors_batch):
+            reasoning = []
+            red_flags = []
+            required_vitals = set()
+            follow_up_questions = set()
+            for rule in hits_by_row[row]:
+                name, details = rules.rule_names[rule], rules.rule_details[rule]
+                if is_emergency[rule]:
+                    reasoning.append(EMERGENCY_REASON.format(name))
+                    red_flags.append(name)
+                else:
+                    reasoning.append(URGENT_REASON.format(name))
+                required_vitals.update(details.get("required_vitals", []))
+                follow_up_questions.update(details.get("follow_up", []))
+            for factor in risk_factors:
+                if factor in rules.factor_index:
+                    reasoning.append(RISK_FACTOR_REASON.format(factor))
+
+            level = TRIAGE_LEVELS[levels[row]]
+            assessments.append(TriageAssessment(
+                level=level,
+                confidence_score=confidence[row],
+                reasoning=reasoning,
+                recommendations=list(LEVEL_RECOMMENDATIONS[level]),
+                required_vitals=list(required_vitals),
+                red_flags=red_flags,
+                follow_up_questions=list(follow_up_questions),
+                rules_version=rules.version
+            ))
+        return assessments
 
     def generate_follow_up_assessment(
         self,
@@ -197,4 +404,3 @@ class AdvancedTriageSystem:
         # Implementation for follow-up assessment logic
         # This would incorporate the new information to refine the triage level
         pass
-```
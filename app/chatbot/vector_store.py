@@ -0,0 +1,439 @@
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import faiss
+import numpy as np
+from .ann_index import IndexConfig, apply_search_params, create_index, describe_index, train_index
+
+MANIFEST_VERSION = 2
+
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    """Hash a file in blocks so large PDFs are not read into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PersistentVectorStore:
+    """FAISS index plus chunk texts and a file manifest, persisted in ``index_dir``.
+
+    Every version of the store is written to its own generation directory
+    (``gen-<n>``), and the ``CURRENT`` file names the live one. An update only
+    becomes visible when ``CURRENT`` is atomically replaced, so a crash at any
+    point leaves the previous generation intact and consistent. Layout of a
+    generation:
+        manifest.json      settings, dimension, per-file sha256/mtime/size and chunk ids
+        vectors.f32        raw float32 embeddings, one row per chunk (memory-mapped)
+        chunk_ids.npy      int64 chunk ids, ascending, aligned with vectors.f32
+        chunk_offsets.npy  int64 byte offsets of each chunk in chunks.bin
+        chunks.bin         utf-8 chunk texts, concatenated
+        index.faiss        FAISS index over vectors.f32 (memory-mapped on load)
+        trained.faiss      empty trained index reused by updates (IVF/PQ only)
+    """
+
+    MANIFEST_FILE = "manifest.json"
+    VECTORS_FILE = "vectors.f32"
+    IDS_FILE = "chunk_ids.npy"
+    OFFSETS_FILE = "chunk_offsets.npy"
+    CHUNKS_FILE = "chunks.bin"
+    INDEX_FILE = "index.faiss"
+    TRAINED_FILE = "trained.faiss"
+    LOCK_FILE = ".lock"
+    CURRENT_FILE = "CURRENT"
+    GENERATION_PREFIX = "gen-"
+
+    # Retrain IVF/PQ codebooks once the corpus has grown or shrunk by this factor
+    RETRAIN_FACTOR = 2.0
+
+    def __init__(self, index_dir: str, settings: Dict, index_config: Optional[IndexConfig] = None):
+        self.index_dir = Path(index_dir)
+        self.settings = settings
+        self.index_config = index_config or IndexConfig()
+        self.manifest: Dict = self._empty_manifest()
+        self.generation_dir: Optional[Path] = None
+        self.index = None
+        self.vectors: Optional[np.ndarray] = None
+        self.chunk_ids = np.zeros(0, dtype=np.int64)
+        self.chunk_offsets = np.zeros(1, dtype=np.int64)
+        self._chunks_file = None
+        self._chunks = None
+
+    def _empty_manifest(self) -> Dict:
+        return {
+            'version': MANIFEST_VERSION,
+            'settings': self.settings,
+            'dimension': 0,
+            'next_id': 0,
+            'fingerprint': None,
+            'index': {},
+            'files': {}
+        }
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        """Hash of the manifest contents; changes whenever the indexed corpus does."""
+        return self.manifest.get('fingerprint')
+
+    @property
+    def dimension(self) -> int:
+        return self.manifest.get('dimension', 0)
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    @contextmanager
+    def lock(self):
+        """Serialize index updates across worker processes."""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.index_dir / self.LOCK_FILE, 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @classmethod
+    def current_generation(cls, index_dir) -> Optional[Path]:
+        """Directory of the live generation in ``index_dir``, or None if there is none."""
+        index_dir = Path(index_dir)
+        try:
+            name = (index_dir / cls.CURRENT_FILE).read_text().strip()
+        except OSError:
+            return None
+        generation_dir = index_dir / name
+        return generation_dir if name and generation_dir.is_dir() else None
+
+    def generations(self) -> List[Path]:
+        """Generation directories in ``index_dir``, oldest first."""
+        if not self.index_dir.exists():
+            return []
+        found = []
+        for path in self.index_dir.iterdir():
+            suffix = path.name[len(self.GENERATION_PREFIX):]
+            if path.is_dir() and path.name.startswith(self.GENERATION_PREFIX) and suffix.isdigit():
+                found.append((int(suffix), path))
+        return [path for _, path in sorted(found)]
+
+    def load(self) -> bool:
+        """Load a previously saved store. Returns False if none exists or it is stale."""
+        generation_dir = self.current_generation(self.index_dir)
+        if generation_dir is None:
+            return False
+        manifest_path = generation_dir / self.MANIFEST_FILE
+
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading vector store manifest: {str(e)}")
+            return False
+
+        if manifest.get('version') != MANIFEST_VERSION or manifest.get('settings') != self.settings:
+            # Different embedding model or chunking: everything has to be re-embedded
+            return False
+
+        self.close()
+        self.manifest = manifest
+        self.generation_dir = generation_dir
+        self.chunk_ids = np.load(generation_dir / self.IDS_FILE)
+        self.chunk_offsets = np.load(generation_dir / self.OFFSETS_FILE)
+        if len(self.chunk_ids):
+            self.vectors = np.memmap(generation_dir / self.VECTORS_FILE, dtype=np.float32, mode='r',
+                                     shape=(len(self.chunk_ids), self.dimension))
+        else:
+            self.vectors = None
+        self._open_chunks()
+
+        index_path = generation_dir / self.INDEX_FILE
+        if len(self.chunk_ids) and index_path.exists():
+            self.index = faiss.read_index(str(index_path), faiss.IO_FLAG_MMAP)
+            apply_search_params(self.index, self.index_config)
+        else:
+            self.index = None
+        return True
+
+    def index_outdated(self) -> bool:
+        """True if the index on disk was built with different build parameters."""
+        return bool(len(self.chunk_ids)) and \
+            self.manifest.get('index', {}).get('config') != self.index_config.build_params()
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        """Tune recall against latency without rebuilding the index."""
+        if nprobe is not None:
+            self.index_config.nprobe = nprobe
+        if ef_search is not None:
+            self.index_config.ef_search = ef_search
+        apply_search_params(self.index, self.index_config)
+
+    def index_info(self) -> Dict:
+        return {
+            'index': describe_index(self.index),
+            'vectors': len(self.chunk_ids),
+            'nprobe': self.index_config.nprobe,
+            'ef_search': self.index_config.ef_search,
+            **self.manifest.get('index', {})
+        }
+
+    def rebuild_index(self):
+        """Rebuild (and retrain) the index from the stored vectors; nothing is re-embedded."""
+        return self.begin_update([], []).commit(retrain=True)
+
+    def build_index(self, vectors: np.ndarray, chunk_ids: np.ndarray, retrain: bool = False):
+        """Build an index over ``vectors``, reusing the trained codebook when still valid.
+
+        Returns the filled index, the empty trained template (or None) and index metadata.
+        """
+        config = self.index_config
+        meta = self.manifest.get('index', {})
+        template = None
+        trained_path = self.generation_dir / self.TRAINED_FILE if self.generation_dir else None
+        trained_on = meta.get('trained_on') or 0
+        if (not retrain and trained_path is not None and trained_path.exists() and meta.get('config') == config.build_params()
+                and trained_on and 1 / self.RETRAIN_FACTOR <= len(chunk_ids) / trained_on <= self.RETRAIN_FACTOR):
+            template = faiss.read_index(str(trained_path))
+        else:
+            trained_on = len(chunk_ids)
+            template = train_index(create_index(config, len(chunk_ids), vectors.shape[1]),
+                                   vectors, config.max_train_points)
+
+        index = faiss.clone_index(template)
+        for start in range(0, len(chunk_ids), VectorStoreUpdate.COPY_BATCH):
+            end = start + VectorStoreUpdate.COPY_BATCH
+            index.add_with_ids(np.ascontiguousarray(vectors[start:end], dtype=np.float32), chunk_ids[start:end])
+
+        needs_training = describe_index(template) not in ('IndexFlatL2', 'IndexHNSWFlat')
+        meta = {
+            'config': config.build_params(),
+            'type': describe_index(index),
+            'trained_on': trained_on if needs_training else None
+        }
+        return index, template if needs_training else None, meta
+
+    def _open_chunks(self):
+        chunks_path = self.generation_dir / self.CHUNKS_FILE
+        if chunks_path.exists() and chunks_path.stat().st_size > 0:
+            self._chunks_file = open(chunks_path, 'rb')
+            self._chunks = mmap.mmap(self._chunks_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        self.index = None
+        self.vectors = None
+        if self._chunks is not None:
+            self._chunks.close()
+            self._chunks = None
+        if self._chunks_file is not None:
+            self._chunks_file.close()
+            self._chunks_file = None
+
+    def plan_update(self, pdf_files: List[Path]) -> Tuple[List[Path], List[str], Dict[str, Dict]]:
+        """Compare the PDFs on disk with the manifest.
+
+        Returns the files that need (re-)embedding, the manifest keys that were
+        deleted, and refreshed manifest entries for files whose contents are
+        unchanged even though their mtime moved.
+        """
+        known = self.manifest['files']
+        to_embed = []
+        touched = {}
+
+        for pdf_file in pdf_files:
+            stat = pdf_file.stat()
+            entry = known.get(pdf_file.name)
+            if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+                continue
+
+            sha256 = file_sha256(pdf_file)
+            if entry and entry['sha256'] == sha256:
+                touched[pdf_file.name] = dict(entry, mtime=stat.st_mtime, size=stat.st_size)
+            else:
+                to_embed.append(pdf_file)
+
+        present = {pdf_file.name for pdf_file in pdf_files}
+        deleted = [name for name in known if name not in present]
+        return to_embed, deleted, touched
+
+    def begin_update(self, removed_files: List[str], replaced_files: List[str],
+                     touched: Optional[Dict[str, Dict]] = None) -> 'VectorStoreUpdate':
+        """Start writing a new version of the store, streaming new chunks to disk."""
+        return VectorStoreUpdate(self, list(removed_files) + list(replaced_files), touched or {})
+
+    def _chunk_bytes(self, row: int) -> bytes:
+        start, end = self.chunk_offsets[row], self.chunk_offsets[row + 1]
+        return self._chunks[start:end] if self._chunks is not None else b''
+
+    def get_texts(self, chunk_ids) -> List[str]:
+        """Look up chunk texts by chunk id."""
+        rows = np.searchsorted(self.chunk_ids, np.asarray(chunk_ids, dtype=np.int64))
+        return [self._chunk_bytes(int(row)).decode('utf-8') for row in rows]
+
+    def search(self, query_vector: np.ndarray, k: int) -> List[int]:
+        """Return the ids of the ``k`` chunks nearest to ``query_vector``."""
+        if self.index is None or not len(self.chunk_ids):
+            return []
+        query = np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+        _, ids = self.index.search(query, min(k, len(self.chunk_ids)))
+        return [int(i) for i in ids[0] if i != -1]
+
+
+class VectorStoreUpdate:
+    """Writes a new generation of a ``PersistentVectorStore`` next to the current one.
+
+    Chunks of removed and re-embedded files are dropped and surviving chunks are
+    copied over up front; new chunks are then appended batch by batch, so memory
+    stays bounded by the batch size rather than the corpus. ``commit`` builds the
+    FAISS index, then points ``CURRENT`` at the new generation in one rename.
+    """
+
+    COPY_BATCH = 65536
+
+    def __init__(self, store: PersistentVectorStore, dropped_files: List[str], touched: Dict[str, Dict]):
+        self.store = store
+        self.files = dict(store.manifest['files'])
+        self.files.update(touched)
+        self.dimension = store.dimension
+        self.next_id = store.manifest['next_id']
+        self._chunk_ids: List[np.ndarray] = []
+        self._offsets = [0]
+        self._registered_chunks = 0
+        self._written_chunks = 0
+        self._closed = False
+        self.previous_dir = PersistentVectorStore.current_generation(store.index_dir)
+
+        # Leftovers of a crashed update may hold higher numbers; never reuse them
+        generations = store.generations()
+        number = int(generations[-1].name[len(PersistentVectorStore.GENERATION_PREFIX):]) + 1 if generations else 1
+        self.generation_dir = store.index_dir / f"{PersistentVectorStore.GENERATION_PREFIX}{number}"
+        self.generation_dir.mkdir(parents=True)
+        self._vectors_out = open(self._path(PersistentVectorStore.VECTORS_FILE), 'wb')
+        self._chunks_out = open(self._path(PersistentVectorStore.CHUNKS_FILE), 'wb')
+
+        dropped_ids = []
+        for name in dropped_files:
+            entry = self.files.pop(name, None)
+            if entry:
+                dropped_ids.extend(entry['chunk_ids'])
+        self._copy_kept_rows(np.asarray(dropped_ids, dtype=np.int64))
+
+    def _path(self, name: str) -> Path:
+        return self.generation_dir / name
+
+    def _copy_kept_rows(self, dropped_ids: np.ndarray):
+        store = self.store
+        if not len(store.chunk_ids):
+            return
+        kept_rows = np.flatnonzero(~np.isin(store.chunk_ids, dropped_ids))
+        for start in range(0, len(kept_rows), self.COPY_BATCH):
+            rows = kept_rows[start:start + self.COPY_BATCH]
+            self._vectors_out.write(np.ascontiguousarray(store.vectors[rows], dtype=np.float32).tobytes())
+            for row in rows:
+                self._write_text(store._chunk_bytes(int(row)))
+            self._chunk_ids.append(store.chunk_ids[rows])
+
+    def _write_text(self, data: bytes):
+        self._chunks_out.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+
+    def add_file(self, name: str, entry: Dict, chunk_count: int):
+        """Register a (re-)embedded file; its chunks follow, in order, via ``add_chunks``."""
+        self.files[name] = dict(entry, chunk_ids=list(range(self.next_id, self.next_id + chunk_count)))
+        self.next_id += chunk_count
+        self._registered_chunks += chunk_count
+
+    def add_chunks(self, texts: List[str], vectors: np.ndarray):
+        """Append a batch of chunk texts and their embeddings."""
+        if not texts:
+            return
+        if self._written_chunks + len(texts) > self._registered_chunks:
+            raise RuntimeError("add_file must be called before its chunks are added")
+
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.dimension and vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected {self.dimension}-d vectors, got {vectors.shape[1]}-d")
+        self.dimension = vectors.shape[1]
+        self._vectors_out.write(vectors.tobytes())
+
+        for text in texts:
+            self._write_text(text.encode('utf-8'))
+        first_id = self.store.manifest['next_id'] + self._written_chunks
+        self._chunk_ids.append(np.arange(first_id, first_id + len(texts), dtype=np.int64))
+        self._written_chunks += len(texts)
+
+    def commit(self, retrain: bool = False):
+        if self._written_chunks != self._registered_chunks:
+            raise RuntimeError(
+                f"{self._registered_chunks} chunks registered but {self._written_chunks} written")
+
+        self._vectors_out.close()
+        self._chunks_out.close()
+        store = self.store
+        chunk_ids = np.concatenate(self._chunk_ids) if self._chunk_ids else np.zeros(0, dtype=np.int64)
+
+        with open(self._path(PersistentVectorStore.IDS_FILE), 'wb') as f:
+            np.save(f, chunk_ids)
+        with open(self._path(PersistentVectorStore.OFFSETS_FILE), 'wb') as f:
+            np.save(f, np.asarray(self._offsets, dtype=np.int64))
+
+        index_meta = {}
+        if len(chunk_ids):
+            vectors = np.memmap(self._path(PersistentVectorStore.VECTORS_FILE), dtype=np.float32,
+                                mode='r', shape=(len(chunk_ids), self.dimension))
+            index, template, index_meta = store.build_index(vectors, chunk_ids, retrain=retrain)
+            faiss.write_index(index, str(self._path(PersistentVectorStore.INDEX_FILE)))
+            if template is not None:
+                faiss.write_index(template, str(self._path(PersistentVectorStore.TRAINED_FILE)))
+            del vectors, index
+
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'settings': store.settings,
+            'dimension': self.dimension,
+            'next_id': int(self.next_id),
+            'index': index_meta,
+            'files': self.files
+        }
+        manifest['fingerprint'] = hashlib.sha256(
+            json.dumps(manifest, sort_keys=True).encode('utf-8')).hexdigest()
+        with open(self._path(PersistentVectorStore.MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        self._sync()
+
+        # Readers see either the old generation or the complete new one, never a mix
+        current_tmp = store.index_dir / f".{PersistentVectorStore.CURRENT_FILE}.tmp"
+        with open(current_tmp, 'w') as f:
+            f.write(self.generation_dir.name)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(current_tmp, store.index_dir / PersistentVectorStore.CURRENT_FILE)
+        self._closed = True
+        store.load()
+        self._remove_old_generations()
+
+    def _sync(self):
+        """Flush the generation's files to disk before ``CURRENT`` can point at them."""
+        for path in self.generation_dir.iterdir():
+            with open(path, 'rb') as f:
+                os.fsync(f.fileno())
+
+    def _remove_old_generations(self):
+        """Delete every generation but the new one and the one it replaced, crashed updates included."""
+        keep = {self.generation_dir, self.previous_dir}
+        for path in self.store.generations():
+            if path not in keep:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def abort(self):
+        """Discard the partially written version; the current store is left untouched."""
+        if self._closed:
+            return
+        self._vectors_out.close()
+        self._chunks_out.close()
+        shutil.rmtree(self.generation_dir, ignore_errors=True)
+        self._closed = True
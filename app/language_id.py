@@ -0,0 +1,289 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langdetect import DetectorFactory, detect as langdetect_detect
+from langdetect.lang_detect_exception import LangDetectException
+try:
+    from .cache import LRUCache
+except ImportError:
+    # Imported as a top-level module by translation_server.py
+    from cache import LRUCache
+
+# Scripts that identify a language on their own; Latin and Han text needs a closer look
+SCRIPT_LANGUAGES = {
+    'ARABIC': 'ar',
+    'DEVANAGARI': 'hi',
+    'CYRILLIC': 'ru',
+    'HIRAGANA': 'ja',
+    'KATAKANA': 'ja',
+    'HANGUL': 'ko',
+    'GREEK': 'el',
+    'HEBREW': 'he',
+    'THAI': 'th'
+}
+
+# langdetect profile names that differ from our language codes
+PROFILE_NAMES = {'zh': 'zh-cn'}
+
+# detect() draws random n-gram samples; a fixed seed makes it repeatable
+DetectorFactory.seed = 0
+
+# Common short replies, which n-gram statistics cannot tell apart
+SHORT_REPLIES = {
+    'en': {'yes', 'no', 'ok', 'okay', 'thanks', 'thank', 'you', 'please', 'hi', 'hello', 'maybe',
+           'day', 'days', 'hour', 'hours', 'week', 'weeks', 'fever', 'pain', 'bad', 'better', 'worse'},
+    'es': {'sí', 'si', 'no', 'vale', 'gracias', 'por', 'favor', 'hola', 'quizás', 'día', 'días',
+           'hora', 'horas', 'semana', 'semanas', 'fiebre', 'dolor', 'mal', 'mejor', 'peor'},
+    'fr': {'oui', 'non', 'merci', 'bonjour', 'salut', 'peut-être', 'jour', 'jours', 'heure', 'heures',
+           'semaine', 'semaines', 'fièvre', 'douleur', 'mieux', 'pire'},
+    'de': {'ja', 'nein', 'danke', 'bitte', 'hallo', 'vielleicht', 'tag', 'tage', 'stunde', 'stunden',
+           'woche', 'wochen', 'fieber', 'schmerzen', 'schlecht', 'besser', 'schlimmer'},
+    'pt': {'sim', 'não', 'nao', 'obrigado', 'obrigada', 'olá', 'ola', 'talvez', 'dia', 'dias',
+           'hora', 'horas', 'semana', 'semanas', 'febre', 'dor', 'mal', 'melhor', 'pior'}
+}
+
+# Replies that carry no language of their own
+NEUTRAL_REPLIES = {'ok', 'okay'}
+
+_NON_LETTERS = re.compile(r'[\W\d_]+')
+_ASCII_NON_LETTERS = re.compile(r'[^A-Za-z]+')
+_ASCII = re.compile(r'[\x00-\x7f]+')
+_char_scripts: Dict[str, str] = {}
+
+def _scripts(text: str) -> Dict[str, int]:
+    """Letter count per Unicode script (the first word of the character name)."""
+    latin = len(_ASCII_NON_LETTERS.sub('', text))
+    counts: Dict[str, int] = {'LATIN': latin} if latin else {}
+    for ch in _ASCII.sub('', text):
+        script = _char_scripts.get(ch)
+        if script is None:
+            script = unicodedata.name(ch, 'UNKNOWN').split(' ', 1)[0] if ch.isalpha() else ''
+            _char_scripts[ch] = 'HAN' if script == 'CJK' else script
+            script = _char_scripts[ch]
+        if script:
+            counts[script] = counts.get(script, 0) + 1
+    return counts
+
+def _ngrams(text: str) -> List[str]:
+    """Character 1- to 3-grams of each word, padded with spaces as in langdetect's profiles."""
+    grams = []
+    for word in _NON_LETTERS.sub(' ', text).split():
+        # langdetect skips all-caps words, which are mostly acronyms
+        if len(word) > 1 and word.isupper():
+            continue
+        padded = f' {word} '
+        grams.extend(word)
+        grams.extend(padded[i:i + 2] for i in range(len(padded) - 1))
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class NgramModel:
+    """Naive Bayes over the character n-gram profiles shipped with langdetect.
+
+    Only the requested languages are loaded, into one log-probability matrix
+    (n-grams x languages), so scoring a text is a row gather and a sum with
+    no sampling involved: the same text always gets the same scores.
+    """
+
+    def __init__(self, languages: Iterable[str], profile_dir: Optional[str] = None):
+        if profile_dir is None:
+            import langdetect
+            profile_dir = os.path.join(os.path.dirname(langdetect.__file__), 'profiles')
+
+        profiles = {}
+        for lang in languages:
+            path = os.path.join(profile_dir, PROFILE_NAMES.get(lang, lang))
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    profiles[lang] = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error loading language profile for {lang}: {str(e)}")
+
+        self.languages: List[str] = list(profiles)
+        vocabulary = sorted(set().union(*(profile['freq'] for profile in profiles.values())))
+        self.index: Dict[str, int] = {gram: i for i, gram in enumerate(vocabulary)}
+        self.log_probs = np.empty((len(vocabulary), len(self.languages)), dtype=np.float32)
+        for column, lang in enumerate(self.languages):
+            freq, n_words = profiles[lang]['freq'], profiles[lang]['n_words']
+            # Unseen n-grams get half a count, so one missing n-gram does not rule a language out
+            self.log_probs[:, column] = [
+                math.log((freq.get(gram, 0) + 0.5) / n_words[len(gram) - 1]) for gram in vocabulary
+            ]
+
+    def scores(self, text: str, languages: Optional[Iterable[str]] = None) -> Tuple[List[str], np.ndarray, int]:
+        """Mean log-likelihood of ``text``'s known n-grams per language, and how many there were."""
+        index = self.index
+        rows = [index[gram] for gram in _ngrams(text) if gram in index]
+        names = self.languages
+        totals = self.log_probs.take(rows, axis=0).sum(axis=0) / max(len(rows), 1)
+        if languages is not None:
+            columns = [names.index(lang) for lang in languages if lang in names]
+            names, totals = [names[c] for c in columns], totals[columns]
+        return names, totals, len(rows)
+
+_models: Dict[Tuple[str, ...], NgramModel] = {}
+_models_lock = threading.Lock()
+
+def load_ngram_model(languages: Iterable[str]) -> NgramModel:
+    """N-gram model for ``languages``, loaded once per process."""
+    key = tuple(sorted(languages))
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            model = _models[key] = NgramModel(key)
+        return model
+
+class LanguageIdentifier:
+    """Deterministic language identification for chat messages.
+
+    Texts are classified by the cheapest rule that settles them:
+
+    - no letters at all ("3", "?"): the caller's ``hint`` (the user's known
+      language), or the default;
+    - a script used by one language only (Arabic, Devanagari, Cyrillic,
+      kana...): that language, or the default if it is not supported; Han
+      without kana is Chinese unless hinted Japanese;
+    - short Latin text (under ``short_text`` letters, LANGUAGE_ID_SHORT_TEXT,
+      default 24): common replies such as "yes" or "3 días", then the n-gram
+      model's guess if its margin is at least ``min_margin``, then the hint;
+    - otherwise the n-gram model over the supported languages. If its margin
+      between the two best languages is under ``min_margin``
+      (LANGUAGE_ID_MIN_MARGIN), langdetect decides, seeded so that it is
+      deterministic too; its answer is only taken if it is supported.
+
+    Results for texts long enough to need the model are kept in an LRU of
+    ``cache_size`` entries (LANGUAGE_ID_CACHE_SIZE, default 4096) keyed by a
+    hash of the text, since the short-text rules are cheaper than a lookup.
+    """
+
+    # Only the beginning of long texts is scored
+    MAX_CHARS = 1000
+
+    def __init__(self,
+                 languages: Iterable[str],
+                 default: str = 'en',
+                 short_text: Optional[int] = None,
+                 min_margin: Optional[float] = None,
+                 cache_size: Optional[int] = None):
+        self.languages = list(languages)
+        self.default = default
+        self.short_text = short_text or int(os.environ.get("LANGUAGE_ID_SHORT_TEXT", 24))
+        self.min_margin = min_margin if min_margin is not None else float(
+            os.environ.get("LANGUAGE_ID_MIN_MARGIN", 0.25)
+        )
+        self._cache = LRUCache(maxsize=cache_size or int(os.environ.get("LANGUAGE_ID_CACHE_SIZE", 4096)))
+        self._model: Optional[NgramModel] = None
+        self._model_lock = threading.Lock()
+        self._detector_lock = threading.Lock()
+        self.decisions: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def model(self) -> NgramModel:
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = load_ngram_model(self.languages)
+        return self._model
+
+    def _count(self, rule: str):
+        with self._stats_lock:
+            self.decisions[rule] = self.decisions.get(rule, 0) + 1
+
+    def detect(self, text: str, hint: Optional[str] = None) -> str:
+        """Language code of ``text``; ``hint`` is the language the user is known to use."""
+        if hint not in self.languages:
+            hint = None
+        text = text[:self.MAX_CHARS]
+        scripts = _scripts(text)
+        letters = sum(scripts.values())
+        if not letters:
+            self._count('no_letters')
+            return hint or self.default
+
+        script = max(scripts, key=scripts.get)
+        if script == 'HAN':
+            # Japanese mixes kanji with kana; short kanji-only text is ambiguous
+            kana = 'HIRAGANA' in scripts or 'KATAKANA' in scripts
+            self._count('script')
+            return 'ja' if kana or hint == 'ja' else 'zh'
+        if script in SCRIPT_LANGUAGES:
+            self._count('script')
+            language = SCRIPT_LANGUAGES[script]
+            return language if language in self.languages else self.default
+
+        if letters < self.short_text:
+            self._count('short_text')
+            return self._short_text(text, hint)
+
+        key = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        language = self._cache.get(key)
+        if language is None:
+            language = self._classify(text)
+            self._cache.set(key, language)
+        return language
+
+    def detect_many(self, texts: List[str], hint: Optional[str] = None) -> List[str]:
+        """Languages of ``texts`` in order; repeated texts are classified once."""
+        detected = {text: self.detect(text, hint) for text in dict.fromkeys(texts)}
+        return [detected[text] for text in texts]
+
+    def _short_text(self, text: str, hint: Optional[str]) -> str:
+        words = [word for word in _NON_LETTERS.sub(' ', text.lower()).split() if word not in NEUTRAL_REPLIES]
+        if not words:
+            return hint or self.default
+        matches = [lang for lang, replies in SHORT_REPLIES.items()
+                   if lang in self.languages and all(word in replies for word in words)]
+        if hint in matches:
+            return hint
+        if len(matches) == 1:
+            return matches[0]
+        if matches:
+            # Several languages share these words ("no"); without a hint, prefer the default
+            return self.default if self.default in matches else matches[0]
+        # Too short for langdetect to be reliable; a clear model guess wins, else the hint
+        language, margin = self._best(text)
+        if hint is not None and (language is None or margin < self.min_margin):
+            return hint
+        return language or self.default
+
+    def _best(self, text: str, languages: Optional[List[str]] = None) -> Tuple[Optional[str], float]:
+        """Best language of the model and its margin over the runner-up."""
+        names, scores, count = self.model.scores(text, languages)
+        if not count:
+            return None, 0.0
+        order = np.argsort(scores)[::-1]
+        margin = float(scores[order[0]] - scores[order[1]]) if len(order) > 1 else float('inf')
+        return names[order[0]], margin
+
+    def _classify(self, text: str) -> str:
+        language, margin = self._best(text)
+        if language is not None and margin >= self.min_margin:
+            self._count('ngram')
+            return language
+        self._count('langdetect')
+        detected = self._langdetect(text)
+        if detected in self.languages:
+            return detected
+        return language or self.default
+
+    def _langdetect(self, text: str) -> Optional[str]:
+        # langdetect loads its profiles on first use without a lock of its own
+        with self._detector_lock:
+            try:
+                language = langdetect_detect(text)
+            except LangDetectException:
+                return None
+        return 'zh' if language.startswith('zh') else language
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._stats_lock:
+            decisions = dict(self.decisions)
+        return {'decisions': decisions, 'cache': self._cache.stats()}
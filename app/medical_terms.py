@@ -0,0 +1,124 @@
+import hashlib
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+try:
+    from .trie import trie_insert, trie_pattern
+except ImportError:
+    # Imported as a top-level module by translation_server.py
+    from trie import trie_insert, trie_pattern
+
+PLACEHOLDER = "__MEDICAL_TERM_{}__"
+_PLACEHOLDER_PATTERN = re.compile(r'__MEDICAL_TERM_(\d+)__')
+
+def term_id(term: str) -> str:
+    """Placeholder id for ``term``, the same in every process (unlike ``hash``)."""
+    return str(int(hashlib.sha1(term.encode('utf-8')).hexdigest()[:12], 16))
+
+def _compile_trie(trie: Dict) -> Optional[Pattern]:
+    return re.compile(trie_pattern(trie)) if trie else None
+
+def _compile(terms: Iterable[str]) -> Optional[Pattern]:
+    trie: Dict = {}
+    for term in terms:
+        trie_insert(trie, term)
+    return _compile_trie(trie)
+
+class _LanguageTerms:
+    def __init__(self):
+        self.trie: Dict = {}
+        self.size = 0
+        # (full pattern, pattern of terms added since it was compiled), swapped as one
+        self.compiled: Tuple[Optional[Pattern], Optional[Pattern]] = (None, None)
+        self.stale = True
+        self.recent: List[str] = []
+        self.rebuilding = False
+
+class MedicalTermProtector:
+    """Swaps medical terms for placeholders before translation and back after it.
+
+    Each language's terms are kept in a character trie compiled into one
+    regex, so a text is scanned once however many terms there are; where
+    terms overlap, the leftmost and then the longest one wins. Terms added
+    once the regex exists go into a small second regex right away while the
+    full one is recompiled in the background, so ``add`` never stalls
+    translations. Restoration is a single scan for placeholders.
+    """
+
+    def __init__(self):
+        self._languages: Dict[str, _LanguageTerms] = {}
+        self._terms: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def add(self, lang: str, terms: Iterable[str]):
+        with self._lock:
+            entry = self._languages.setdefault(lang, _LanguageTerms())
+            added = []
+            for term in terms:
+                if term and trie_insert(entry.trie, term):
+                    self._terms[term_id(term)] = term
+                    added.append(term)
+            entry.size += len(added)
+            if not added:
+                return
+            if entry.compiled[0] is None:
+                # Nothing compiled yet (initial load); compiled in full on first use
+                entry.stale = True
+                return
+            entry.recent.extend(added)
+            entry.compiled = (entry.compiled[0], _compile(entry.recent))
+            if not entry.rebuilding:
+                entry.rebuilding = True
+                threading.Thread(target=self._rebuild, args=(entry,), daemon=True).start()
+
+    def _rebuild(self, entry: _LanguageTerms):
+        while True:
+            with self._lock:
+                source = trie_pattern(entry.trie)
+                included = len(entry.recent)
+            pattern = re.compile(source)
+            with self._lock:
+                entry.recent = entry.recent[included:]
+                entry.compiled = (pattern, _compile(entry.recent))
+                if not entry.recent:
+                    entry.rebuilding = False
+                    return
+
+    def _patterns(self, lang: str) -> Tuple[Optional[Pattern], Optional[Pattern]]:
+        entry = self._languages.get(lang)
+        if entry is None:
+            return None, None
+        if entry.stale:
+            with self._lock:
+                if entry.stale:
+                    entry.compiled = (_compile_trie(entry.trie), None)
+                    entry.stale = False
+        return entry.compiled
+
+    def protect(self, text: str, lang: str) -> str:
+        """Replace ``lang``'s terms in ``text`` with stable placeholders."""
+        def replace(match):
+            return PLACEHOLDER.format(term_id(match.group(0)))
+
+        pattern, recent = self._patterns(lang)
+        if pattern is not None:
+            text = pattern.sub(replace, text)
+        if recent is not None:
+            text = recent.sub(replace, text)
+        return text
+
+    def restore(self, text: str, target_terms: Dict[str, str]) -> str:
+        """Replace placeholders with the term's translation, or the term itself if there is none."""
+        def replace(match):
+            term = self._terms.get(match.group(1))
+            if term is None:
+                return match.group(0)
+            return target_terms.get(term, term)
+
+        return _PLACEHOLDER_PATTERN.sub(replace, text)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            lang: {'terms': entry.size, 'pending': len(entry.recent)}
+            for lang, entry in self._languages.items()
+        }
@@ -96,6 +96,10 @@ class ChatSession(db.Model):
     ended_at = db.Column(db.DateTime)
     summary = db.Column(db.Text)
     triage_level = db.Column(db.String(20))  # urgent, non-urgent, seek_immediate_care
+    message_count = db.Column(db.Integer, nullable=False, default=0)  # bumped with every message insert
+    context_summary = db.Column(db.Text)  # running summary of turns no longer sent to the model verbatim
+    summarized_count = db.Column(db.Integer, nullable=False, default=0)  # leading messages covered by context_summary
+    patient_factors = db.Column(db.JSON, default=dict)  # risk factors mentioned by the patient so far
 
     user = db.relationship('User', backref='chat_sessions')
     messages = db.relationship('ChatMessage', backref='session', lazy=True, cascade='all, delete-orphan')
@@ -105,4 +109,5 @@ class ChatMessage(db.Model):
     session_id = db.Column(db.Integer, db.ForeignKey('chat_session.id'), nullable=False)
     role = db.Column(db.String(20), nullable=False)  # user or assistant
     content = db.Column(db.Text, nullable=False)
+    language = db.Column(db.String(10), default='en')
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
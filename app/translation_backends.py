@@ -0,0 +1,210 @@
+import json
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+
+class TranslationBackend(ABC):
+    """Translates batches of plain-text segments between two languages.
+
+    ``translate_batch`` returns one entry per input, in order; an entry is
+    None when that segment could not be translated, so callers can fall back
+    to the source text for it alone.
+    """
+
+    name = "base"
+    # Set by TranslationService; turns medical-term placeholders back into the terms
+    term_protector = None
+
+    @abstractmethod
+    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[Optional[str]]:
+        pass
+
+    def translate(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        return self.translate_batch([text], source_lang, target_lang)[0]
+
+    def close(self):
+        pass
+
+def pack_segments(texts: List[str], max_chars: int) -> List[List[int]]:
+    """Group segment indexes into newline-joined requests of at most ``max_chars``.
+
+    Segments that contain a newline themselves are sent on their own, so a
+    translated request can be split back on newlines.
+    """
+    requests, current, size = [], [], 0
+    for index, text in enumerate(texts):
+        alone = "\n" in text or len(text) >= max_chars
+        if current and (alone or size + 1 + len(text) > max_chars):
+            requests.append(current)
+            current, size = [], 0
+        if alone:
+            requests.append([index])
+            continue
+        size += len(text) + (1 if current else 0)
+        current.append(index)
+    if current:
+        requests.append(current)
+    return requests
+
+class GoogleTranslationBackend(TranslationBackend):
+    """deep_translator's GoogleTranslator, with requests running concurrently.
+
+    Segments are packed into newline-joined requests of up to ``max_chars``,
+    which run concurrently on at most ``max_concurrency`` threads
+    (TRANSLATION_MAX_CONCURRENCY, default 4), each with its own translator
+    instances. Rate-limited requests are retried with jittered backoff. A
+    batch waits at most a deadline derived from ``timeout``
+    (TRANSLATION_TIMEOUT, default 10s); segments still in flight then are
+    left untranslated. If a packed request comes back with a different
+    number of lines, its segments are translated one by one; if it fails,
+    all of its segments are left untranslated.
+    """
+
+    name = "google"
+    # Codes deep_translator spells differently from ours
+    LANGUAGE_CODES = {'zh': 'zh-CN'}
+
+    def __init__(self,
+                 max_concurrency: Optional[int] = None,
+                 timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None,
+                 max_chars: int = 5000,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 8.0):
+        self.max_concurrency = max_concurrency or int(os.environ.get("TRANSLATION_MAX_CONCURRENCY", 4))
+        self.timeout = timeout or float(os.environ.get("TRANSLATION_TIMEOUT", 10))
+        self.max_retries = max_retries if max_retries is not None else int(os.environ.get("TRANSLATION_MAX_RETRIES", 2))
+        self.max_chars = max_chars
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="translation")
+        # GoogleTranslator keeps per-request state on the instance, so threads never share one
+        self._local = threading.local()
+        self.requests = 0
+        self.failures = 0
+
+    def _code(self, lang: str) -> str:
+        return self.LANGUAGE_CODES.get(lang, lang)
+
+    def _translator(self, source_lang: str, target_lang: str):
+        from deep_translator import GoogleTranslator
+
+        translators = getattr(self._local, 'translators', None)
+        if translators is None:
+            translators = self._local.translators = {}
+        key = (source_lang, target_lang)
+        if key not in translators:
+            translators[key] = GoogleTranslator(source=self._code(source_lang), target=self._code(target_lang))
+        return translators[key]
+
+    def _request(self, text: str, source_lang: str, target_lang: str) -> str:
+        from deep_translator.exceptions import TooManyRequests
+
+        translator = self._translator(source_lang, target_lang)
+        for attempt in range(self.max_retries + 1):
+            self.requests += 1
+            try:
+                translated = translator.translate(text)
+            except TooManyRequests:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+                continue
+            if translated is None:
+                raise ValueError("No translation in response")
+            return translated
+
+    def _translate_group(self, texts: List[str], source_lang: str, target_lang: str) -> List[Optional[str]]:
+        try:
+            translated = self._request("\n".join(texts), source_lang, target_lang)
+        except Exception as e:
+            # Retrying segment by segment would only add load to a failing or rate-limiting service
+            print(f"Translation request error: {str(e)}")
+            self.failures += 1
+            return [None] * len(texts)
+        if len(texts) == 1:
+            return [translated]
+        lines = translated.split("\n")
+        if len(lines) == len(texts):
+            return [line.strip() for line in lines]
+        # Line structure was not preserved; fall back to one request per segment
+        return [self._translate_group([text], source_lang, target_lang)[0] for text in texts]
+
+    def translate_batch(self, texts, source_lang, target_lang):
+        results: List[Optional[str]] = [None] * len(texts)
+        groups = pack_segments(texts, self.max_chars)
+        futures = [
+            (group, self._executor.submit(self._translate_group, [texts[i] for i in group], source_lang, target_lang))
+            for group in groups
+        ]
+        # Requests run concurrently; the slowest one bounds the wait
+        deadline = time.monotonic() + self.timeout * (self.max_retries + 1) * 2
+        for group, future in futures:
+            try:
+                translated = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                print("Translation request timed out")
+                continue
+            for index, text in zip(group, translated):
+                results[index] = text
+        return results
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+class OfflineTranslationBackend(TranslationBackend):
+    """Network-free stand-in for development and benchmarks.
+
+    Segments found in the phrase tables (``segments_<lang>.json`` in
+    ``directory``, the translation memory format) are translated; anything
+    else is returned unchanged. Tables are keyed by the plain English text, so
+    medical-term placeholders are restored to their terms before the lookup. ``latency_ms`` (TRANSLATION_OFFLINE_LATENCY_MS)
+    adds a simulated round trip per call, so batching can be measured offline.
+    """
+
+    name = "offline"
+
+    def __init__(self, directory: Optional[str] = None, latency_ms: Optional[float] = None):
+        self.directory = directory or os.path.join(os.path.dirname(__file__), 'translations')
+        self.latency_ms = latency_ms if latency_ms is not None else float(
+            os.environ.get("TRANSLATION_OFFLINE_LATENCY_MS", 0)
+        )
+        self._tables: Dict[str, Dict[str, str]] = {}
+        self.requests = 0
+
+    def _table(self, lang: str) -> Dict[str, str]:
+        if lang not in self._tables:
+            try:
+                with open(os.path.join(self.directory, f'segments_{lang}.json'), 'r', encoding='utf-8') as f:
+                    self._tables[lang] = json.load(f)
+            except (OSError, ValueError):
+                self._tables[lang] = {}
+        return self._tables[lang]
+
+    def translate_batch(self, texts, source_lang, target_lang):
+        self.requests += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        table = self._table(target_lang) if source_lang == 'en' else {}
+        return [table.get(self._source_text(text), text) for text in texts]
+
+    def _source_text(self, text: str) -> str:
+        if self.term_protector is None:
+            return text
+        return self.term_protector.restore(text, {})
+
+BACKENDS = {
+    GoogleTranslationBackend.name: GoogleTranslationBackend,
+    OfflineTranslationBackend.name: OfflineTranslationBackend
+}
+
+def create_backend(name: Optional[str] = None) -> TranslationBackend:
+    """Backend named by ``name`` or TRANSLATION_BACKEND (``google`` or ``offline``)."""
+    name = name or os.environ.get("TRANSLATION_BACKEND", GoogleTranslationBackend.name)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown translation backend: {name}")
+    return BACKENDS[name]()
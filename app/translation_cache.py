@@ -0,0 +1,195 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+try:
+    from .cache import LRUCache
+except ImportError:
+    # Imported as a top-level module by translation_server.py
+    from cache import LRUCache
+
+def translation_key(text: str, source_lang: str, target_lang: str) -> str:
+    """Fixed-size cache key; long messages are not kept twice as key and value."""
+    digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+    return f"{source_lang}:{target_lang}:{digest}"
+
+class SQLiteTranslationStore:
+    """Translations in a SQLite file, shared by every worker process on a node.
+
+    Rows expire after ``ttl`` seconds. Once the table holds more than
+    ``max_rows``, the oldest rows are deleted; the check runs every few
+    hundred writes rather than on each one. The database runs in WAL mode so
+    readers in other processes are not blocked by a writer.
+    """
+
+    TRIM_EVERY = 256
+
+    def __init__(self, path: str, ttl: Optional[float] = None, max_rows: Optional[int] = None):
+        self.path = path
+        self.ttl = ttl
+        self.max_rows = max_rows or int(os.environ.get("TRANSLATION_CACHE_MAX_ROWS", 100000))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, expires_at REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS translations_created_at ON translations (created_at)")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections may not be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            row = self._connection().execute(
+                "SELECT value, expires_at FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Translation cache read error: {str(e)}")
+            with self._lock:
+                self.errors += 1
+            return None
+
+        with self._lock:
+            if row is None or (row[1] is not None and row[1] <= time.time()):
+                self.misses += 1
+                return None
+            self.hits += 1
+        return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO translations (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, expires_at)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Translation cache write error: {str(e)}")
+            with self._lock:
+                self.errors += 1
+            return
+
+        with self._lock:
+            self._writes += 1
+            trim = self._writes % self.TRIM_EVERY == 0
+        if trim:
+            self.trim()
+
+    def trim(self):
+        """Delete expired rows, then the oldest rows beyond ``max_rows``."""
+        try:
+            conn = self._connection()
+            expired = conn.execute(
+                "DELETE FROM translations WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            ).rowcount
+            (count,) = conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+            overflow = 0
+            if count > self.max_rows:
+                overflow = conn.execute(
+                    "DELETE FROM translations WHERE key IN "
+                    "(SELECT key FROM translations ORDER BY created_at LIMIT ?)",
+                    (count - self.max_rows,)
+                ).rowcount
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Translation cache trim error: {str(e)}")
+            return
+        with self._lock:
+            self.evictions += expired + overflow
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM translations")
+        conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            (size,) = self._connection().execute("SELECT COUNT(*) FROM translations").fetchone()
+        except sqlite3.Error:
+            size = None
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'path': self.path,
+                'size': size,
+                'max_rows': self.max_rows,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'errors': self.errors
+            }
+
+class TranslationCache:
+    """Two-tier translation cache.
+
+    The first tier is a per-process LRU of ``maxsize`` entries with a
+    ``ttl`` (TRANSLATION_CACHE_SIZE, default 4096; TRANSLATION_CACHE_TTL,
+    default 24 hours). When ``path`` (TRANSLATION_CACHE_PATH) is set, misses
+    fall through to a SQLite store shared by all workers on the node, and
+    its hits are copied into the first tier. Keys hash the text, so memory is
+    bounded by the translations rather than by their sources.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None, ttl: Optional[float] = None, path: Optional[str] = None):
+        self.ttl = ttl if ttl is not None else float(os.environ.get("TRANSLATION_CACHE_TTL", 24 * 3600))
+        self._memory = LRUCache(
+            maxsize=maxsize or int(os.environ.get("TRANSLATION_CACHE_SIZE", 4096)),
+            ttl=self.ttl or None
+        )
+        path = path or os.environ.get("TRANSLATION_CACHE_PATH")
+        self._shared = None
+        if path:
+            try:
+                self._shared = SQLiteTranslationStore(path, ttl=self.ttl or None)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Error opening shared translation cache: {str(e)}")
+
+    def get(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        key = translation_key(text, source_lang, target_lang)
+        value = self._memory.get(key)
+        if value is None and self._shared is not None:
+            value = self._shared.get(key)
+            if value is not None:
+                self._memory.set(key, value)
+        return value
+
+    def set(self, text: str, source_lang: str, target_lang: str, translation: str):
+        key = translation_key(text, source_lang, target_lang)
+        self._memory.set(key, translation)
+        if self._shared is not None:
+            self._shared.set(key, translation)
+
+    def clear(self):
+        self._memory.clear()
+        if self._shared is not None:
+            self._shared.clear()
+
+    def stats(self) -> Dict[str, Dict]:
+        return {
+            'memory': self._memory.stats(),
+            'shared': self._shared.stats() if self._shared is not None else None
+        }
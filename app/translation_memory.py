@@ -0,0 +1,83 @@
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, Optional
+
+_PLACEHOLDER = re.compile(r'\{(\w+)\}')
+
+def placeholders(text: str) -> set:
+    """Names of the ``{placeholder}`` fields in a segment template."""
+    return set(_PLACEHOLDER.findall(text))
+
+class TranslationMemory:
+    """English segments with prepared translations, one JSON file per language.
+
+    ``segments_<lang>.json`` in ``directory`` maps each English segment (a
+    reply line or a ``{placeholder}`` template) to its translation. The files
+    are written at build time by ``python -m app.chatbot.response_templates``,
+    so replies built from known segments need no remote translation call.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._segments: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, lang: str) -> str:
+        return os.path.join(self.directory, f'segments_{lang}.json')
+
+    def _load(self, lang: str) -> Dict[str, str]:
+        try:
+            with open(self._path(lang), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Error loading translation memory for {lang}: {str(e)}")
+            return {}
+
+    def _language(self, lang: str) -> Dict[str, str]:
+        with self._lock:
+            segments = self._segments.get(lang)
+            if segments is None:
+                segments = self._segments[lang] = self._load(lang)
+            return segments
+
+    def get(self, segment: str, target_lang: str) -> Optional[str]:
+        translation = self._language(target_lang).get(segment)
+        with self._lock:
+            if translation is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return translation
+
+    def missing(self, segments: Iterable[str], target_lang: str) -> list:
+        known = self._language(target_lang)
+        return [segment for segment in dict.fromkeys(segments) if segment not in known]
+
+    def add(self, target_lang: str, translations: Dict[str, str]):
+        """Add translations for ``target_lang`` and write its file."""
+        with self._lock:
+            segments = self._segments.get(target_lang)
+            segments = dict(self._load(target_lang) if segments is None else segments)
+            segments.update(translations)
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = self._path(target_lang) + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(segments, f, ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(tmp_path, self._path(target_lang))
+            # Readers keep the dict they already have; later lookups see the new one
+            self._segments[target_lang] = segments
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'languages': len(self._segments),
+                'segments': sum(len(segments) for segments in self._segments.values()),
+                'hits': self.hits,
+                'misses': self.misses
+            }
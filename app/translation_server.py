@@ -21,16 +21,39 @@ def translate():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/translate-batch', methods=['POST'])
+def translate_batch():
+    try:
+        data = request.get_json()
+        texts = data.get('texts')
+        target_lang = data.get('targetLang')
+        source_lang = data.get('sourceLang')
+
+        if not isinstance(texts, list) or not target_lang:
+            return jsonify({"error": "Missing required parameters"}), 400
+
+        if source_lang:
+            translated_texts = translation_service.translate_texts(texts, target_lang, source_lang)
+        else:
+            translated_texts = [translation_service.translate_text(text, target_lang) for text in texts]
+        return jsonify({"translatedTexts": translated_texts})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/detect-language', methods=['POST'])
 def detect_language():
     try:
         data = request.get_json()
         text = data.get('text')
+        texts = data.get('texts')
+        hint = data.get('hint')
 
+        if isinstance(texts, list):
+            return jsonify({"languages": translation_service.detect_languages(texts, hint)})
         if not text:
             return jsonify({"error": "Text is required"}), 400
 
-        language = translation_service.detect_language(text)
+        language = translation_service.detect_language(text, hint)
         return jsonify({"language": language})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1,15 +1,26 @@
 from flask_babel import Babel
-from deep_translator import GoogleTranslator
-from langdetect import detect
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 import json
 import os
-from functools import lru_cache
-from datetime import datetime, timedelta
+try:
+    from .language_id import LanguageIdentifier
+    from .medical_terms import MedicalTermProtector
+    from .translation_backends import TranslationBackend, create_backend
+    from .translation_cache import TranslationCache
+    from .translation_memory import TranslationMemory
+except ImportError:
+    # translation_server.py runs this module as a top-level script import
+    from language_id import LanguageIdentifier
+    from medical_terms import MedicalTermProtector
+    from translation_backends import TranslationBackend, create_backend
+    from translation_cache import TranslationCache
+    from translation_memory import TranslationMemory
 
 class TranslationService:
-    def __init__(self, app=None):
+    def __init__(self, app=None, backend: Optional[TranslationBackend] = None):
         self.babel = Babel()
+        # Selected by TRANSLATION_BACKEND; "offline" needs no network access
+        self.backend = backend or create_backend()
         if app is not None:
             self.init_app(app)
 
@@ -26,9 +37,12 @@ class TranslationService:
             'ja': 'Japanese'
         }
 
+        self.language_identifier = LanguageIdentifier(self.supported_languages)
         self.medical_terms = {}
-        self.translations_cache = {}
-        self.cache_expiry = timedelta(hours=24)
+        self.term_protector = MedicalTermProtector()
+        self.backend.term_protector = self.term_protector
+        self.translations_cache = TranslationCache()
+        self.translation_memory = TranslationMemory(os.path.join(os.path.dirname(__file__), 'translations'))
         self._load_medical_terms()
 
     def init_app(self, app):
@@ -53,14 +67,23 @@ class TranslationService:
             except Exception as e:
                 print(f"Error loading medical terms for {lang}: {str(e)}")
                 self.medical_terms[lang] = {}
+            self.term_protector.add(lang, self.medical_terms[lang])
 
-    @lru_cache(maxsize=1000)
-    def detect_language(self, text: str) -> str:
-        """Detect the language of the input text with caching."""
+    def detect_language(self, text: str, hint: Optional[str] = None) -> str:
+        """Detect the language of the input text; ``hint`` is the user's known language, if any."""
         try:
-            return detect(text)
-        except:
-            return 'en'  # Default to English if detection fails
+            return self.language_identifier.detect(text, hint)
+        except Exception as e:
+            print(f"Language detection error: {str(e)}")
+            return hint or 'en'  # Default to English if detection fails
+
+    def detect_languages(self, texts: List[str], hint: Optional[str] = None) -> List[str]:
+        """Detect the language of each text, classifying repeated texts once."""
+        try:
+            return self.language_identifier.detect_many(texts, hint)
+        except Exception as e:
+            print(f"Language detection error: {str(e)}")
+            return [hint or 'en'] * len(texts)
 
     def add_medical_term(self, term: str, translations: Dict[str, str]) -> bool:
         """Add a new medical term with its translations to all supported languages."""
@@ -70,6 +93,7 @@ class TranslationService:
                     if lang not in self.medical_terms:
                         self.medical_terms[lang] = {}
                     self.medical_terms[lang][term] = translation
+                    self.term_protector.add(lang, [term])
 
             # Save updated terms to files
             for lang in translations.keys():
@@ -90,58 +114,84 @@ class TranslationService:
         """Translate text while preserving medical terminology."""
         if not source_lang:
             source_lang = self.detect_language(text)
+        return self.translate_texts([text], target_lang, source_lang)[0]
 
-        if source_lang == target_lang:
-            return text
-
-        cache_key = f"{text}:{source_lang}:{target_lang}"
-        if cache_key in self.translations_cache:
-            cached_translation, timestamp = self.translations_cache[cache_key]
-            if timestamp + self.cache_expiry > datetime.now():
-                return cached_translation
-
-        try:
-            # First, protect medical terms by tokenizing them
-            protected_text = self._protect_medical_terms(text, source_lang)
-
-            # Translate the text
-            translator = GoogleTranslator(source=source_lang, target=target_lang)
-            translated_text = translator.translate(protected_text)
+    def translate_texts(self, texts: List[str], target_lang: str, source_lang: str) -> List[str]:
+        """Translate many texts with one backend call for all cache misses.
 
-            # Restore medical terms in the target language
-            final_text = self._restore_medical_terms(translated_text, target_lang)
-
-            # Cache the translation
-            self.translations_cache[cache_key] = (final_text, datetime.now())
+        Medical terms are protected as in ``translate_text``; a text that cannot
+        be translated is returned unchanged.
+        """
+        if source_lang == target_lang:
+            return list(texts)
 
-            return final_text
-        except Exception as e:
-            print(f"Translation error: {str(e)}")
-            return text  # Return original text if translation fails
+        results: List[Optional[str]] = [self.translations_cache.get(text, source_lang, target_lang) for text in texts]
+        # Each distinct miss is translated once
+        pending = list(dict.fromkeys(text for text, result in zip(texts, results) if result is None))
+        if pending:
+            try:
+                # First, protect medical terms by tokenizing them
+                protected = [self._protect_medical_terms(text, source_lang) for text in pending]
+                translated = self.backend.translate_batch(protected, source_lang, target_lang)
+            except Exception as e:
+                print(f"Translation error: {str(e)}")
+                translated = [None] * len(pending)
+
+            translations = {}
+            for text, translated_text in zip(pending, translated):
+                if translated_text is None:
+                    translations[text] = text  # Return original text if translation fails
+                    continue
+                # Restore medical terms in the target language
+                translations[text] = self._restore_medical_terms(translated_text, target_lang)
+                self.translations_cache.set(text, source_lang, target_lang, translations[text])
+            results = [translations[text] if result is None else result for text, result in zip(texts, results)]
+        return results
+
+    def translate_segments(self,
+                           segments: List[Tuple[str, Optional[Dict[str, str]]]],
+                           target_lang: str,
+                           source_lang: str = 'en') -> List[str]:
+        """Translate reply lines, or templates whose ``{placeholder}`` values are filled in afterwards.
+
+        Prepared translations from the translation memory are used when present;
+        the rest are translated together in one ``translate_texts`` call.
+        """
+        results: List[Optional[str]] = []
+        for segment, values in segments:
+            prepared = None
+            if source_lang != target_lang and source_lang == 'en':
+                prepared = self.translation_memory.get(segment, target_lang)
+            if prepared is not None and values:
+                try:
+                    prepared = prepared.format(**values)
+                except (KeyError, IndexError, ValueError) as e:
+                    # A damaged placeholder in the stored translation; translate the filled-in line instead
+                    print(f"Bad translation memory entry for {target_lang}: {str(e)}")
+                    prepared = None
+            results.append(prepared)
+
+        filled = [segment.format(**values) if values else segment for segment, values in segments]
+        missing = [index for index, result in enumerate(results) if result is None]
+        translated = self.translate_texts([filled[index] for index in missing], target_lang, source_lang)
+        for index, text in zip(missing, translated):
+            results[index] = text
+        return results
+
+    def translate_segment(self,
+                          segment: str,
+                          target_lang: str,
+                          values: Optional[Dict[str, str]] = None,
+                          source_lang: str = 'en') -> str:
+        return self.translate_segments([(segment, values)], target_lang, source_lang)[0]
 
     def _protect_medical_terms(self, text: str, source_lang: str) -> str:
         """Replace medical terms with placeholders to protect them during translation."""
-        protected_text = text
-        terms = self.medical_terms.get(source_lang, {})
-
-        for term in sorted(terms.keys(), key=len, reverse=True):  # Process longer terms first
-            placeholder = f"__MEDICAL_TERM_{hash(term)}__"
-            protected_text = protected_text.replace(term, placeholder)
-
-        return protected_text
+        return self.term_protector.protect(text, source_lang)
 
     def _restore_medical_terms(self, text: str, target_lang: str) -> str:
         """Restore medical terms in the target language."""
-        restored_text = text
-        source_terms = self.medical_terms.get('en', {})  # Use English as source
-        target_terms = self.medical_terms.get(target_lang, {})
-
-        for term in sorted(source_terms.keys(), key=len, reverse=True):
-            placeholder = f"__MEDICAL_TERM_{hash(term)}__"
-            target_term = target_terms.get(term, term)  # Fall back to English if no translation
-            restored_text = restored_text.replace(placeholder, target_term)
-
-        return restored_text
+        return self.term_protector.restore(text, self.medical_terms.get(target_lang, {}))
 
     def get_supported_languages(self) -> Dict[str, str]:
         """Return a dictionary of supported languages."""
@@ -153,4 +203,11 @@ class TranslationService:
 
     def clear_cache(self):
         """Clear the translations cache."""
-        self.translations_cache.clear()
\ No newline at end of file
+        self.translations_cache.clear()
+
+    def cache_stats(self) -> Dict[str, Dict]:
+        """Hit/miss/eviction counters for the translation caches and language detection."""
+        stats = self.translations_cache.stats()
+        stats['memory_segments'] = self.translation_memory.stats()
+        stats['language_id'] = self.language_identifier.stats()
+        return stats
\ No newline at end of file
@@ -0,0 +1,33 @@
+import re
+from typing import Dict
+
+# End-of-word marker; no real character maps to the empty string
+END = ''
+
+def trie_insert(trie: Dict, word: str) -> bool:
+    """Add ``word`` to a nested-dict character trie in place; False if it was already there."""
+    node = trie
+    for char in word:
+        node = node.setdefault(char, {})
+    if END in node:
+        return False
+    node[END] = {}
+    return True
+
+def trie_pattern(trie: Dict) -> str:
+    """Regex alternation of the words in ``trie`` with shared prefixes factored out.
+
+    ``chest pain|chest pressure`` becomes ``chest\\ p(?:ain|ressure)``, so the
+    regex engine walks a trie instead of trying every word at each position.
+    Longer words are tried before their prefixes.
+    """
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char != END]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if END in node:
+            body = '(?:' + body + ')?'
+        return body
+
+    return build(trie)
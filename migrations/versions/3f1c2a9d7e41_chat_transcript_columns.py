@@ -0,0 +1,56 @@
+"""chat session transcript, context and language columns
+
+Databases created before these columns were added get them here; fresh
+databases already have them from db.create_all(). message_count is
+backfilled so transcript caches do not reload legacy sessions every turn,
+and patient_factors stays NULL so those sessions are scanned once.
+
+Revision ID: 3f1c2a9d7e41
+Revises:
+Create Date: 2026-10-16 23:40:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d7e41'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+SESSION_COLUMNS = [
+    sa.Column('message_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('context_summary', sa.Text(), nullable=True),
+    sa.Column('summarized_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('patient_factors', sa.JSON(), nullable=True),
+]
+MESSAGE_COLUMNS = [
+    sa.Column('language', sa.String(length=10), nullable=True, server_default='en'),
+]
+
+
+def _add_missing(table, columns):
+    existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+    missing = [column for column in columns if column.name not in existing]
+    with op.batch_alter_table(table) as batch_op:
+        for column in missing:
+            batch_op.add_column(column)
+
+
+def upgrade():
+    _add_missing('chat_session', SESSION_COLUMNS)
+    _add_missing('chat_message', MESSAGE_COLUMNS)
+    op.execute(
+        "UPDATE chat_session SET message_count = "
+        "(SELECT COUNT(*) FROM chat_message WHERE chat_message.session_id = chat_session.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('chat_message') as batch_op:
+        batch_op.drop_column('language')
+    with op.batch_alter_table('chat_session') as batch_op:
+        for column in reversed(SESSION_COLUMNS):
+            batch_op.drop_column(column.name)
@@ -0,0 +1,156 @@
+import hashlib
+import re
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pytest
+
+
+class HashingEmbeddings:
+    """Deterministic bag-of-words embeddings standing in for the sentence-transformer."""
+
+    def __init__(self, dimension: int = 64):
+        self.dimension = dimension
+        self.embedded: List[str] = []
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in re.findall(r'\w+', text.lower()):
+            vector[int(hashlib.md5(word.encode('utf-8')).hexdigest(), 16) % self.dimension] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.embedded.extend(texts)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+@pytest.fixture(autouse=True, scope='session')
+def _artifact_dirs(tmp_path_factory):
+    """Keep compiled knowledge bases and correlation matrices out of the working tree."""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv('KNOWLEDGE_BASE_CACHE_DIR', str(tmp_path_factory.mktemp('knowledge_base_cache')))
+        monkeypatch.setenv('RISK_MATRIX_CACHE_DIR', str(tmp_path_factory.mktemp('risk_matrix_cache')))
+        yield
+
+
+@pytest.fixture
+def embeddings():
+    return HashingEmbeddings()
+
+
+@pytest.fixture
+def make_pdf():
+    """Write a PDF with one page per string in ``pages``."""
+    fitz = pytest.importorskip("fitz")
+
+    def make(path: Path, pages: List[str]) -> Path:
+        document = fitz.open()
+        for text in pages:
+            page = document.new_page()
+            page.insert_text((72, 72), text)
+        document.save(str(path))
+        document.close()
+        return path
+
+    return make
+
+
+class FakeChatModel:
+    """Chat backend that replays canned replies; ``fail_after`` makes streaming raise midway."""
+
+    def __init__(self, reply: str = "Please rest and drink fluids.", triage_level: str = "non-urgent",
+                 fail_after: int = None):
+        from app.chatbot.base import BaseChatModel
+
+        class _Model(BaseChatModel):
+            def generate_response(inner, messages):
+                self.calls.append(('generate_response', messages))
+                return self.reply
+
+            def stream_response(inner, messages):
+                self.calls.append(('stream_response', messages))
+                for i, word in enumerate(self.reply.split(" ")):
+                    if self.fail_after is not None and i >= self.fail_after:
+                        raise RuntimeError("model backend went away")
+                    yield word if i == 0 else " " + word
+
+            def generate_summary(inner, messages, running_summary=None):
+                self.calls.append(('generate_summary', messages))
+                return "Summary of the conversation."
+
+            def determine_triage_level(inner, messages):
+                self.calls.append(('determine_triage_level', messages))
+                return self.triage_level
+
+        self.reply = reply
+        self.triage_level = triage_level
+        self.fail_after = fail_after
+        self.calls = []
+        self.model = _Model()
+
+
+@pytest.fixture(scope='session')
+def _application(tmp_path_factory):
+    # flask_session registers its table on the shared metadata, so the app is created once
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path_factory.mktemp('db') / 'app.db'}")
+        # Debug mode skips the file log handler
+        monkeypatch.setenv('FLASK_DEBUG', '1')
+        monkeypatch.delenv('CHATBOT_WARMUP', raising=False)
+        from app import create_app
+        from app.api import api_bp
+
+        application = create_app()
+    application.config['TESTING'] = True
+    application.register_blueprint(api_bp, url_prefix='/api')
+    return application
+
+
+@pytest.fixture
+def flask_app(_application):
+    """The application on a throwaway SQLite database, with the API blueprint mounted."""
+    from app import db
+
+    with _application.app_context():
+        db.drop_all()
+        db.create_all()
+        yield _application
+        db.session.remove()
+
+
+@pytest.fixture
+def patient(flask_app):
+    from app.models import User, db
+
+    user = User(username='pat', email='pat@example.com', name='Pat', role='patient')
+    user.set_password('secret')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def client(flask_app, patient):
+    """Test client logged in as ``patient``."""
+    client = flask_app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(patient.id)
+        session['_fresh'] = True
+    return client
+
+
+@pytest.fixture
+def chat_model(monkeypatch):
+    """Route ChatbotService's model calls to a FakeChatModel, with a fresh transcript cache."""
+    from app.chatbot.service import ChatbotService
+    from app.chatbot.transcript_cache import TranscriptCache
+
+    fake = FakeChatModel()
+    monkeypatch.setattr(ChatbotService, '_model', fake.model)
+    monkeypatch.setattr(ChatbotService, '_transcripts', TranscriptCache())
+    return fake
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+from app.chatbot.ann_index import (
+    IndexConfig, apply_search_params, create_index, describe_index, train_index
+)
+from app.chatbot.index_benchmark import benchmark, load_vectors, recall_at_k
+from app.chatbot.vector_store import PersistentVectorStore
+
+SETTINGS = {'embedding_model': 'random', 'chunk_size': 1000, 'chunk_overlap': 200}
+
+
+@pytest.fixture(scope='module')
+def vectors():
+    return np.random.default_rng(0).standard_normal((3000, 32)).astype(np.float32)
+
+
+def test_unknown_index_type_is_rejected():
+    with pytest.raises(ValueError):
+        IndexConfig(index_type='annoy')
+
+
+def test_config_from_env(monkeypatch):
+    monkeypatch.setenv('VECTOR_INDEX_TYPE', 'hnsw')
+    monkeypatch.setenv('VECTOR_INDEX_EF_SEARCH', '128')
+    config = IndexConfig.from_env()
+    assert (config.index_type, config.ef_search) == ('hnsw', 128)
+    # Search-time knobs do not force a rebuild
+    assert 'ef_search' not in config.build_params()
+
+
+def test_small_corpora_fall_back_to_exact_search():
+    index = create_index(IndexConfig(index_type='ivfpq'), 20, 32)
+    assert describe_index(index) == 'IndexFlatL2'
+
+
+@pytest.mark.parametrize("index_type,expected", [
+    ('flat', 'IndexFlatL2'),
+    ('ivf', 'IndexIVFFlat'),
+    ('hnsw', 'IndexHNSWFlat'),
+])
+def test_index_types_find_exact_neighbours(vectors, index_type, expected):
+    config = IndexConfig(index_type=index_type, nlist=16, nprobe=16)
+    index = train_index(create_index(config, len(vectors), vectors.shape[1]), vectors, config.max_train_points)
+    index.add_with_ids(vectors, np.arange(len(vectors), dtype=np.int64))
+    apply_search_params(index, config)
+
+    assert describe_index(index) == expected
+    _, ids = index.search(vectors[:20], 1)
+    assert (ids[:, 0] == np.arange(20)).mean() >= 0.95
+
+
+def test_nprobe_trades_recall_for_latency(vectors):
+    results = benchmark(vectors, vectors[:50] + 0.01, k=5, index_types=['ivf'],
+                        base_config=IndexConfig(nlist=32))
+    recalls = [row['recall@5'] for row in results]
+    assert [row['value'] for row in results] == [1, 4, 16, 64]
+    assert recalls == sorted(recalls)
+    assert recalls[-1] == 1.0
+
+
+def test_recall_at_k():
+    found = np.array([[1, 2, -1], [4, 5, 6]])
+    expected = np.array([[1, 2, 3], [7, 8, 9]])
+    assert recall_at_k(found, expected) == pytest.approx(2 / 6)
+
+
+def test_store_rebuilds_index_when_config_changes(tmp_path, vectors):
+    store = PersistentVectorStore(tmp_path, SETTINGS, IndexConfig(index_type='flat'))
+    update = store.begin_update([], [])
+    update.add_file('doc.pdf', {'sha256': 'x', 'mtime': 0, 'size': 0}, len(vectors))
+    update.add_chunks([f"chunk {i}" for i in range(len(vectors))], vectors)
+    update.commit()
+    assert not store.index_outdated()
+
+    store = PersistentVectorStore(tmp_path, SETTINGS, IndexConfig(index_type='ivf', nlist=16))
+    assert store.load()
+    assert store.index_outdated()
+    store.rebuild_index()
+
+    assert not store.index_outdated()
+    assert store.index_info()['index'] == 'IndexIVFFlat'
+    assert store.index_info()['trained_on'] == len(vectors)
+    assert store.search(vectors[7], 1) == [7]
+    assert load_vectors(tmp_path).shape == vectors.shape
+
+    store.set_search_params(nprobe=2)
+    assert store.index_info()['nprobe'] == 2
+
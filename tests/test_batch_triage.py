@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from app.chatbot.batch_triage import BatchTriageService
+from app.chatbot.risk_assessment import RiskAssessment
+from app.chatbot.symptom_keywords import symptom_ids, symptom_phrases
+from app.chatbot.triage_system import AdvancedTriageSystem
+
+
+@pytest.fixture(scope='module')
+def batch():
+    risk = RiskAssessment("app/data/medical_knowledge.json", matrix_cache_dir="")
+    return BatchTriageService(AdvancedTriageSystem(poll_interval=0), risk, chunk_size=2, workers=2)
+
+
+def test_symptoms_are_converted_both_ways():
+    assert symptom_ids(["chest_pain", "I feel feverish and tired", "Chest Pain"]) == ['chest_pain', 'fever', 'fatigue']
+    assert symptom_phrases(["chest_pain", "crushing pressure"]) == ["chest pain", "crushing pressure"]
+
+
+@pytest.mark.parametrize("symptoms", [["chest_pain"], ["chest pain"], ["crushing chest pain since noon"]])
+def test_chest_pain_records_are_emergencies(batch, symptoms):
+    [result] = batch.score_chunk([{'id': 1, 'symptoms': symptoms}])
+
+    assert result['triage_level'] == 'emergency'
+    assert result['red_flags'] == ['chest_pain']
+    assert result['risk']['total_risk'] > 0
+
+
+def test_results_stream_in_input_order_with_errors_in_place(batch):
+    records = [
+        {'id': 'a', 'symptoms': ['headache']},
+        {'id': 'b', 'symptoms': 'not a list'},
+        {'id': 'c', 'symptoms': ['shortness_of_breath'], 'risk_factors': ['age_65_plus']},
+        'garbage',
+        {'id': 'e', 'symptoms': ['high fever'], 'risk_factors': {'diabetes': 1}},
+    ]
+    results = list(batch.score_records(iter(records)))
+
+    assert [result.get('id') for result in results] == ['a', 'b', 'c', None, 'e']
+    assert 'error' in results[1] and 'error' in results[3]
+    assert [results[i]['triage_level'] for i in (0, 2, 4)] == ['non_urgent', 'emergency', 'urgent']
+    assert results[2]['risk']['risk_multiplier'] > 1
+
+
+def test_batch_endpoint_streams_ndjson(flask_app, chat_model):
+    from app.models import User, db
+
+    nurse = User(username='nurse', email='nurse@example.com', name='Nurse', role='doctor')
+    db.session.add(nurse)
+    db.session.commit()
+    client = flask_app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(nurse.id)
+        session['_fresh'] = True
+
+    body = "\n".join([json.dumps({'id': 1, 'symptoms': ['chest_pain']}), "{broken", ""])
+    response = client.post('/api/triage/batch', data=body, content_type='application/x-ndjson')
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert lines[0]['triage_level'] == 'emergency'
+    assert 'error' in lines[1]
+
+
+def test_patients_cannot_run_batches(client):
+    assert client.post('/api/triage/batch', json=[]).status_code == 403
@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+from app.chatbot.batching import MicroBatcher
+
+
+class BlockingRunner:
+    """run_batch that records each batch and holds the first one until released."""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def __call__(self, group, items):
+        if not self.batches:
+            self.started.set()
+            self.release.wait(5)
+        self.batches.append((group, list(items)))
+        return [ValueError(item) if item == 'bad' else item.upper() for item in items]
+
+
+def test_requests_of_one_group_share_a_batch():
+    runner = BlockingRunner()
+    batcher = MicroBatcher(runner, max_batch_size=8, max_wait_ms=0)
+    first = batcher.submit_nowait('first', group='a')
+    assert runner.started.wait(5)
+
+    futures = [batcher.submit_nowait(item, group) for item, group in
+               [('x', 'a'), ('y', 'b'), ('z', 'a')]]
+    runner.release.set()
+
+    assert first.result(5) == 'FIRST'
+    assert [future.result(5) for future in futures] == ['X', 'Y', 'Z']
+    assert runner.batches[1:] == [('a', ['x', 'z']), ('b', ['y'])]
+    assert batcher.stats()['items'] == 4
+
+
+def test_an_exception_result_only_fails_its_own_request():
+    runner = BlockingRunner()
+    runner.release.set()
+    batcher = MicroBatcher(runner, max_batch_size=8, max_wait_ms=50)
+    good, bad = batcher.submit_nowait('ok'), batcher.submit_nowait('bad')
+
+    assert good.result(5) == 'OK'
+    with pytest.raises(ValueError):
+        bad.result(5)
+    assert batcher.submit('again', timeout=5) == 'AGAIN'
+
+
+def test_cancelled_requests_are_not_run():
+    runner = BlockingRunner()
+    batcher = MicroBatcher(runner, max_batch_size=8, max_wait_ms=0)
+    batcher.submit_nowait('first', group='a')
+    assert runner.started.wait(5)
+
+    cancelled = batcher.submit_nowait('skipped', group='b')
+    assert cancelled.cancel()
+    runner.release.set()
+
+    assert batcher.submit('next', group='b', timeout=5) == 'NEXT'
+    assert all('skipped' not in items for _, items in runner.batches)
+
+
+def test_requests_run_alone_resolve_without_waiting_for_others():
+    second_started, release_second = threading.Event(), threading.Event()
+    batches = []
+
+    def run_batch(group, items):
+        batches.append(list(items))
+        if items == ['second']:
+            second_started.set()
+            release_second.wait(5)
+        return [item.upper() for item in items]
+
+    # A long collection window that requests run alone must not wait for
+    batcher = MicroBatcher(run_batch, max_batch_size=8, max_wait_ms=2000)
+    first = batcher.submit_nowait('first', group='stream', alone=True)
+    second = batcher.submit_nowait('second', group='stream', alone=True)
+
+    assert first.result(1) == 'FIRST'
+    assert second_started.wait(1)
+    assert not second.done()
+    release_second.set()
+    assert second.result(5) == 'SECOND'
+    assert batches == [['first'], ['second']]
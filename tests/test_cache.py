@@ -0,0 +1,102 @@
+import time
+
+import pytest
+
+from app.cache import LRUCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'b' is now the oldest
+    cache.set('c', 3)
+
+    assert 'b' not in cache
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    cache = LRUCache(maxsize=4, ttl=10)
+    cache.set('a', 1)
+
+    now[0] += 9
+    assert cache.get('a') == 1
+    now[0] += 2
+    assert cache.get('a', 'gone') == 'gone'
+    assert cache.stats()['expirations'] == 1
+    assert len(cache) == 0
+
+
+def test_stats_count_hits_and_misses():
+    cache = LRUCache(maxsize=4)
+    cache.set('a', 1)
+    cache.get('a')
+    cache.get('b')
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+
+
+def test_pop_and_clear():
+    cache = LRUCache(maxsize=4)
+    cache.set('a', 1)
+    assert cache.pop('a') == 1
+    assert cache.pop('a', 'missing') == 'missing'
+    cache.set('b', 2)
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_maxsize_must_be_positive():
+    with pytest.raises(ValueError):
+        LRUCache(maxsize=0)
+
+
+class FakeStore:
+    def __init__(self):
+        self.fingerprint = 'v1'
+        self.searches = 0
+
+    def __len__(self):
+        return 3
+
+    def search(self, query_vector, k):
+        self.searches += 1
+        return [0, 1][:k]
+
+    def get_texts(self, chunk_ids):
+        return [f"chunk {i}" for i in chunk_ids]
+
+
+def test_document_search_caches_embeddings_and_results(embeddings):
+    pytest.importorskip("torch")
+    pytest.importorskip("langchain")
+    from app.chatbot.document_processor import DocumentProcessor
+
+    processor = DocumentProcessor.__new__(DocumentProcessor)
+    processor.embeddings = embeddings
+    processor.embedding_cache = LRUCache(maxsize=8)
+    processor.result_cache = LRUCache(maxsize=8)
+    processor._cached_fingerprint = None
+    processor.vector_store = FakeStore()
+
+    assert processor.search_documentation("Chest  pain", k=2) == ["chunk 0", "chunk 1"]
+    assert processor.search_documentation("chest pain", k=2) == ["chunk 0", "chunk 1"]
+    assert processor.vector_store.searches == 1
+
+    # A new corpus version drops cached results but keeps query embeddings
+    processor.vector_store.fingerprint = 'v2'
+    processor.search_documentation("chest pain", k=2)
+    assert processor.vector_store.searches == 2
+    assert processor.cache_stats()['embeddings']['hits'] >= 1
+
+
+def test_normalize_query():
+    pytest.importorskip("torch")
+    pytest.importorskip("langchain")
+    from app.chatbot.document_processor import DocumentProcessor
+
+    assert DocumentProcessor.normalize_query("  Chest\tPAIN \n") == "chest pain"
@@ -0,0 +1,47 @@
+from app.chatbot.context_budget import ContextBudget
+from app.chatbot.service import SYSTEM_PROMPT, ChatbotService
+from app.models import ChatSession
+
+SYSTEM = [{"role": "system", "content": "x" * 40}]
+
+
+def words(text):
+    return len(text.split()) if text else 0
+
+
+def turns(count, length=10):
+    return [{"role": "user" if i % 2 else "assistant", "content": " ".join(["word"] * length)}
+            for i in range(count)]
+
+
+def budget(max_tokens):
+    return ContextBudget(words, max_tokens, reserve_tokens=0, summary_tokens=0, keep_ratio=0.5, min_recent=2)
+
+
+def test_everything_is_sent_while_it_fits():
+    assert budget(200).plan(SYSTEM, turns(6)) == 0
+
+
+def test_oldest_turns_are_handed_to_the_summary():
+    # 14 tokens a turn against a target of half of the 100-5 tokens left
+    assert budget(100).plan(SYSTEM, turns(10)) == 7
+    # Already summarized turns are not counted again
+    assert budget(100).plan(SYSTEM, turns(10), summarized=7, summary="short") == 7
+
+
+def test_an_oversized_system_prompt_still_keeps_the_latest_turns(capsys):
+    assert budget(3).plan(SYSTEM, turns(10)) == 8
+    assert "over the 3-token budget" in capsys.readouterr().out
+
+
+def test_service_summarizes_old_turns_and_keeps_the_system_prompt(chat_model, patient, monkeypatch):
+    monkeypatch.setattr(chat_model.model, 'MAX_INPUT_TOKENS', 50, raising=False)
+    session = ChatbotService.create_session(patient.id)
+    for i in range(6):
+        ChatbotService.add_message(session.id, "user", f"message {i}")
+
+    context = ChatbotService._model_context(session.id, ChatbotService.get_conversation_messages(session.id))
+    assert context[0] == {"role": "system", "content": SYSTEM_PROMPT}
+    assert context[1]['content'] == "Summary of the earlier conversation: Summary of the conversation."
+    assert [m['content'] for m in context[2:]] == ["message 4", "message 5"]
+    assert ChatSession.query.get(session.id).summarized_count == 5
@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.chatbot import risk_assessment
+from app.chatbot.knowledge_base import KnowledgeBase
+from app.chatbot.risk_assessment import RiskAssessment, build_correlation_matrix
+
+SEVERITY = {'LOW': 1, 'MODERATE': 2, 'HIGH': 3, 'CRITICAL': 4}
+
+RECORDS = [
+    {'id': 'cough', 'name': 'Cough', 'category': 'Respiratory', 'severity': 'MODERATE',
+     'related_conditions': ['flu', 'cold'], 'risk_factors': {}},
+    {'id': 'wheeze', 'name': 'Wheeze', 'category': 'Respiratory', 'severity': 'HIGH',
+     'related_conditions': ['asthma'], 'risk_factors': {}},
+    {'id': 'fever', 'name': 'Fever', 'category': 'General', 'severity': 'MODERATE',
+     'related_conditions': ['flu', 'cold', 'strep'], 'risk_factors': {}},
+    {'id': 'rash', 'name': 'Rash', 'category': 'Skin', 'severity': 'LOW',
+     'related_conditions': ['allergy'], 'risk_factors': {}},
+]
+
+
+def naive_correlation(records):
+    n = len(records)
+    matrix = np.zeros((n, n))
+    for i, a in enumerate(records):
+        for j, b in enumerate(records):
+            if i == j:
+                continue
+            shared = len(set(a['related_conditions']) & set(b['related_conditions']))
+            same_category = a['category'] == b['category']
+            difference = abs(SEVERITY[a['severity']] - SEVERITY[b['severity']])
+            matrix[i, j] = (0.5 * shared + 0.3 * same_category) / (1 + 0.5 * difference)
+    return matrix
+
+
+def test_sparse_build_matches_the_pairwise_formula():
+    matrix = build_correlation_matrix(KnowledgeBase.from_records(RECORDS))
+    assert np.allclose(matrix.toarray(), naive_correlation(RECORDS))
+    # Unrelated pairs are never stored
+    assert matrix.nnz == np.count_nonzero(naive_correlation(RECORDS))
+
+
+@pytest.fixture
+def knowledge_base_path(tmp_path):
+    path = tmp_path / 'knowledge.json'
+    path.write_text(json.dumps({'symptoms': RECORDS}))
+    return str(path)
+
+
+def test_matrix_is_cached_and_reused(tmp_path, knowledge_base_path, monkeypatch):
+    cache_dir = tmp_path / 'cache'
+    first = RiskAssessment(knowledge_base_path, matrix_cache_dir=str(cache_dir))
+    [cached] = cache_dir.glob("correlation-v*.npz")
+
+    def fail(knowledge_base):
+        raise AssertionError("matrix rebuilt despite the cache")
+
+    monkeypatch.setattr(risk_assessment, 'build_correlation_matrix', fail)
+    second = RiskAssessment(knowledge_base_path, matrix_cache_dir=str(cache_dir))
+    assert np.allclose(second.symptom_vectors.toarray(), first.symptom_vectors.toarray())
+    assert cached.name.endswith(f"{first.knowledge_base.fingerprint}.npz")
+
+
+def test_unreadable_cache_is_rebuilt(tmp_path, knowledge_base_path, capsys):
+    cache_dir = tmp_path / 'cache'
+    RiskAssessment(knowledge_base_path, matrix_cache_dir=str(cache_dir))
+    [cached] = cache_dir.glob("correlation-v*.npz")
+    cached.write_bytes(b"not a matrix")
+
+    rebuilt = RiskAssessment(knowledge_base_path, matrix_cache_dir=str(cache_dir))
+    assert np.allclose(rebuilt.symptom_vectors.toarray(), naive_correlation(RECORDS))
+    assert "Error loading cached correlation matrix" in capsys.readouterr().out
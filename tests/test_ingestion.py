@@ -0,0 +1,70 @@
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("langchain")
+
+from app.chatbot.ingestion import IngestionPipeline, parse_pdf
+from app.chatbot.vector_store import PersistentVectorStore, file_sha256
+
+SETTINGS = {'embedding_model': 'hashing', 'chunk_size': 1000, 'chunk_overlap': 200}
+
+
+class RecordingEmbeddings:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return self.embeddings.embed_documents(texts)
+
+
+@pytest.fixture
+def pdfs(tmp_path, make_pdf):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    files = [
+        make_pdf(docs / "a.pdf", ["alpha one", "alpha two"]),
+        make_pdf(docs / "b.pdf", ["bravo one"]),
+        make_pdf(docs / "c.pdf", ["charlie one", "", "charlie three"]),
+    ]
+    (docs / "broken.pdf").write_bytes(b"not a pdf")
+    return files[:2] + [docs / "broken.pdf"] + files[2:]
+
+
+def test_parse_pdf_returns_manifest_entry_and_page_chunks(pdfs):
+    entry, page_count, chunks = parse_pdf(str(pdfs[-1]), 1000, 200)
+    assert entry['sha256'] == file_sha256(pdfs[-1])
+    assert entry['size'] == pdfs[-1].stat().st_size
+    assert page_count == 3
+    # Blank pages produce no chunks
+    assert chunks == ["charlie one", "charlie three"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_pipeline_streams_batches_in_file_order(tmp_path, pdfs, embeddings, workers):
+    store = PersistentVectorStore(tmp_path / "index", SETTINGS)
+    update = store.begin_update([], [])
+    recording = RecordingEmbeddings(embeddings)
+
+    stats = IngestionPipeline(recording, 1000, 200, workers=workers, batch_size=2).run(pdfs, update)
+    update.commit()
+
+    assert stats.files == 3
+    assert stats.pages == 6
+    assert stats.chunks == 5
+    assert stats.failed == ["broken.pdf"]
+    assert all(len(batch) <= 2 for batch in recording.batches)
+    assert store.get_texts(store.chunk_ids) == [
+        "alpha one", "alpha two", "bravo one", "charlie one", "charlie three"
+    ]
+    assert store.manifest['files']['c.pdf']['chunk_ids'] == [3, 4]
+    assert stats.as_dict()['chunks'] == 5
+
+
+def test_chunks_must_follow_their_file(tmp_path, embeddings):
+    store = PersistentVectorStore(tmp_path / "index", SETTINGS)
+    update = store.begin_update([], [])
+    with pytest.raises(RuntimeError):
+        update.add_chunks(["orphan"], [embeddings.embed_query("orphan")])
+    update.abort()
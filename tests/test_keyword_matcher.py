@@ -0,0 +1,45 @@
+from app.chatbot.keyword_matcher import KeywordMatch, KeywordMatcher
+from app.chatbot.service import ChatbotService
+
+TABLE = {
+    'chest_pain': ['chest pain', 'chest pressure'],
+    'pain': ['pain'],
+    'asthma': ['asthma'],
+}
+
+
+def test_whole_words_only_and_case_insensitive():
+    matcher = KeywordMatcher(TABLE)
+    assert matcher.labels("Asthma. Not asthmatic, no painkillers") == ['asthma']
+
+
+def test_overlapping_keywords_are_all_reported_with_spans():
+    matcher = KeywordMatcher(TABLE)
+    text = "Sharp CHEST PAIN since noon"
+    assert matcher.find_all(text) == [
+        KeywordMatch('chest_pain', 'chest pain', 6, 16),
+        KeywordMatch('pain', 'pain', 12, 16),
+    ]
+
+
+def test_labels_follow_table_order():
+    matcher = KeywordMatcher(TABLE)
+    assert matcher.labels("pain, asthma and chest pressure") == ['chest_pain', 'pain', 'asthma']
+
+
+def test_a_keyword_can_belong_to_several_labels():
+    matcher = KeywordMatcher({'a': ['fever'], 'b': ['fever', 'chills']})
+    assert matcher.labels("fever") == ['a', 'b']
+
+
+def test_empty_table_matches_nothing():
+    assert KeywordMatcher({}).find_all("anything") == []
+
+
+def test_service_symptom_extraction():
+    assert ChatbotService.extract_symptoms("Feeling feverish and breathless, with migraines") == [
+        'fever', 'shortness_of_breath', 'headache'
+    ]
+    assert ChatbotService._extract_patient_factors([{"content": "I'm a smoker"}, {"content": "and diabetic"}]) == {
+        'diabetes': 1.0, 'smoking': 1.0
+    }
@@ -0,0 +1,82 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.chatbot.knowledge_base import Severity, compile_knowledge_base, open_knowledge_base
+
+RECORDS = [
+    {'id': 'cough', 'name': 'Cough', 'category': 'Respiratory', 'severity': 'MODERATE',
+     'related_conditions': ['flu', 'cold', 'flu'], 'risk_factors': {'smoking': 1.5},
+     'temporal_patterns': {'night': 1.3}},
+    {'id': 'rash', 'name': 'Rash', 'category': 'Skin', 'severity': 'low',
+     'related_conditions': ['allergy'], 'risk_factors': {}},
+]
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'knowledge.json'
+    path.write_text(json.dumps({'symptoms': RECORDS}))
+    return path
+
+
+def test_compiled_arrays_are_memory_mapped_read_only(source, tmp_path):
+    knowledge_base = compile_knowledge_base(str(source), cache_dir=str(tmp_path / 'cache'))
+
+    assert isinstance(knowledge_base.severity, np.memmap)
+    with pytest.raises(ValueError):
+        knowledge_base.severity[0] = 4
+    assert [path.name for path in (tmp_path / 'cache').iterdir()] == [f"kb-{knowledge_base.fingerprint}"]
+
+
+def test_symptom_table_rebuilds_records(source, tmp_path):
+    knowledge_base = compile_knowledge_base(str(source), cache_dir=str(tmp_path / 'cache'))
+    cough = knowledge_base.symptoms['cough']
+
+    assert (cough.name, cough.category, cough.severity) == ('Cough', 'Respiratory', Severity.MODERATE)
+    assert cough.related_conditions == ['flu', 'cold']
+    assert cough.risk_factors == {'smoking': 1.5}
+    assert cough.temporal_patterns == {'night': 1.3}
+    assert knowledge_base.symptoms['rash'].severity == Severity.LOW
+    assert list(knowledge_base.symptoms) == ['cough', 'rash'] and 'fever' not in knowledge_base.symptoms
+    assert knowledge_base.condition_incidence().toarray().tolist() == [[1, 1, 0], [0, 0, 1]]
+
+
+def test_unchanged_sources_reuse_the_compiled_artifact(source, tmp_path, monkeypatch):
+    cache_dir = tmp_path / 'cache'
+    first = compile_knowledge_base(str(source), cache_dir=str(cache_dir))
+
+    monkeypatch.setattr('app.chatbot.knowledge_base.KnowledgeBase.from_records',
+                        lambda *args: pytest.fail("recompiled an unchanged source"))
+    second = compile_knowledge_base(str(source), cache_dir=str(cache_dir))
+    assert second.fingerprint == first.fingerprint
+    assert second.ids == first.ids
+
+
+def test_open_shares_one_instance_until_the_file_changes(source):
+    first = open_knowledge_base(str(source))
+    assert open_knowledge_base(str(source)) is first
+
+    source.write_text(json.dumps({'symptoms': RECORDS[:1]}))
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    changed = open_knowledge_base(str(source))
+    assert changed is not first
+    assert len(changed) == 1
+
+
+def test_cached_preventive_guidelines_are_not_shared_between_services(tmp_path):
+    from app.chatbot import preventive_care
+    from app.chatbot.preventive_care import PreventiveCareService
+
+    path = tmp_path / 'guidelines.json'
+    path.write_text(json.dumps({'screening': {'blood_pressure': {'frequency': 'yearly'}}, 'lifestyle': {}}))
+    first = PreventiveCareService(str(path), risk_assessor=object())
+    second = PreventiveCareService(str(path), risk_assessor=object())
+    assert str(path) in preventive_care._guidelines
+
+    first.guidelines['screening']['blood_pressure']['frequency'] = 'never'
+    assert second.guidelines['screening']['blood_pressure']['frequency'] == 'yearly'
+    assert PreventiveCareService(str(path), risk_assessor=object()).guidelines == second.guidelines
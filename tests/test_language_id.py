@@ -0,0 +1,66 @@
+import pytest
+
+from app import language_id
+from app.language_id import LanguageIdentifier
+
+LANGUAGES = ['en', 'es', 'fr', 'de', 'zh', 'ar', 'hi', 'pt', 'ru', 'ja']
+
+
+@pytest.fixture(scope='module')
+def identifier():
+    return LanguageIdentifier(LANGUAGES)
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("tengo fiebre", 'es'),
+    ("dolor de pecho", 'es'),
+    ("me duele la cabeza", 'es'),
+    ("3 días", 'es'),
+    ("j'ai de la fièvre", 'fr'),
+    ("ich habe Fieber", 'de'),
+    ("I have had a fever for three days and my head hurts", 'en'),
+    ("Tengo fiebre desde hace tres días y me duele la cabeza", 'es'),
+])
+def test_detects_without_a_hint(identifier, text, expected):
+    assert identifier.detect(text) == expected
+
+
+def test_hint_settles_ambiguous_replies(identifier):
+    assert identifier.detect("no", 'es') == 'es'
+    assert identifier.detect("no") == 'en'
+    assert identifier.detect("ok", 'fr') == 'fr'
+    assert identifier.detect("42", 'de') == 'de'
+    assert identifier.detect("42") == 'en'
+
+
+def test_a_clear_guess_beats_the_hint(identifier):
+    assert identifier.detect("me duele la cabeza", 'en') == 'es'
+    assert identifier.detect("my head hurts", 'es') == 'en'
+
+
+def test_unsupported_hints_are_ignored(identifier):
+    assert identifier.detect("42", 'ko') == 'en'
+
+
+def test_scripts_of_unsupported_languages_fall_back_to_the_default(identifier):
+    assert identifier.detect("머리가 아파요") == 'en'
+    assert identifier.detect("Έχω πυρετό") == 'en'
+    assert identifier.detect("У меня температура") == 'ru'
+    assert identifier.detect("頭が痛いです") == 'ja'
+    assert identifier.detect("头痛") == 'zh'
+    assert identifier.detect("头痛", 'ja') == 'ja'
+
+
+def test_langdetect_answers_outside_the_supported_languages_are_dropped(monkeypatch):
+    identifier = LanguageIdentifier(LANGUAGES, min_margin=float('inf'))
+    monkeypatch.setattr(language_id, 'langdetect_detect', lambda text: 'it')
+    text = "Ho la febbre alta da tre giorni e mal di testa"
+
+    assert identifier.detect(text) == identifier._best(text)[0]
+    assert identifier.stats()['decisions'] == {'langdetect': 1}
+
+
+def test_langdetect_is_seeded_once_at_import():
+    from langdetect import DetectorFactory
+
+    assert DetectorFactory.seed == 0
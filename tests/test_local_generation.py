@@ -0,0 +1,134 @@
+import threading
+import time
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from app.chatbot.local_generation import LocalGenerator
+
+SEGMENTS = ["system: be kind\n", "user: my head hurts\n", "assistant:"]
+CONFIGS = {'response': {'max_new_tokens': 6, 'do_sample': False}}
+
+
+class ByteTokenizer:
+    """Tokenizer over UTF-8 bytes (id = byte + 1, 0 is end of text)."""
+
+    pad_token = None
+    eos_token = ''
+    pad_token_id = 0
+
+    def __call__(self, text, add_special_tokens=True):
+        return {"input_ids": [byte + 1 for byte in text.encode('utf-8')]}
+
+    def decode(self, ids, skip_special_tokens=True):
+        ids = ids.tolist() if hasattr(ids, 'tolist') else ids
+        return bytes(i - 1 for i in ids if i > 0).decode('utf-8', 'replace')
+
+    def batch_decode(self, sequences, skip_special_tokens=True):
+        return [self.decode(ids) for ids in sequences]
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    config = transformers.GPT2Config(vocab_size=257, n_positions=256, n_embd=32, n_layer=2, n_head=2,
+                                     bos_token_id=0, eos_token_id=0)
+    torch.manual_seed(0)
+    model = transformers.GPT2LMHeadModel(config).eval()
+    generator = LocalGenerator(model, ByteTokenizer(), CONFIGS, max_input_tokens=200, name='test-generator')
+
+    threads = []
+    generate = model.generate
+
+    def recording_generate(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return generate(*args, **kwargs)
+
+    monkeypatch.setattr(model, 'generate', recording_generate)
+    generator.threads = threads
+    return generator
+
+
+def test_stream_runs_on_the_batcher_and_fills_the_prefix_cache(generator):
+    text = "".join(generator.stream(SEGMENTS, 'response'))
+
+    assert isinstance(text, str)
+    assert generator.threads == ['test-generator']
+    stats = generator.prefix_cache.stats()
+    assert (stats['pinned'], stats['entries']) == (1, 1)
+
+    generator.generate(SEGMENTS, 'response')
+    assert generator.threads == ['test-generator'] * 2
+    assert generator.prefix_cache.stats()['hits'] == 1
+
+
+def test_stream_errors_reach_the_caller(generator, monkeypatch):
+    def failing_generate(*args, **kwargs):
+        raise RuntimeError("out of memory")
+
+    monkeypatch.setattr(generator.model, 'generate', failing_generate)
+    with pytest.raises(RuntimeError):
+        list(generator.stream(SEGMENTS, 'response'))
+    # The worker is still serving requests
+    monkeypatch.undo()
+    assert isinstance(generator.generate(SEGMENTS, 'response'), str)
+
+
+def test_a_stream_finishes_without_waiting_for_the_next_one(generator):
+    generate = generator.model.generate
+    release_blocker, release_last = threading.Event(), threading.Event()
+    calls = []
+
+    def gated_generate(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            release_blocker.wait(10)
+        elif len(calls) == 3:
+            release_last.wait(10)
+        return generate(*args, **kwargs)
+
+    generator.model.generate = gated_generate
+    # Keep the worker busy so both streams are queued together
+    blocker = generator.batcher.submit_nowait(generator.encode(SEGMENTS), group='response')
+    while not calls:
+        time.sleep(0.01)
+    first_done = threading.Event()
+
+    def consume(done=None):
+        "".join(generator.stream(SEGMENTS, 'response'))
+        if done is not None:
+            done.set()
+
+    consumers = [threading.Thread(target=consume, args=(first_done,)), threading.Thread(target=consume)]
+    for queued, consumer in enumerate(consumers, 1):
+        consumer.start()
+        while len(generator.batcher._pending) < queued:
+            time.sleep(0.01)
+    release_blocker.set()
+    try:
+        assert first_done.wait(10)
+        assert not release_last.is_set() and len(calls) == 3
+    finally:
+        release_last.set()
+        for consumer in consumers:
+            consumer.join(10)
+    assert isinstance(blocker.result(10), str)
+
+
+def test_encode_drops_history_before_the_system_prompt(generator, capsys):
+    generator.max_input_tokens = 20
+    token_ids, boundaries = generator.encode(["S" * 8, "old message", "new", "Q"])
+
+    assert generator.tokenizer.decode(token_ids) == "S" * 8 + "new" + "Q"
+    assert boundaries == [8, 11, 12]
+    assert "dropped 1 of 2 messages" in capsys.readouterr().out
+
+
+def test_encode_cuts_an_oversized_system_prompt_but_keeps_the_cue(generator, capsys):
+    generator.max_input_tokens = 10
+    token_ids, boundaries = generator.encode(["S" * 30, "hello", "QQ"])
+
+    assert generator.tokenizer.decode(token_ids) == "S" * 8 + "QQ"
+    assert boundaries == [8, 10]
+    assert "System prompt of 30 tokens cut" in capsys.readouterr().out
@@ -0,0 +1,95 @@
+import re
+import time
+
+from app.medical_terms import PLACEHOLDER, MedicalTermProtector, term_id
+from app.trie import trie_insert, trie_pattern
+
+
+def words_pattern(*words):
+    trie = {}
+    for word in words:
+        trie_insert(trie, word)
+    return re.compile(trie_pattern(trie))
+
+
+def test_trie_insert_reports_duplicates():
+    trie = {}
+    assert trie_insert(trie, "fever")
+    assert not trie_insert(trie, "fever")
+    assert trie_insert(trie, "fe")
+
+
+def test_trie_pattern_factors_prefixes_and_prefers_longer_words():
+    pattern = words_pattern("chest", "chest pain", "chest pressure")
+    assert pattern.pattern.count("chest") == 1
+    assert pattern.findall("chest pain, chest pressure, chest") == ["chest pain", "chest pressure", "chest"]
+
+
+def test_trie_pattern_escapes_regex_characters():
+    pattern = words_pattern("c.diff", "(covid)")
+    assert pattern.findall("cxdiff c.diff (covid)") == ["c.diff", "(covid)"]
+
+
+def test_placeholder_ids_are_stable():
+    assert term_id("asthma") == term_id("asthma")
+    assert term_id("asthma") != term_id("asthma attack")
+    assert term_id("asthma").isdigit()
+
+
+def test_protect_then_restore_in_the_target_language():
+    protector = MedicalTermProtector()
+    protector.add('en', ["asthma", "asthma attack", "fever"])
+
+    protected = protector.protect("An asthma attack with fever", 'en')
+    assert protected == "An {} with {}".format(
+        PLACEHOLDER.format(term_id("asthma attack")), PLACEHOLDER.format(term_id("fever"))
+    )
+    restored = protector.restore(protected, {"asthma attack": "crisis asmática"})
+    # Terms without a translation come back as themselves
+    assert restored == "An crisis asmática with fever"
+
+
+def test_unknown_languages_and_placeholders_are_left_alone():
+    protector = MedicalTermProtector()
+    protector.add('en', ["fever"])
+    assert protector.protect("fever", 'es') == "fever"
+    assert protector.restore("__MEDICAL_TERM_1__", {}) == "__MEDICAL_TERM_1__"
+
+
+def test_terms_added_later_are_protected_at_once_and_merged_in_the_background():
+    protector = MedicalTermProtector()
+    protector.add('en', ["fever"])
+    protector.protect("fever", 'en')  # Compiles the full pattern
+
+    protector.add('en', ["migraine", "fever"])
+    assert protector.protect("migraine and fever", 'en') == "{} and {}".format(
+        PLACEHOLDER.format(term_id("migraine")), PLACEHOLDER.format(term_id("fever"))
+    )
+
+    deadline = time.monotonic() + 5
+    while protector.stats()['en']['pending'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert protector.stats()['en'] == {'terms': 2, 'pending': 0}
+    assert protector.protect("migraine", 'en') == PLACEHOLDER.format(term_id("migraine"))
+
+
+def test_translation_service_sends_placeholders_to_the_backend():
+    from app.translation_backends import TranslationBackend
+    from app.translations import TranslationService
+
+    class EchoBackend(TranslationBackend):
+        def __init__(self):
+            self.sent = []
+
+        def translate_batch(self, texts, source_lang, target_lang):
+            self.sent.extend(texts)
+            return list(texts)
+
+    backend = EchoBackend()
+    service = TranslationService(backend=backend)
+    service.medical_terms = {'en': {}, 'es': {'hypertension': 'hipertensión'}}
+    service.term_protector = MedicalTermProtector()
+    service.term_protector.add('en', ["hypertension"])
+
+    assert service.translate_text("hypertension check", 'es', 'en') == "hipertensión check"
+    assert backend.sent == [PLACEHOLDER.format(term_id("hypertension")) + " check"]
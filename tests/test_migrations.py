@@ -0,0 +1,45 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("flask_migrate")
+
+ROOT = Path(__file__).resolve().parents[1]
+
+LEGACY_SCHEMA = """
+CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(64) NOT NULL, email VARCHAR(120) NOT NULL,
+    password_hash VARCHAR(256), name VARCHAR(64) NOT NULL, role VARCHAR(20) NOT NULL,
+    specialty VARCHAR(64), created_at DATETIME);
+CREATE TABLE chat_session (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users(id),
+    started_at DATETIME, ended_at DATETIME, summary TEXT, triage_level VARCHAR(20));
+CREATE TABLE chat_message (id INTEGER PRIMARY KEY, session_id INTEGER NOT NULL REFERENCES chat_session(id),
+    role VARCHAR(20) NOT NULL, content TEXT NOT NULL, timestamp DATETIME);
+INSERT INTO users VALUES (1, 'pat', 'pat@example.com', NULL, 'Pat', 'patient', NULL, NULL);
+INSERT INTO chat_session (id, user_id) VALUES (1, 1), (2, 1);
+INSERT INTO chat_message (session_id, role, content) VALUES
+    (1, 'assistant', 'Hello'), (1, 'user', 'I feel tired'), (2, 'assistant', 'Hello');
+"""
+
+
+def test_upgrade_adds_and_backfills_chat_columns(tmp_path):
+    database = tmp_path / 'legacy.db'
+    with sqlite3.connect(database) as connection:
+        connection.executescript(LEGACY_SCHEMA)
+
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}", FLASK_APP='run.py', FLASK_DEBUG='1')
+    env.pop('CHATBOT_WARMUP', None)
+    result = subprocess.run([sys.executable, '-m', 'flask', 'db', 'upgrade'],
+                            cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+
+    with sqlite3.connect(database) as connection:
+        sessions = connection.execute(
+            "SELECT id, message_count, summarized_count, patient_factors FROM chat_session ORDER BY id"
+        ).fetchall()
+        languages = connection.execute("SELECT DISTINCT language FROM chat_message").fetchall()
+    assert sessions == [(1, 2, 0, None), (2, 1, 0, None)]
+    assert languages == [('en',)]
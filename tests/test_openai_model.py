@@ -0,0 +1,141 @@
+import asyncio
+import json
+
+import httpx
+import openai
+import pytest
+
+from app.chatbot.openai_model import OpenAIChatModel
+
+MESSAGES = [{"role": "user", "content": "I have a headache"}]
+
+
+def completion(content):
+    return httpx.Response(200, json={
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}]
+    })
+
+
+class StubTransport:
+    """Serves canned responses; ``delay`` keeps requests in flight long enough to overlap."""
+
+    def __init__(self, responses, delay=0.0):
+        self.responses = list(responses)
+        self.delay = delay
+        self.requests = []
+
+    async def handle(self, request):
+        self.requests.append(json.loads(request.content))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        return response() if callable(response) else response
+
+    def transport(self):
+        return httpx.MockTransport(self.handle)
+
+
+def make_model(stub, **kwargs):
+    kwargs.setdefault('backoff_base', 0)
+    return OpenAIChatModel(api_key='test', base_url='http://stub/v1', transport=stub.transport(), **kwargs)
+
+
+def test_retries_transient_errors():
+    stub = StubTransport([httpx.Response(500), httpx.Response(429), completion("Drink water.")])
+    model = make_model(stub, max_retries=3)
+
+    assert model.generate_response(MESSAGES) == "Drink water."
+    assert len(stub.requests) == 3
+
+
+def test_gives_up_after_max_retries():
+    stub = StubTransport([httpx.Response(429)])
+    model = make_model(stub, max_retries=2)
+
+    with pytest.raises(openai.RateLimitError):
+        model.generate_response(MESSAGES)
+    assert len(stub.requests) == 3
+
+
+def test_client_errors_are_not_retried():
+    stub = StubTransport([httpx.Response(400, json={"error": {"message": "bad"}})])
+    model = make_model(stub, max_retries=3)
+
+    with pytest.raises(openai.BadRequestError):
+        model.generate_response(MESSAGES)
+    assert len(stub.requests) == 1
+
+
+def test_slow_requests_time_out_and_are_retried():
+    stub = StubTransport([completion("late")], delay=1.0)
+    model = make_model(stub, timeout=0.05, max_retries=1)
+
+    with pytest.raises((asyncio.TimeoutError, openai.APITimeoutError)):
+        model.generate_response(MESSAGES)
+    assert len(stub.requests) == 2
+
+
+def run_concurrently(model, coroutines):
+    async def gather():
+        return await asyncio.gather(*coroutines)
+
+    return model._runtime.run(gather())
+
+
+def test_identical_deterministic_requests_are_merged():
+    stub = StubTransport([completion("urgent")], delay=0.1)
+    model = make_model(stub)
+
+    results = run_concurrently(model, [model.adetermine_triage_level(MESSAGES) for _ in range(3)])
+    assert results == ["urgent"] * 3
+    assert len(stub.requests) == 1
+    assert model.coalesced_requests == 2
+
+
+def test_sampled_requests_are_never_merged():
+    replies = iter(["Reply one.", "Reply two."])
+    stub = StubTransport([lambda: completion(next(replies))], delay=0.1)
+    model = make_model(stub)
+
+    results = run_concurrently(model, [model.agenerate_response(MESSAGES) for _ in range(2)])
+    assert sorted(results) == ["Reply one.", "Reply two."]
+    assert len(stub.requests) == 2
+    assert all(request['temperature'] == 0.7 for request in stub.requests)
+    assert model.coalesced_requests == 0
+
+
+def test_generate_turn_parses_one_json_answer():
+    answer = {"reply": "Rest.", "triage_level": "non-urgent", "summary": "Headache."}
+    stub = StubTransport([completion("Sure: " + json.dumps(answer))])
+    model = make_model(stub)
+
+    turn = model.generate_turn(MESSAGES)
+    assert (turn.reply, turn.triage_level, turn.summary) == ("Rest.", "non-urgent", "Headache.")
+    assert len(stub.requests) == 1
+
+
+def test_generate_turn_fills_in_missing_fields():
+    stub = StubTransport([completion('{"reply": "Rest."}'), completion("URGENT"), completion("Headache.")])
+    model = make_model(stub)
+
+    turn = model.generate_turn(MESSAGES)
+    assert (turn.reply, turn.triage_level, turn.summary) == ("Rest.", "urgent", "Headache.")
+    assert len(stub.requests) == 3
+
+
+def test_stream_response_yields_deltas():
+    def chunk(content):
+        return "data: " + json.dumps({
+            "id": "c", "object": "chat.completion.chunk", "created": 0, "model": "gpt-4",
+            "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}]
+        }) + "\n\n"
+
+    body = chunk("Drink ") + chunk("water.") + "data: [DONE]\n\n"
+    stub = StubTransport([httpx.Response(200, content=body.encode(), headers={"content-type": "text/event-stream"})])
+    model = make_model(stub)
+
+    assert list(model.stream_response(MESSAGES)) == ["Drink ", "water."]
@@ -0,0 +1,33 @@
+from app.chatbot.service import ChatbotService
+from app.models import ChatSession, db
+
+
+def test_factors_accumulate_across_turns(chat_model, patient):
+    session = ChatbotService.create_session(patient.id)
+    ChatbotService.get_response(session.id, "I am diabetic")
+    ChatbotService.get_response(session.id, "I also smoke")
+    ChatbotService.get_response(session.id, "I feel tired")
+
+    assert ChatSession.query.get(session.id).patient_factors == {'diabetes': 1.0, 'smoking': 1.0}
+
+
+def test_legacy_sessions_are_scanned_once(chat_model, patient):
+    session = ChatbotService.create_session(patient.id)
+    ChatbotService.add_message(session.id, "user", "I have asthma")
+    ChatSession.query.filter_by(id=session.id).update({ChatSession.patient_factors: None})
+    db.session.commit()
+    db.session.expire_all()
+
+    ChatbotService.get_response(session.id, "I am pregnant")
+    assert ChatSession.query.get(session.id).patient_factors == {'asthma': 1.0, 'pregnancy': 1.0}
+
+
+def test_recompute_rebuilds_from_user_messages(chat_model, patient):
+    session = ChatbotService.create_session(patient.id)
+    ChatbotService.add_message(session.id, "user", "I am obese")
+    ChatbotService.add_message(session.id, "assistant", "Do you smoke?")
+    ChatSession.query.get(session.id).patient_factors = {'diabetes': 1.0}
+    db.session.commit()
+
+    assert ChatbotService.recompute_patient_factors(session.id) == {'obesity': 1.0}
+    assert ChatbotService.recompute_patient_factors(12345) == {}
@@ -0,0 +1,87 @@
+import numpy as np
+
+from app.chatbot.prefix_cache import PrefixKVCache, cache_length, crop_cache
+
+
+def legacy_cache(length, layers=2):
+    """Tuple KV cache as older transformers return it: (key, value) per layer."""
+    return tuple(
+        (np.arange(length, dtype=np.float32).reshape(1, 1, length, 1),) * 2
+        for _ in range(layers)
+    )
+
+
+class UncroppableCache:
+    """Cache object without ``crop``, like the static caches."""
+
+    def __init__(self, length):
+        self.legacy = legacy_cache(length)
+
+    def get_seq_length(self):
+        return self.legacy[0][0].shape[2]
+
+    def to_legacy_cache(self):
+        return self.legacy
+
+
+def test_tuple_caches_are_cropped():
+    cropped = crop_cache(legacy_cache(6), 4)
+    assert cache_length(cropped) == 4
+    assert len(cropped) == 2
+
+
+def test_caches_without_crop_fall_back_to_tuples():
+    cropped = crop_cache(UncroppableCache(6), 3)
+    assert isinstance(cropped, tuple)
+    assert cache_length(cropped) == 3
+
+
+def test_tuple_caches_are_stored_and_found():
+    cache = PrefixKVCache(max_entries=4)
+    token_ids = list(range(10))
+    cache.store(token_ids, [3, 8], legacy_cache(10))
+
+    length, found = cache.lookup(token_ids + [10, 11], [3, 8, 12])
+    assert length == 8
+    assert cache_length(found) == 8
+
+
+def test_longest_boundary_prefix_wins_and_one_token_stays_uncached():
+    cache = PrefixKVCache(max_entries=4)
+    token_ids = list(range(10))
+    cache.store(token_ids, [3, 8], legacy_cache(10))
+
+    assert cache.lookup(token_ids[:8], [3, 8])[0] == 3
+    assert cache.lookup([0, 1, 2, 99, 98], [3, 5])[0] == 3
+    assert cache.lookup([9, 9, 9, 9], [3, 4]) == (0, None)
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (2, 1)
+
+
+def test_system_prompt_prefix_is_pinned_and_sessions_are_evicted():
+    cache = PrefixKVCache(max_entries=2)
+    system = [1, 2, 3]
+    for session in range(3):
+        token_ids = system + [10 + session] * 4
+        cache.store(token_ids, [3, 7], legacy_cache(7))
+
+    stats = cache.stats()
+    assert (stats['pinned'], stats['entries']) == (1, 2)
+    # The oldest session was evicted, the shared system prompt was not
+    assert cache.lookup(system + [10] * 4 + [0], [3, 7])[0] == 3
+    assert cache.lookup(system + [12] * 4 + [0], [3, 7])[0] == 7
+
+
+def test_partial_caches_only_store_the_boundaries_they_cover():
+    cache = PrefixKVCache(max_entries=4)
+    token_ids = list(range(10))
+    cache.store(token_ids, [3, 8], legacy_cache(5))
+
+    assert cache.stats()['entries'] == 0
+    assert cache.lookup(token_ids, [3, 8])[0] == 3
+
+
+def test_clear_drops_pinned_and_session_entries():
+    cache = PrefixKVCache(max_entries=4)
+    cache.store(list(range(10)), [3, 8], legacy_cache(10))
+    cache.clear()
+    assert cache.lookup(list(range(10)), [3, 8]) == (0, None)
@@ -0,0 +1,104 @@
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from app.chatbot.registry import ComponentRegistry
+
+
+def test_component_is_built_once_on_first_use():
+    calls = []
+    registry = ComponentRegistry()
+    component = registry.register('thing', lambda: calls.append(1) or object())
+
+    assert registry.status()['thing']['state'] == 'pending'
+    first = component.get()
+    assert component.get() is first
+    assert calls == [1]
+    assert registry.status()['thing']['ready']
+
+
+def test_failed_build_is_reported_and_retried():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("boom")
+        return 'built'
+
+    registry = ComponentRegistry()
+    component = registry.register('flaky', factory)
+    with pytest.raises(RuntimeError):
+        component.get()
+    assert registry.status()['flaky'] == {
+        'name': 'flaky', 'state': 'failed', 'ready': False,
+        'build_seconds': registry.status()['flaky']['build_seconds'], 'error': 'boom'
+    }
+    assert component.get() == 'built'
+
+
+def test_duplicate_registration_is_rejected():
+    registry = ComponentRegistry()
+    registry.register('thing', object)
+    with pytest.raises(ValueError):
+        registry.register('thing', object)
+
+
+def test_warm_builds_in_background():
+    built = threading.Event()
+    registry = ComponentRegistry()
+    registry.register('thing', lambda: built.set() or 'ok')
+
+    registry.warm(wait=True, timeout=5)
+    assert built.is_set()
+    assert registry.get('thing') == 'ok'
+
+
+def test_warm_skips_unknown_names(capsys):
+    registry = ComponentRegistry()
+    registry.register('thing', lambda: 'ok')
+
+    threads = registry.warm(['thing', 'typo'], wait=True, timeout=5)
+    assert len(threads) == 1
+    assert registry.status()['thing']['ready']
+    assert "Unknown component typo" in capsys.readouterr().out
+
+
+def test_create_app_survives_unknown_warmup_component(tmp_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}",
+               CHATBOT_WARMUP='no_such_component', FLASK_DEBUG='1')
+    result = subprocess.run(
+        [sys.executable, '-c', 'from app import create_app; create_app()'],
+        cwd=Path(__file__).resolve().parents[1], env=env, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    assert "Unknown component no_such_component" in result.stdout
+
+
+def test_warm_does_not_wait_for_a_build_in_progress():
+    started, release = threading.Event(), threading.Event()
+
+    def slow_factory():
+        started.set()
+        release.wait(5)
+        return 'built'
+
+    registry = ComponentRegistry()
+    component = registry.register('slow', slow_factory)
+    builder = threading.Thread(target=component.get)
+    builder.start()
+    assert started.wait(5)
+
+    warmed = threading.Thread(target=registry.warm)
+    warmed.start()
+    warmed.join(1)
+    try:
+        assert not warmed.is_alive()
+    finally:
+        release.set()
+        builder.join(5)
+    assert registry.get('slow') == 'built'
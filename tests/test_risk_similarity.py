@@ -0,0 +1,103 @@
+import json
+
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix
+from sklearn.metrics.pairwise import cosine_similarity
+
+from app.chatbot.risk_assessment import RiskAssessment, top_k_similarity
+
+KNOWLEDGE_BASE = "app/data/medical_knowledge.json"
+
+CASES = [
+    (["fever", "fatigue"], {"age_65_plus": 1.0}),
+    (["chest_pain", "shortness_of_breath", "nausea"], {"smoking": 1.0, "diabetes": 0.5}),
+    (["headache"], {}),
+    (["unknown_symptom", "fever"], {}),
+]
+
+
+def symptom(symptom_id, category, severity, conditions):
+    return {'id': symptom_id, 'name': symptom_id.title(), 'category': category, 'severity': severity,
+            'related_conditions': conditions, 'risk_factors': {'smoking': 1.2}}
+
+
+# Symptoms linked through shared conditions and categories, so similarities are not all zero
+LINKED = [
+    symptom('cough', 'Respiratory', 'MODERATE', ['flu', 'cold']),
+    symptom('sore_throat', 'Respiratory', 'LOW', ['flu', 'cold', 'strep']),
+    symptom('fever', 'General', 'MODERATE', ['flu', 'strep']),
+    symptom('chills', 'General', 'LOW', ['flu']),
+    symptom('rash', 'Skin', 'LOW', ['allergy']),
+    symptom('hives', 'Skin', 'MODERATE', ['allergy']),
+]
+
+
+@pytest.fixture(scope='module')
+def dense():
+    return RiskAssessment(KNOWLEDGE_BASE, matrix_cache_dir="")
+
+
+@pytest.fixture(scope='module')
+def linked_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp('kb') / 'linked.json'
+    path.write_text(json.dumps({'symptoms': LINKED}))
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def linked(linked_path):
+    return RiskAssessment(linked_path, matrix_cache_dir="")
+
+
+@pytest.fixture(scope='module')
+def sparse(linked_path):
+    # A limit below the symptom count switches to the top-k neighbour matrix
+    return RiskAssessment(linked_path, dense_similarity_limit=1, similarity_top_k=len(LINKED), matrix_cache_dir="")
+
+
+def test_similarity_matches_cosine_of_symptom_vectors(dense):
+    expected = cosine_similarity(dense.symptom_vectors)
+    expected[~dense.symptom_vectors.toarray().any(axis=1)] = 0
+    assert np.allclose(dense.symptom_similarity, expected)
+
+
+def test_top_k_keeps_the_nearest_neighbours_and_the_diagonal():
+    vectors = np.random.default_rng(0).random((12, 5))
+    unit = csr_matrix(vectors / np.linalg.norm(vectors, axis=1, keepdims=True))
+    full = (unit @ unit.T).toarray()
+
+    top = top_k_similarity(unit, k=4, block_size=5).toarray()
+    assert np.allclose(np.diag(top), 1.0)
+    for row in range(12):
+        kept = np.flatnonzero(top[row])
+        neighbours = np.argsort(-np.where(np.arange(12) == row, -np.inf, full[row]))[:3]
+        assert set(kept) == set(neighbours) | {row}
+        assert np.allclose(top[row, kept], full[row, kept])
+
+    assert np.allclose(top_k_similarity(unit, k=12, block_size=5).toarray(), full)
+
+
+def test_batch_scores_match_single_scores(dense):
+    batch = dense.calculate_risk_scores([symptoms for symptoms, _ in CASES], [factors for _, factors in CASES])
+    single = [dense.calculate_risk_score(symptoms, factors) for symptoms, factors in CASES]
+    for batched, one in zip(batch, single):
+        assert batched == pytest.approx(one, abs=0.011)
+    assert dense.calculate_risk_scores([[]]) == [{'total_risk': 0.0, 'severity_score': 0.0, 'correlation_score': 0.0}]
+
+
+def test_top_k_similarity_agrees_when_it_holds_every_neighbour(linked, sparse):
+    assert np.allclose(sparse.symptom_similarity.toarray(), linked.symptom_similarity)
+    for symptoms in (["cough", "fever"], ["cough", "sore_throat", "chills"], ["rash", "hives", "fever"]):
+        assert sparse.calculate_risk_score(symptoms, {'smoking': 1.0}) == linked.calculate_risk_score(symptoms, {'smoking': 1.0})
+    # Symptoms with no similarity at all are never suggested from the sparse matrix
+    suggestions = sparse.suggest_additional_symptoms(["cough"], max_suggestions=5)
+    assert suggestions == linked.suggest_additional_symptoms(["cough"], max_suggestions=5)[:len(suggestions)]
+    assert suggestions and not {'Rash', 'Hives'} & set(suggestions)
+
+
+def test_suggestions_exclude_current_symptoms(dense):
+    suggestions = dense.suggest_additional_symptoms(["chest_pain"], max_suggestions=2)
+    assert len(suggestions) == 2
+    assert "Chest Pain" not in suggestions
+    assert dense.suggest_additional_symptoms(["unknown_symptom"]) == []
@@ -0,0 +1,83 @@
+import pytest
+
+from app.chatbot.base import BaseChatModel, ModelTurn
+from app.chatbot.service import ChatbotService
+from app.models import ChatSession
+
+
+@pytest.mark.parametrize("model_level,expected", [
+    ('urgent', 'emergency'),
+    ('seek_immediate_care', 'urgent'),
+    ('non-urgent', 'non_urgent'),
+])
+def test_end_session_stores_the_triage_systems_levels(chat_model, patient, model_level, expected):
+    chat_model.triage_level = model_level
+    session = ChatbotService.create_session(patient.id)
+
+    assert ChatbotService.end_session(session.id) == "Summary of the conversation."
+    assert ChatSession.query.get(session.id).triage_level == expected
+
+
+def test_end_session_keeps_the_rule_based_level(chat_model, patient):
+    chat_model.triage_level = 'urgent'
+    session = ChatbotService.create_session(patient.id)
+    ChatbotService.get_response(session.id, "I have a mild headache")
+
+    ChatbotService.end_session(session.id)
+    assert ChatSession.query.get(session.id).triage_level == 'non_urgent'
+
+
+def test_templated_replies_make_no_model_calls(chat_model, patient):
+    session = ChatbotService.create_session(patient.id)
+    ChatbotService.get_response(session.id, "I feel tired")
+    assert chat_model.calls == []
+
+
+def test_default_generate_turn_parses_the_triage_level(chat_model):
+    chat_model.triage_level = "This looks URGENT to me"
+    turn = BaseChatModel.generate_turn(chat_model.model, [{"role": "user", "content": "hi"}])
+
+    assert turn == ModelTurn(reply=chat_model.reply, triage_level='urgent', summary="Summary of the conversation.")
+    assert [name for name, _ in chat_model.calls] == ['generate_response', 'determine_triage_level', 'generate_summary']
+
+
+def test_user_message_is_kept_when_the_reply_fails(chat_model, patient, monkeypatch):
+    from app.chatbot import service
+    from app.models import ChatMessage
+
+    def broken_templates(assessment):
+        raise RuntimeError("template error")
+
+    monkeypatch.setattr(service, 'triage_reply_segments', broken_templates)
+    session = ChatbotService.create_session(patient.id)
+    with pytest.raises(RuntimeError):
+        ChatbotService.get_response(session.id, "I feel tired")
+
+    stored = ChatMessage.query.filter_by(session_id=session.id).order_by(ChatMessage.id).all()
+    assert [(m.role, m.content) for m in stored] == [('assistant', stored[0].content), ('user', "I feel tired")]
+    assert ChatSession.query.get(session.id).message_count == 2
+
+
+def test_chest_pain_in_a_chat_message_is_an_emergency(chat_model, patient):
+    session = ChatbotService.create_session(patient.id)
+    ChatbotService.get_response(session.id, "I have chest pain and feel breathless")
+
+    assert ChatSession.query.get(session.id).triage_level == 'emergency'
+
+
+def test_message_language_is_detected_from_the_users_own_messages(chat_model, patient, monkeypatch, tmp_path):
+    from app.models import ChatMessage
+    from app.translation_backends import OfflineTranslationBackend
+    from app.translations import TranslationService
+
+    translator = TranslationService(backend=OfflineTranslationBackend(directory=str(tmp_path)))
+    monkeypatch.setattr(ChatbotService, '_translator', translator)
+    session = ChatbotService.create_session(patient.id)
+
+    # The reply language (English here) is not taken as the user's language
+    ChatbotService.get_response(session.id, "tengo fiebre")
+    # A bare "ok" keeps the language of the user's previous message
+    ChatbotService.get_response(session.id, "ok")
+
+    stored = ChatMessage.query.filter_by(session_id=session.id, role='user').order_by(ChatMessage.id).all()
+    assert [(m.content, m.language) for m in stored] == [("tengo fiebre", 'es'), ("ok", 'es')]
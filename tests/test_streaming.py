@@ -0,0 +1,79 @@
+import json
+
+from app.chatbot.service import ChatbotService
+from app.chatbot.streaming import until_stop
+from app.models import ChatMessage
+
+
+def sse_events(response):
+    events = []
+    for block in response.get_data(as_text=True).strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def test_stream_route_sends_triage_tokens_then_done(client, chat_model, patient):
+    session = ChatbotService.create_session(patient.id)
+    response = client.post(f'/api/chat/session/{session.id}/message/stream', json={'message': 'I feel tired'})
+
+    assert response.mimetype == 'text/event-stream'
+    events = sse_events(response)
+    assert events[0][0] == 'triage'
+    assert {'triage_level', 'confidence', 'red_flags', 'rules_version'} <= set(events[0][1])
+    tokens = [payload['text'] for event, payload in events if event == 'token']
+    assert "".join(tokens) == chat_model.reply
+    assert len(tokens) > 1
+    assert events[-1][0] == 'done'
+    assert events[-1][1]['response'] == chat_model.reply
+
+    stored = ChatMessage.query.filter_by(session_id=session.id).order_by(ChatMessage.id).all()
+    assert [(m.role, m.content) for m in stored[1:]] == [('user', 'I feel tired'), ('assistant', chat_model.reply)]
+    assert stored[-1].id == events[-1][1]['message_id']
+
+
+def test_stream_route_rejects_other_users_sessions(client, chat_model, flask_app):
+    from app.models import User, db
+
+    other = User(username='other', email='other@example.com', name='Other', role='patient')
+    db.session.add(other)
+    db.session.commit()
+    session = ChatbotService.create_session(other.id)
+
+    response = client.post(f'/api/chat/session/{session.id}/message/stream', json={'message': 'hi'})
+    assert response.status_code == 403
+
+
+def test_backends_without_streaming_yield_the_whole_reply(chat_model):
+    from app.chatbot.base import BaseChatModel
+
+    pieces = list(BaseChatModel.stream_response(chat_model.model, [{"role": "user", "content": "hi"}]))
+    assert pieces == [chat_model.reply]
+
+
+def test_until_stop_holds_back_partial_stop_markers():
+    assert "".join(until_stop(["Hello wor", "ld<", "/s", "> ignored"], "</s>")) == "Hello world"
+    assert "".join(until_stop(["a<", "b"], "</s>")) == "a<b"
+    assert "".join(until_stop(["</s>"], "</s>")) == ""
+
+
+def test_user_message_is_kept_when_the_model_fails(client, chat_model, patient):
+    chat_model.fail_after = 2
+    session = ChatbotService.create_session(patient.id)
+    response = client.post(f'/api/chat/session/{session.id}/message/stream', json={'message': 'I feel tired'})
+
+    events = sse_events(response)
+    assert events[-1] == ('error', {'error': 'model backend went away'})
+    stored = ChatMessage.query.filter_by(session_id=session.id).order_by(ChatMessage.id).all()
+    assert [(m.role, m.content) for m in stored[1:]] == [('user', 'I feel tired')]
+
+
+def test_user_message_is_kept_when_the_client_disconnects(chat_model, patient):
+    session = ChatbotService.create_session(patient.id)
+    events = ChatbotService.stream_response(session.id, 'I feel tired')
+    assert next(events)[0] == 'triage'
+    events.close()
+
+    stored = ChatMessage.query.filter_by(session_id=session.id).order_by(ChatMessage.id).all()
+    assert [m.role for m in stored] == ['assistant', 'user']
+    assert ChatbotService.get_conversation_messages(session.id)[-1]['content'] == 'I feel tired'
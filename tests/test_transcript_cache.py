@@ -0,0 +1,43 @@
+from app.chatbot.service import ChatbotService
+from app.chatbot.transcript_cache import TranscriptCache
+from app.models import ChatMessage, ChatSession, db
+
+
+def test_only_new_messages_are_loaded(chat_model, patient):
+    session = ChatbotService.create_session(patient.id)
+    cache = ChatbotService._transcripts
+
+    assert len(cache.get(session.id)) == 1
+    ChatbotService.add_messages(session.id, [
+        {"role": "user", "content": "I feel tired"},
+        {"role": "assistant", "content": "Since when?"}
+    ])
+    assert [m['content'] for m in cache.get(session.id)][1:] == ["I feel tired", "Since when?"]
+    assert (cache.full_loads, cache.delta_loads) == (1, 1)
+
+    cache.get(session.id)
+    assert (cache.full_loads, cache.delta_loads) == (1, 1)
+
+
+def test_writes_by_another_worker_are_picked_up(chat_model, patient):
+    session = ChatbotService.create_session(patient.id)
+    worker_a, worker_b = TranscriptCache(), TranscriptCache()
+    worker_a.get(session.id)
+
+    ChatbotService.add_message(session.id, "user", "Hello from worker B")
+    worker_b.get(session.id)
+    assert worker_a.get(session.id)[-1]['content'] == "Hello from worker B"
+
+
+def test_deleted_messages_force_a_full_reload(chat_model, patient):
+    session = ChatbotService.create_session(patient.id)
+    ChatbotService.add_message(session.id, "user", "first")
+    cache = ChatbotService._transcripts
+    cache.get(session.id)
+
+    ChatMessage.query.filter_by(session_id=session.id, content="first").delete()
+    ChatSession.query.filter_by(id=session.id).update({ChatSession.message_count: ChatSession.message_count - 1})
+    db.session.commit()
+
+    assert [m['role'] for m in cache.get(session.id)] == ["assistant"]
+    assert cache.full_loads == 2
@@ -0,0 +1,106 @@
+import json
+import threading
+
+import deep_translator
+import pytest
+from deep_translator.exceptions import TooManyRequests
+
+from app.translation_backends import (
+    GoogleTranslationBackend, OfflineTranslationBackend, create_backend, pack_segments
+)
+from app.translations import TranslationService
+
+
+class FakeGoogleTranslator:
+    """Stands in for deep_translator's GoogleTranslator; upper-cases text."""
+
+    instances = []
+    requests = []
+    rate_limited = 0
+    join_lines = False
+
+    def __init__(self, source, target):
+        self.source, self.target = source, target
+        self.thread = threading.current_thread().name
+        FakeGoogleTranslator.instances.append(self)
+
+    def translate(self, text):
+        FakeGoogleTranslator.requests.append(text)
+        if FakeGoogleTranslator.rate_limited:
+            FakeGoogleTranslator.rate_limited -= 1
+            raise TooManyRequests()
+        if text == "untranslatable":
+            return None
+        return (text.replace("\n", " ") if self.join_lines and "\n" in text else text).upper()
+
+
+@pytest.fixture
+def google(monkeypatch):
+    FakeGoogleTranslator.instances = []
+    FakeGoogleTranslator.requests = []
+    FakeGoogleTranslator.rate_limited = 0
+    FakeGoogleTranslator.join_lines = False
+    monkeypatch.setattr(deep_translator, 'GoogleTranslator', FakeGoogleTranslator)
+    backend = GoogleTranslationBackend(max_concurrency=2, timeout=1, max_retries=2, backoff_base=0)
+    yield backend
+    backend.close()
+
+
+def test_pack_segments_respects_the_size_limit():
+    assert pack_segments(["aa", "bb", "cc"], max_chars=5) == [[0, 1], [2]]
+    assert pack_segments(["a\nb", "c"], max_chars=100) == [[0], [1]]
+
+
+def test_google_packs_segments_into_one_request(google):
+    assert google.translate_batch(["fever", "cough"], 'en', 'zh') == ["FEVER", "COUGH"]
+    assert FakeGoogleTranslator.requests == ["fever\ncough"]
+    assert (FakeGoogleTranslator.instances[0].source, FakeGoogleTranslator.instances[0].target) == ('en', 'zh-CN')
+
+
+def test_google_falls_back_to_one_request_per_segment(google):
+    FakeGoogleTranslator.join_lines = True
+    assert google.translate_batch(["fever", "cough"], 'en', 'es') == ["FEVER", "COUGH"]
+    assert FakeGoogleTranslator.requests == ["fever\ncough", "fever", "cough"]
+
+
+def test_google_retries_rate_limits_and_reports_failures(google):
+    FakeGoogleTranslator.rate_limited = 2
+    assert google.translate("fever", 'en', 'es') == "FEVER"
+    assert google.requests == 3
+
+    assert google.translate_batch(["untranslatable"], 'en', 'es') == [None]
+    assert google.failures == 1
+
+
+def test_google_does_not_split_a_failed_packed_request(google):
+    FakeGoogleTranslator.rate_limited = 10
+    assert google.translate_batch(["fever", "cough", "rash"], 'en', 'es') == [None, None, None]
+    # The retries of the packed request, and no request per segment after them
+    assert FakeGoogleTranslator.requests == ["fever\ncough\nrash"] * 3
+    assert google.failures == 1
+
+
+def test_google_threads_do_not_share_translators(google):
+    google.max_chars = 3
+    texts = [f"t{i}" for i in range(8)]
+    assert google.translate_batch(texts, 'en', 'es') == [text.upper() for text in texts]
+    threads = [translator.thread for translator in FakeGoogleTranslator.instances]
+    assert len(threads) == len(set(threads))
+
+
+def test_offline_backend_translates_segments_with_protected_terms(tmp_path):
+    (tmp_path / 'segments_es.json').write_text(json.dumps({
+        "Watch for chest pain.": "Vigile el dolor en el pecho."
+    }), encoding='utf-8')
+    service = TranslationService(backend=OfflineTranslationBackend(directory=str(tmp_path)))
+
+    assert service.translate_texts(["Watch for chest pain.", "Rest now."], 'es', 'en') == [
+        "Vigile el dolor en el pecho.", "Rest now."
+    ]
+    # Unknown text still gets its medical terms translated
+    assert service.translate_text("chest pain again", 'es', 'en') == "dolor en el pecho again"
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_backend('carrier-pigeon')
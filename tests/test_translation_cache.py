@@ -0,0 +1,54 @@
+import time
+
+from app.translation_cache import SQLiteTranslationStore, TranslationCache, translation_key
+
+
+def test_keys_are_fixed_size_and_direction_specific():
+    key = translation_key("a" * 10000, 'en', 'es')
+    assert len(key) < 60
+    assert key != translation_key("a" * 10000, 'es', 'en')
+
+
+def test_memory_tier_only():
+    cache = TranslationCache(maxsize=2, ttl=0, path='')
+    cache.set("hello", 'en', 'es', "hola")
+    assert cache.get("hello", 'en', 'es') == "hola"
+    assert cache.get("hello", 'en', 'fr') is None
+    assert cache.stats()['shared'] is None
+
+
+def test_shared_tier_is_seen_by_other_workers(tmp_path):
+    path = str(tmp_path / 'translations.db')
+    first, second = TranslationCache(ttl=0, path=path), TranslationCache(ttl=0, path=path)
+    first.set("fever", 'en', 'es', "fiebre")
+
+    assert second.get("fever", 'en', 'es') == "fiebre"
+    # Copied into the second worker's memory tier
+    assert second.stats()['memory']['size'] == 1
+    assert second.stats()['shared']['hits'] == 1
+
+
+def test_shared_rows_expire(tmp_path, monkeypatch):
+    store = SQLiteTranslationStore(str(tmp_path / 'translations.db'), ttl=10)
+    now = [1000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    store.set('key', 'value')
+
+    now[0] += 5
+    assert store.get('key') == 'value'
+    now[0] += 10
+    assert store.get('key') is None
+    store.trim()
+    assert store.stats()['size'] == 0
+    assert store.stats()['evictions'] == 1
+
+
+def test_shared_store_keeps_the_newest_rows(tmp_path, monkeypatch):
+    store = SQLiteTranslationStore(str(tmp_path / 'translations.db'), max_rows=3)
+    monkeypatch.setattr(SQLiteTranslationStore, 'TRIM_EVERY', 5)
+    for i in range(5):
+        monkeypatch.setattr(time, 'time', lambda: 1000.0 + i)
+        store.set(f'key{i}', f'value{i}')
+
+    assert store.stats()['size'] == 3
+    assert store.get('key0') is None and store.get('key4') == 'value4'
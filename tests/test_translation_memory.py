@@ -0,0 +1,130 @@
+import threading
+
+import pytest
+
+from app.chatbot.response_templates import prepare_translation_memory, static_segments
+from app.translation_backends import TranslationBackend
+from app.translation_memory import TranslationMemory
+from app.translations import TranslationService
+
+
+class TaggingBackend(TranslationBackend):
+    """Prefixes the target language; ``fail`` lists texts it cannot translate."""
+
+    name = "tagging"
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = []
+
+    def translate_batch(self, texts, source_lang, target_lang):
+        self.calls.append(list(texts))
+        return [None if text in self.fail else f"[{target_lang}] {text}" for text in texts]
+
+
+@pytest.fixture
+def translator(tmp_path):
+    service = TranslationService(backend=TaggingBackend())
+    service.translation_memory = TranslationMemory(str(tmp_path))
+    return service
+
+
+def test_prepared_segments_need_no_backend_call(translator, tmp_path):
+    report = prepare_translation_memory(translator, ['es'])
+    segments = static_segments()
+    assert report['es'] == {'translated': len(segments), 'skipped': 0, 'prepared': 0}
+    assert (tmp_path / 'segments_es.json').exists()
+
+    translator.backend.calls.clear()
+    translated = translator.translate_segments([
+        ("Recommendations:", None),
+        ("Based on my assessment (confidence: {confidence}):", {'confidence': '80%'})
+    ], 'es')
+    assert translated == ["[es] Recommendations:", "[es] Based on my assessment (confidence: 80%):"]
+    assert translator.backend.calls == []
+    assert translator.translation_memory.stats()['hits'] == 2
+
+
+def test_preparation_skips_failures_and_prepared_segments(translator, tmp_path):
+    translator.backend.fail = {"Recommendations:"}
+    first = prepare_translation_memory(translator, ['fr'])['fr']
+    assert first['skipped'] == 1
+
+    translator.backend.fail = set()
+    # A fresh memory reads what the first run wrote
+    translator.translation_memory = TranslationMemory(str(tmp_path))
+    second = prepare_translation_memory(translator, ['fr'])['fr']
+    assert second == {'translated': 1, 'skipped': 0, 'prepared': first['translated']}
+    assert translator.translation_memory.get("Recommendations:", 'fr') == "[fr] Recommendations:"
+
+
+def test_lost_placeholders_are_not_stored(translator):
+    translator.backend.translate_batch = lambda texts, source, target: [t.replace("{", "(") for t in texts]
+    prepare_translation_memory(translator, ['de'])
+
+    assert translator.translation_memory.get("Based on my assessment (confidence: {confidence}):", 'de') is None
+    assert translator.translation_memory.get("Recommendations:", 'de') is None
+
+
+def test_concurrent_readers_see_complete_languages(tmp_path):
+    memory = TranslationMemory(str(tmp_path))
+    errors = []
+
+    def read():
+        for _ in range(200):
+            segments = memory._language('es')
+            if segments and len(segments) % 10:
+                errors.append(len(segments))
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for batch in range(10):
+        memory.add('es', {f"segment {batch}-{i}": "x" for i in range(10)})
+    for reader in readers:
+        reader.join()
+
+    assert errors == []
+    assert len(TranslationMemory(str(tmp_path))._language('es')) == 100
+
+
+def test_translator_component_prepares_memory_in_background_when_enabled(monkeypatch, tmp_path):
+    import app.translations
+    from app.chatbot import service
+
+    backend = TaggingBackend()
+    built = []
+
+    def build(*args, **kwargs):
+        built.append(TranslationService(backend=backend))
+        built[-1].translation_memory = TranslationMemory(str(tmp_path))
+        return built[-1]
+
+    monkeypatch.setattr(app.translations, 'TranslationService', build)
+    # Off by default: the build step prepares the memory
+    monkeypatch.delenv('TRANSLATION_MEMORY_PREPARE', raising=False)
+    service._build_translator()
+    assert backend.calls == []
+
+    monkeypatch.setenv('TRANSLATION_MEMORY_PREPARE', '1')
+    service._build_translator()
+    for thread in threading.enumerate():
+        if thread.name == 'translation-memory':
+            thread.join(timeout=10)
+
+    languages = {lang for lang in built[-1].supported_languages if lang != 'en'}
+    assert {path.name for path in tmp_path.iterdir()} == {f'segments_{lang}.json' for lang in languages}
+
+
+@pytest.mark.parametrize("stored", [
+    "[es] Basado en mi evaluación (confianza: {confianza}):",
+    "[es] Basado en mi evaluación (confianza: {0}):",
+    "[es] Basado en mi evaluación (confianza: {confidence):",
+])
+def test_damaged_memory_entries_fall_back_to_translating_the_filled_line(translator, stored):
+    segment = "Based on my assessment (confidence: {confidence}):"
+    translator.translation_memory.add('es', {segment: stored})
+
+    assert translator.translate_segment(segment, 'es', {'confidence': '80%'}) == \
+        "[es] Based on my assessment (confidence: 80%):"
+    assert translator.backend.calls == [["Based on my assessment (confidence: 80%):"]]
@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+import time
+
+from app.chatbot.triage_system import AdvancedTriageSystem
+
+RULES = {
+    "emergency_symptoms": {"chest_pain": {"keywords": ["chest pain"], "severity_multiplier": 2.0}},
+    "urgent_symptoms": {"high_fever": {"keywords": ["high fever"], "severity_multiplier": 1.3}},
+    "risk_factors": {"diabetes": 1.1}
+}
+
+
+def write_rules(path, version, **changes):
+    data = dict(RULES, version=version, **changes)
+    path.write_text(json.dumps(data))
+    # Make sure the change is seen even within the filesystem's timestamp resolution
+    stamp = time.time() + int(version.split('.')[-1])
+    os.utime(path, (stamp, stamp))
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def watcher_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "triage-rules-watcher"]
+
+
+def test_systems_on_one_file_share_a_watcher_that_reloads_it(tmp_path):
+    path = tmp_path / 'rules.json'
+    write_rules(path, "1.0.1")
+    before = len(watcher_threads())
+    first = AdvancedTriageSystem(str(path), poll_interval=0.05)
+    second = AdvancedTriageSystem(str(path), poll_interval=0.05)
+
+    assert len(watcher_threads()) == before + 1
+    assert first.assess_triage_level(["high fever"], {}, []).level == 'urgent'
+
+    write_rules(path, "1.0.2", urgent_symptoms={
+        "high_fever": {"keywords": ["high fever"], "severity_multiplier": 3.0}
+    })
+    assert wait_for(lambda: first.rules_version == "1.0.2")
+    assert second.rules is first.rules
+    assessment = first.assess_triage_level(["high fever"], {}, [])
+    assert (assessment.level, assessment.rules_version) == ('emergency', "1.0.2")
+
+
+def test_broken_files_keep_the_current_rules(tmp_path):
+    path = tmp_path / 'rules.json'
+    write_rules(path, "2.0.1")
+    triage = AdvancedTriageSystem(str(path), poll_interval=0)
+
+    path.write_text("{not json")
+    assert not triage.reload_rules()
+    assert triage.rules_version == "2.0.1"
+
+    write_rules(path, "2.0.2")
+    assert triage.reload_rules()
+    assert triage.rules_version == "2.0.2"
+
+
+def test_stop_watching_keeps_the_rules_in_force(tmp_path):
+    path = tmp_path / 'rules.json'
+    write_rules(path, "3.0.1")
+    triage = AdvancedTriageSystem(str(path), poll_interval=0.05)
+    triage.stop_watching()
+
+    write_rules(path, "3.0.2")
+    time.sleep(0.2)
+    assert triage.rules_version == "3.0.1"
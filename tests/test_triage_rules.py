@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from app.chatbot.triage_system import AdvancedTriageSystem, TriageRuleSet, load_rule_set
+
+
+@pytest.fixture
+def triage():
+    return AdvancedTriageSystem(poll_interval=0)
+
+
+def test_levels_follow_rule_points_and_risk_multipliers(triage):
+    scores = triage.score_batch(
+        [["chest pain"], ["severe pain"], ["severe pain"], ["severe pain", "high fever"], ["a cough"]],
+        [[], [], ["age_65_plus", "pregnancy"], [], []]
+    )
+    assert scores.level_names() == ['emergency', 'urgent', 'emergency', 'emergency', 'non_urgent']
+    assert scores.scores == pytest.approx([20.0, 10.5, 10.5 * 1.2 * 1.3, 10.5 + 9.1, 0.0])
+    assert scores.confidence[4] == pytest.approx(0.6)
+    assert scores.rules_version == triage.rules_version
+
+
+def test_batch_assessments_match_single_ones(triage):
+    cases = [(["chest pressure and shortness of breath"], ["diabetes"]), (["temperature"], []), ([], [])]
+    batch = triage.assess_batch([symptoms for symptoms, _ in cases], [factors for _, factors in cases])
+    single = [triage.assess_triage_level(symptoms, {}, factors) for symptoms, factors in cases]
+    assert batch == single
+
+    emergency = batch[0]
+    assert emergency.level == 'emergency'
+    assert sorted(emergency.red_flags) == ['chest_pain', 'difficulty_breathing']
+    assert "Risk factor present: diabetes" in emergency.reasoning
+    assert 'oxygen_saturation' in emergency.required_vitals
+
+
+def test_rule_hits_come_from_the_incidence_matrix():
+    rules = TriageRuleSet(
+        {'stroke': {'keywords': ['arm weakness', 'face drooping'], 'severity_multiplier': 2.0}},
+        {'pain': {'keywords': ['pain', 'arm weakness'], 'severity_multiplier': 1.0}},
+        {'smoker': 1.5},
+        version='test'
+    )
+    hits = rules.rule_hits([["Arm weakness"], ["pain"], ["nothing"]])
+    assert hits.tolist() == [[True, True], [False, True], [False, False]]
+    assert rules.factor_counts([["smoker", "unknown"]]).tolist() == [[1.0]]
+
+
+def test_rule_sets_are_read_only_and_shared(triage):
+    with pytest.raises(TypeError):
+        triage.rules.emergency_symptoms['new'] = {}
+    with pytest.raises(ValueError):
+        triage.rules.rule_points[0] = 0.0
+    assert load_rule_set(triage.rules_path) is triage.rules
+    assert isinstance(triage.rules.rule_points, np.ndarray)
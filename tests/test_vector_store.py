@@ -0,0 +1,182 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("langchain")
+
+from app.chatbot import vector_store as vector_store_module
+from app.chatbot.ingestion import IngestionPipeline
+from app.chatbot.vector_store import PersistentVectorStore
+
+SETTINGS = {'embedding_model': 'hashing', 'chunk_size': 1000, 'chunk_overlap': 200}
+
+
+def sync(index_dir, docs_dir, embeddings):
+    """What DocumentProcessor.initialize_vector_store does, without the embedding model."""
+    store = PersistentVectorStore(index_dir, SETTINGS)
+    with store.lock():
+        store.load()
+        pdf_files = sorted(docs_dir.glob("*.pdf"))
+        to_embed, deleted, touched = store.plan_update(pdf_files)
+        if to_embed or deleted or touched:
+            update = store.begin_update(deleted, [pdf_file.name for pdf_file in to_embed], touched)
+            try:
+                IngestionPipeline(embeddings, 1000, 200, workers=1, batch_size=2).run(to_embed, update)
+                update.commit()
+            except Exception:
+                update.abort()
+                raise
+    return store
+
+
+def search(store, embeddings, query):
+    return store.get_texts(store.search(np.asarray(embeddings.embed_query(query), dtype=np.float32), 1))[0]
+
+
+def assert_consistent(store):
+    assert len(store.chunk_ids) == len(store.chunk_offsets) - 1
+    assert store.vectors is None or store.vectors.shape[0] == len(store.chunk_ids)
+    assert store.index is None or store.index.ntotal == len(store.chunk_ids)
+    manifest_ids = sorted(i for entry in store.manifest['files'].values() for i in entry['chunk_ids'])
+    assert manifest_ids == store.chunk_ids.tolist()
+
+
+@pytest.fixture
+def corpus(tmp_path, make_pdf):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    make_pdf(docs / "asthma.pdf", ["asthma inhaler wheezing", "asthma attack triggers"])
+    make_pdf(docs / "diabetes.pdf", ["diabetes insulin glucose"])
+    return docs
+
+
+def test_initial_build_and_reload(tmp_path, corpus, embeddings):
+    store = sync(tmp_path / "index", corpus, embeddings)
+    assert len(store) == 3
+    assert_consistent(store)
+    assert search(store, embeddings, "insulin glucose") == "diabetes insulin glucose"
+
+    reloaded = PersistentVectorStore(tmp_path / "index", SETTINGS)
+    assert reloaded.load()
+    assert reloaded.fingerprint == store.fingerprint
+    assert search(reloaded, embeddings, "wheezing inhaler") == "asthma inhaler wheezing"
+
+
+def test_changed_settings_force_rebuild(tmp_path, corpus, embeddings):
+    sync(tmp_path / "index", corpus, embeddings)
+    other = PersistentVectorStore(tmp_path / "index", dict(SETTINGS, chunk_size=500))
+    assert not other.load()
+
+
+def test_incremental_add_embeds_only_new_file(tmp_path, corpus, embeddings, make_pdf):
+    store = sync(tmp_path / "index", corpus, embeddings)
+    old_ids = store.manifest['files']['asthma.pdf']['chunk_ids']
+
+    make_pdf(corpus / "migraine.pdf", ["migraine aura light sensitivity"])
+    embeddings.embedded.clear()
+    store = sync(tmp_path / "index", corpus, embeddings)
+
+    assert embeddings.embedded == ["migraine aura light sensitivity"]
+    assert len(store) == 4
+    assert store.manifest['files']['asthma.pdf']['chunk_ids'] == old_ids
+    assert search(store, embeddings, "migraine aura") == "migraine aura light sensitivity"
+    assert_consistent(store)
+
+
+def test_changed_file_replaces_its_chunks(tmp_path, corpus, embeddings, make_pdf):
+    sync(tmp_path / "index", corpus, embeddings)
+    make_pdf(corpus / "diabetes.pdf", ["diabetes metformin dosage", "diabetes foot care"])
+    embeddings.embedded.clear()
+    store = sync(tmp_path / "index", corpus, embeddings)
+
+    assert sorted(embeddings.embedded) == ["diabetes foot care", "diabetes metformin dosage"]
+    assert len(store) == 4
+    assert search(store, embeddings, "metformin dosage") == "diabetes metformin dosage"
+    texts = store.get_texts(store.chunk_ids)
+    assert "diabetes insulin glucose" not in texts
+    assert_consistent(store)
+
+
+def test_deleted_file_drops_its_chunks(tmp_path, corpus, embeddings):
+    sync(tmp_path / "index", corpus, embeddings)
+    os.remove(corpus / "asthma.pdf")
+    store = sync(tmp_path / "index", corpus, embeddings)
+
+    assert list(store.manifest['files']) == ["diabetes.pdf"]
+    assert store.get_texts(store.chunk_ids) == ["diabetes insulin glucose"]
+    assert_consistent(store)
+
+
+def test_touched_file_is_not_reembedded(tmp_path, corpus, embeddings):
+    sync(tmp_path / "index", corpus, embeddings)
+    later = time.time() + 100
+    os.utime(corpus / "asthma.pdf", (later, later))
+    embeddings.embedded.clear()
+    store = sync(tmp_path / "index", corpus, embeddings)
+
+    assert embeddings.embedded == []
+    assert store.manifest['files']['asthma.pdf']['mtime'] == later
+    assert_consistent(store)
+
+
+def test_old_generations_are_pruned(tmp_path, corpus, embeddings, make_pdf):
+    for i in range(4):
+        make_pdf(corpus / f"extra{i}.pdf", [f"extra document number {i}"])
+        store = sync(tmp_path / "index", corpus, embeddings)
+    # The live generation and the one it replaced
+    assert len(store.generations()) == 2
+    assert store.generation_dir == store.generations()[-1]
+
+
+@pytest.mark.parametrize("failure", ["index", "pointer"])
+def test_crash_during_commit_keeps_previous_version(tmp_path, corpus, embeddings, make_pdf, monkeypatch, failure):
+    index_dir = tmp_path / "index"
+    before = sync(index_dir, corpus, embeddings)
+    fingerprint = before.fingerprint
+    before.close()
+
+    make_pdf(corpus / "diabetes.pdf", ["diabetes metformin dosage", "diabetes foot care"])
+    os.remove(corpus / "asthma.pdf")
+
+    def crash(*args, **kwargs):
+        raise OSError("disk full")
+
+    if failure == "index":
+        # Vectors, texts and ids of the new version are already written by then
+        monkeypatch.setattr(vector_store_module.faiss, "write_index", crash)
+    else:
+        monkeypatch.setattr(vector_store_module.os, "replace", crash)
+
+    store = PersistentVectorStore(index_dir, SETTINGS)
+    store.load()
+    to_embed, deleted, touched = store.plan_update(sorted(corpus.glob("*.pdf")))
+    update = store.begin_update(deleted, [pdf_file.name for pdf_file in to_embed], touched)
+    IngestionPipeline(embeddings, 1000, 200, workers=1).run(to_embed, update)
+    with pytest.raises(OSError):
+        update.commit()  # no abort: the process "dies" here
+    monkeypatch.undo()
+
+    recovered = PersistentVectorStore(index_dir, SETTINGS)
+    assert recovered.load()
+    assert recovered.fingerprint == fingerprint
+    assert_consistent(recovered)
+    assert search(recovered, embeddings, "wheezing inhaler") == "asthma inhaler wheezing"
+    assert search(recovered, embeddings, "insulin glucose") == "diabetes insulin glucose"
+
+    # The next update succeeds and removes the half-written generation
+    store = sync(index_dir, corpus, embeddings)
+    assert_consistent(store)
+    assert search(store, embeddings, "metformin dosage") == "diabetes metformin dosage"
+    assert len(store.generations()) == 2
+
+
+def test_abort_leaves_store_untouched(tmp_path, corpus, embeddings):
+    store = sync(tmp_path / "index", corpus, embeddings)
+    generations = store.generations()
+    update = store.begin_update(["asthma.pdf"], [])
+    update.abort()
+    assert store.generations() == generations
+    assert len(store) == 3